@@ -1,13 +1,53 @@
-from flask import Flask, render_template, request, jsonify 
+import os
+import time
+from flask import Flask, Response, render_template, request, jsonify, g
 from src.pipeline.prediction_pipeline import PredictionPipeline, CustomClass
+from src.pipeline.micro_batcher import MicroBatcher
+from src.entity.config_entity import PredictionPipelineConfig
+from src.inference.metrics import metrics, REQUEST_LATENCY, REQUESTS_TOTAL
+from src.exception import InputValidationError
+from src.logger import logging
 
 app = Flask(__name__)
+prediction_config = PredictionPipelineConfig()
+prediction_pipeline = PredictionPipeline(prediction_config=prediction_config)
+micro_batcher = MicroBatcher(
+    predict_fn=prediction_pipeline.predict,
+    max_wait=prediction_config.micro_batch_max_wait,
+    max_batch_size=prediction_config.micro_batch_max_size
+)
+
+if prediction_config.warmup:
+    try:
+        prediction_pipeline.warmup()
+    except Exception as e:
+        logging.info(f"Warmup skipped: {e}")
+
+metrics.register_gauge("income_classifier_model_version", "Model version currently served", lambda: [({}, prediction_pipeline.model_cache.version)])
+metrics.register_gauge("income_classifier_prediction_cache", "Prediction cache counters",
+                       lambda: [({'stat': stat}, value) for stat, value in prediction_pipeline.cache_stats().items() if stat in ('hits', 'misses', 'evictions', 'size')])
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if route != "/metrics" and "request_start" in g:
+        metrics.observe(REQUEST_LATENCY, time.perf_counter() - g.request_start, route=route)
+    metrics.inc(REQUESTS_TOTAL, route=route, status=str(response.status_code))
+    return response
+
 
 @app.route("/", methods=['GET','POST'])
 def prediction_data():
     if request.method == "GET":
         return render_template('home.html')
-    else:
+
+    with metrics.time_stage("parse"):
         data = CustomClass(
             age= int(request.form.get("age")),
             fnlwgt=int(request.form.get("fnlwgt")),
@@ -25,9 +65,9 @@ def prediction_data():
             native_country=request.form.get('native_country')
         )
 
-    final_data = data.get_data_DataFrame()
-    pipeline_prediction = PredictionPipeline()
-    pred = pipeline_prediction.predict(final_data)
+    with metrics.time_stage("convert"):
+        final_data = data.get_feature_batch()
+    pred = micro_batcher.predict(final_data)
 
     result = pred 
     if result == 0:
@@ -36,5 +76,32 @@ def prediction_data():
         return render_template("result.html", final_result = "Your Yearly Income is More than Equal to 50k: {}".format(result[0]) )
 
 
+@app.route("/predict/batch", methods=['POST'])
+def batch_prediction():
+    with metrics.time_stage("parse"):
+        payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({"error": "Request body must be JSON"}), 400
+
+    records = payload.get("records") if isinstance(payload, dict) else payload
+    try:
+        result = prediction_pipeline.predict_batch(records)
+    except InputValidationError as e:
+        return jsonify({"error": str(e), "details": e.errors}), 400
+
+    return jsonify(result)
+
+
+@app.route("/cache/stats", methods=['GET'])
+def cache_stats():
+    # Each gunicorn worker has its own cache, these are the stats of the one answering
+    return jsonify({'pid': os.getpid(), **prediction_pipeline.cache_stats()})
+
+
+@app.route("/metrics", methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0",port=8080, debug=True)
\ No newline at end of file
@@ -0,0 +1,91 @@
+import os, sys
+import json
+import argparse
+from datetime import datetime
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+
+def parse_sizes(value:str)->list:
+    return [int(size) for size in value.split(",") if size != ""]
+
+
+def save_results(results:dict, output_path:str):
+    output_dir = os.path.dirname(output_path)
+    if output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w") as file_obj:
+        json.dump(results, file_obj, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the income classifier")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    evaluator_parser = subparsers.add_parser("evaluator", help="CatBoost predict_proba vs the NumPy oblivious tree evaluator")
+    evaluator_parser.add_argument("--batch-sizes", type=parse_sizes, default=[1, 16, 256, 4096])
+    evaluator_parser.add_argument("--repeats", type=int, default=20)
+    evaluator_parser.add_argument("--tree-max-rows", type=int, help="Largest batch the served model sends to the trees, default TREE_MODEL_MAX_ROWS")
+
+    startup_parser = subparsers.add_parser("startup", help="Import time and time to first prediction of the serving app")
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    load_parser = subparsers.add_parser("load", help="Model version load time and memory, pickles vs the binary bundle")
+    load_parser.add_argument("--runs", type=int, default=5)
+
+    cleaning_parser = subparsers.add_parser("cleaning", help="Apply based string cleaning vs the shared vectorized cleaning")
+    cleaning_parser.add_argument("--rows", type=parse_sizes, default=[10000, 100000, 1000000])
+    cleaning_parser.add_argument("--repeats", type=int, default=5)
+
+    resampling_parser = subparsers.add_parser("resampling", help="Runtime, memory and F1 of the resampling strategies")
+    resampling_parser.add_argument("--rows", type=parse_sizes, default=[30000, 300000, 3000000])
+    resampling_parser.add_argument("--strategies", type=lambda value: value.split(","), default=["smote_tomek", "blocked_smote_tomek", "class_weight", "none"])
+    resampling_parser.add_argument("--exact-max-rows", type=int, default=500000, help="Skip the exact SMOTETomek above this many training rows")
+    resampling_parser.add_argument("--block-size", type=int, default=50000)
+    resampling_parser.add_argument("--iterations", type=int, default=200, help="CatBoost iterations of the model scored on each result")
+
+    matrix_parser = subparsers.add_parser("matrix", help="Dense float64 vs sparse float32 transformed matrix, memory and time")
+    matrix_parser.add_argument("--rows", type=parse_sizes, default=[30000, 300000, 1000000])
+
+    serving_parser = subparsers.add_parser("serving", help="Load test of the prediction service, throughput and latency percentiles")
+    serving_parser.add_argument("--mode", choices=["inprocess", "socket"], default="inprocess")
+    serving_parser.add_argument("--url", help="Running server to load in socket mode, e.g. http://127.0.0.1:8080")
+    serving_parser.add_argument("--requests", type=int, default=2000)
+    serving_parser.add_argument("--concurrency", type=int, default=8)
+    serving_parser.add_argument("--batch-fraction", type=float, default=0.0, help="Share of requests sent to /predict/batch")
+    serving_parser.add_argument("--batch-size", type=int, default=100)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "evaluator":
+        from src.benchmark.model_evaluator import run_model_evaluator_benchmark
+        results = run_model_evaluator_benchmark(batch_sizes=args.batch_sizes, repeats=args.repeats, tree_model_max_rows=args.tree_max_rows)
+    elif args.benchmark == "startup":
+        from src.benchmark.startup import run_startup_benchmark
+        results = run_startup_benchmark(runs=args.runs)
+    elif args.benchmark == "load":
+        from src.benchmark.model_load import run_model_load_benchmark
+        results = run_model_load_benchmark(runs=args.runs)
+    elif args.benchmark == "cleaning":
+        from src.benchmark.cleaning import run_cleaning_benchmark
+        results = run_cleaning_benchmark(row_counts=args.rows, repeats=args.repeats)
+    elif args.benchmark == "resampling":
+        from src.benchmark.resampling import run_resampling_benchmark
+        results = run_resampling_benchmark(row_counts=args.rows, strategies=args.strategies, exact_max_rows=args.exact_max_rows,
+                                           block_size=args.block_size, iterations=args.iterations)
+    elif args.benchmark == "matrix":
+        from src.benchmark.matrix import run_matrix_benchmark
+        results = run_matrix_benchmark(row_counts=args.rows)
+    elif args.benchmark == "serving":
+        from src.benchmark.serving import run_serving_benchmark
+        results = run_serving_benchmark(mode=args.mode, url=args.url, n_requests=args.requests, concurrency=args.concurrency,
+                                        batch_fraction=args.batch_fraction, batch_size=args.batch_size)
+        if args.output is None:
+            args.output = os.path.join("benchmark_results", f"serving_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        save_results(results, args.output)
+    if results.get('accepted') is False:
+        sys.exit(1)
@@ -1,17 +1,23 @@
-import json
-import pandas as pd 
-from src.config import mongo_client
-
-DATA_FILE_PATH = r"C:/Users/nikhi/income_classifier/dataset/salary.csv"
-DATABASE_NAME = 'hr'
-COLLECTION_NAME = 'details'
+import argparse
+from src.entity.config_entity import BulkLoadConfig
+from src.pipeline.bulk_load_pipeline import start_bulk_load
 
 if __name__ == "__main__":
-    df = pd.read_csv(DATA_FILE_PATH)
-    df.reset_index(drop=True, inplace=True)
+    bulk_load_config = BulkLoadConfig()
+    parser = argparse.ArgumentParser(description="Load a CSV or Parquet dataset into MongoDB")
+    parser.add_argument("source_path", nargs="?", default="salary.csv")
+    parser.add_argument("--database", default=bulk_load_config.database_name)
+    parser.add_argument("--collection", default=bulk_load_config.collection_name)
+    parser.add_argument("--chunk-size", type=int, default=bulk_load_config.chunk_size, help="Rows per insert_many call")
+    parser.add_argument("--workers", type=int, default=bulk_load_config.n_workers, help="Concurrent insert threads")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an earlier run")
+    args = parser.parse_args()
 
-    json_records = list(json.loads(df.T.to_json()).values())
-    print(json_records[0])
+    bulk_load_config.database_name = args.database
+    bulk_load_config.collection_name = args.collection
+    bulk_load_config.chunk_size = args.chunk_size
+    bulk_load_config.n_workers = args.workers
+    bulk_load_config.max_pending_chunks = 2 * max(args.workers, 1)
 
-    mongo_client[DATABASE_NAME][COLLECTION_NAME].insert_many(json_records)
-    print(f"{'='*20} DATA UPLOADING COMPLETE {'='*20}")
\ No newline at end of file
+    n_rows = start_bulk_load(source_path=args.source_path, restart=args.restart, bulk_load_config=bulk_load_config)
+    print(f"{'='*20} DATA UPLOADING COMPLETE: {n_rows} Rows {'='*20}")
@@ -0,0 +1,70 @@
+import os
+import gc
+import shutil
+import tempfile
+import multiprocessing
+
+# Production server: the master imports app.py once (preload_app), which loads and
+# warms up the model bundle, then forks the workers. The bundle's numpy arrays are
+# never written to, so workers share those pages copy-on-write with the master.
+#
+# Workers do not poll saved_models themselves, a private reload would give every
+# worker its own copy. Send SIGHUP to the master instead: it loads the latest
+# version, forks fresh workers with it and gracefully stops the old ones while
+# the listening socket stays open, so no request is dropped.
+os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+
+# Every worker counts its own requests. They write snapshots of their metrics to
+# this directory and /metrics sums them, whichever worker answers the scrape.
+metrics_dir = os.environ.setdefault("METRICS_MULTIPROCESS_DIR", os.path.join(tempfile.gettempdir(), f"income_classifier_metrics_{os.getpid()}"))
+metrics_flush_interval = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+# Threads per worker, concurrent requests are what the micro batcher coalesces.
+# The model is shared, but the prediction cache and the micro batcher are per
+# worker: a worker only hits on records it scored itself and only coalesces the
+# requests of its own threads. Fewer workers with more threads give bigger
+# batches and a higher hit rate, more workers give more cores to transform and
+# predict.
+threads = int(os.getenv("WEB_THREADS", 8))
+preload_app = True
+# Recycle workers after a number of requests so any slow growth is returned
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 1000))
+timeout = int(os.getenv("WEB_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def post_fork(server, worker):
+    from src.inference.metrics import metrics
+    metrics.enable_multiprocess(metrics_dir, flush_interval=metrics_flush_interval)
+
+
+def worker_exit(server, worker):
+    from src.inference.metrics import metrics
+    metrics.write_snapshot()
+
+
+def child_exit(server, worker):
+    from src.inference.metrics import mark_process_dead
+    mark_process_dead(metrics_dir, worker.pid)
+
+
+def pre_fork(server, worker):
+    # Move everything the master allocated out of the collector's reach, so a
+    # worker's gc passes do not write to the shared pages
+    gc.freeze()
+
+
+def on_reload(server):
+    import app
+    version = app.prediction_pipeline.model_cache.refresh(force=True)
+    app.prediction_pipeline.warmup()
+    server.log.info(f"Serving model version {version}")
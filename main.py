@@ -1,9 +1,15 @@
+import argparse
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 from src.pipeline.training_pipeline import start_training_pipeline 
 
 
 if __name__ == '__main__':
-    start_training_pipeline()
+    parser = argparse.ArgumentParser(description="Train, evaluate and push the income classifier")
+    parser.add_argument("--force", action="store_true", help="Recompute every stage instead of reusing cached artifacts")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="ARTIFACT_DIR",
+                        help="Continue a failed run from its failed stage, the latest unfinished run by default")
+    args = parser.parse_args()
+    start_training_pipeline(force=args.force, resume=args.resume)
     
    
\ No newline at end of file
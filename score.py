@@ -0,0 +1,24 @@
+import argparse
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+from src.entity.config_entity import ScoringConfig
+from src.pipeline.scoring_pipeline import start_scoring_pipeline
+
+
+if __name__ == '__main__':
+    scoring_config = ScoringConfig()
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file with the latest saved model")
+    parser.add_argument("input_path", help="CSV or Parquet file with the raw input features")
+    parser.add_argument("output_path", help="CSV or Parquet file the predictions are written to")
+    parser.add_argument("--chunk-size", type=int, default=scoring_config.chunk_size)
+    parser.add_argument("--workers", type=int, default=scoring_config.n_workers)
+    parser.add_argument("--keep-columns", default="", help="Comma separated input columns copied to the output, e.g. an id")
+    args = parser.parse_args()
+
+    scoring_config.chunk_size = args.chunk_size
+    scoring_config.n_workers = args.workers
+    scoring_config.max_pending_chunks = 2 * max(args.workers, 1)
+    keep_columns = [col for col in args.keep_columns.split(",") if col != ""]
+
+    n_rows = start_scoring_pipeline(input_path=args.input_path, output_path=args.output_path, keep_columns=keep_columns, scoring_config=scoring_config)
+    print(f"{'='*20} SCORED {n_rows} ROWS {'='*20}")
@@ -0,0 +1,63 @@
+import time
+import random
+import numpy as np
+import pandas as pd
+from src.inference.cleaning import clean_frame
+from src.benchmark.serving import make_records
+
+
+def legacy_clean(df:pd.DataFrame)->pd.DataFrame:
+    """
+    The per element cleaning ingestion and validation used before clean_frame.
+    """
+    cat_cols = [col for col in df.columns if df[col].dtype == 'O']
+    for col in cat_cols:
+        df[col] = df[col].apply(lambda x: x.strip())
+    df.replace(to_replace=['na', '?'], value=np.NAN, inplace=True)
+    return df
+
+
+def make_raw_frame(n_rows:int, seed:int=42)->pd.DataFrame:
+    """
+    Census style frame with the raw file's leading spaces and '?' markers.
+    """
+    rng = random.Random(seed)
+    records = make_records(min(n_rows, 4096), seed=seed)
+    df = pd.DataFrame([records[row % len(records)] for row in range(n_rows)])
+    for col in df.columns:
+        if df[col].dtype == 'O':
+            df[col] = [" ?" if rng.random() < 0.02 else f" {value}" for value in df[col]]
+    return df
+
+
+def run_cleaning_benchmark(row_counts:list, repeats:int=5)->dict:
+    """
+    Times the apply based cleaning against clean_frame on object columns and
+    on categorical columns, and checks that they agree.
+    """
+    results = []
+    for n_rows in row_counts:
+        raw_df = make_raw_frame(n_rows)
+        expected = legacy_clean(raw_df.copy())
+        if not clean_frame(raw_df.copy()).equals(expected):
+            raise ValueError(f"clean_frame differs from the legacy cleaning on {n_rows} rows")
+
+        timings = dict()
+        for name, clean, frame in (('legacy_apply', legacy_clean, raw_df),
+                                   ('clean_frame', clean_frame, raw_df),
+                                   ('clean_frame_categorical', clean_frame, raw_df.astype({col: "category" for col in raw_df.columns if raw_df[col].dtype == 'O'}))):
+            samples = []
+            for _ in range(repeats):
+                df = frame.copy()
+                start = time.perf_counter()
+                clean(df)
+                samples.append(time.perf_counter() - start)
+            timings[name] = float(np.median(samples))
+
+        results.append({
+            'rows': n_rows,
+            **{f"{name}_s": seconds for name, seconds in timings.items()},
+            'speedup': timings['legacy_apply'] / timings['clean_frame']
+        })
+
+    return {'benchmark': 'cleaning', 'repeats': repeats, 'results': results}
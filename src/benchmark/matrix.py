@@ -0,0 +1,106 @@
+import os
+import time
+import shutil
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Sequence
+from scipy import sparse
+from src.components.data_transformation import DataTransformation, WORKCLASS_CATEGORIES, EDUCATION_CATEGORIES
+from src.benchmark.serving import make_records
+from src import utils
+
+ORDINAL_COLUMNS = ['workclass', 'education']
+
+
+def make_feature_frame(n_rows:int, seed:int=42)->pd.DataFrame:
+    records = make_records(min(n_rows, 4096), seed=seed)
+    return pd.DataFrame([records[row % len(records)] for row in range(n_rows)])
+
+
+def matrix_nbytes(features)->int:
+    if sparse.issparse(features):
+        return int(features.data.nbytes + features.indices.nbytes + features.indptr.nbytes)
+    return int(features.nbytes)
+
+
+def dir_nbytes(dir_path:str)->int:
+    return sum(os.path.getsize(os.path.join(dir_path, file_name)) for file_name in os.listdir(dir_path))
+
+
+def run_layout(df:pd.DataFrame, target:np.ndarray, sparse_one_hot:bool, work_dir:str)->dict:
+    """
+    Fits and applies the transformer in one layout and saves and loads its
+    output the way the pipeline does.
+    """
+    numerical_features = df.select_dtypes(include='number').columns
+    nom_cat_features = [col for col in df.columns if col not in numerical_features and col not in ORDINAL_COLUMNS]
+    transformer = DataTransformation.get_data_transformer_obj(num_cols=numerical_features, ordinal_cat_cols=ORDINAL_COLUMNS, nom_cat_cols=nom_cat_features,
+                                                             workclass_cat=WORKCLASS_CATEGORIES, education_cat=EDUCATION_CATEGORIES, sparse_one_hot=sparse_one_hot)
+    transformer.fit(df)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if sparse_one_hot:
+        features = utils.as_feature_matrix(transformer.transform(df), dtype="float32")
+    else:
+        # The previous layout: dense float64 with the labels joined on as the last column
+        features = np.c_[transformer.transform(df), target]
+    transform_s = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    if sparse_one_hot:
+        utils.save_feature_matrix(dir_path=work_dir, features=features, target=target)
+    else:
+        utils.save_numpy_data(file_dir=os.path.join(work_dir, "train.npz"), array=features)
+    save_s = time.perf_counter() - start
+
+    # Both layouts are read in full, summing touches every page of the memory map
+    start = time.perf_counter()
+    if sparse_one_hot:
+        loaded, loaded_target = utils.load_feature_matrix(work_dir, mmap_mode="r")
+        float(loaded.data.sum()) + int(loaded.indices.sum()) + int(loaded.indptr.sum()) + int(loaded_target.sum())
+    else:
+        loaded = utils.load_numpy_obj(os.path.join(work_dir, "train.npz"))
+        float(loaded[:, :-1].sum()) + float(loaded[:, -1].sum())
+    load_s = time.perf_counter() - start
+
+    return {
+        'transform_s': transform_s,
+        'transform_peak_mb': peak_bytes / 1024**2,
+        'matrix_mb': matrix_nbytes(features) / 1024**2,
+        'save_s': save_s,
+        'disk_mb': dir_nbytes(work_dir) / 1024**2,
+        'load_s': load_s
+    }
+
+
+def run_matrix_benchmark(row_counts:Sequence[int], seed:int=42)->dict:
+    """
+    Dense float64 matrix with joined labels against the sparse float32
+    matrix with separate labels: transform time and peak memory, matrix
+    size, save and load time and size on disk.
+    """
+    results = []
+    for n_rows in row_counts:
+        df = make_feature_frame(n_rows, seed=seed)
+        target = np.random.default_rng(seed).integers(0, 2, size=n_rows)
+        layouts = dict()
+        for name, sparse_one_hot in (('dense_float64', False), ('sparse_float32', True)):
+            work_dir = tempfile.mkdtemp(prefix="matrix_benchmark_")
+            try:
+                layouts[name] = run_layout(df, target, sparse_one_hot, work_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        results.append({
+            'rows': n_rows,
+            **{f"{name}_{metric}": value for name, layout in layouts.items() for metric, value in layout.items()},
+            'memory_ratio': layouts['dense_float64']['matrix_mb'] / max(layouts['sparse_float32']['matrix_mb'], 1e-9),
+            'transform_speedup': layouts['dense_float64']['transform_s'] / max(layouts['sparse_float32']['transform_s'], 1e-9)
+        })
+
+    return {'benchmark': 'matrix', 'results': results}
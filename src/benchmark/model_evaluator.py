@@ -0,0 +1,81 @@
+import time
+import numpy as np
+from typing import Optional, Sequence
+from src.components.model_resolver import ModelResolver
+from src.entity.config_entity import PredictionPipelineConfig
+from src.inference.oblivious_trees import BatchSizeRouter, export_oblivious_trees, verify_oblivious_trees
+from src.utils import load_object
+
+# The served model must keep up with CatBoost at each of these batch sizes
+ACCEPTANCE_BATCH_SIZES = (1, 16, 256, 4096)
+# Slack on the CatBoost median, for timing noise
+ACCEPTANCE_TOLERANCE = 0.2
+
+
+def time_call(fn, X, repeats:int)->dict:
+    fn(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1000
+    return {'median_ms': float(np.median(timings)), 'p95_ms': float(np.percentile(timings, 95))}
+
+
+def run_model_evaluator_benchmark(model_registry:str="saved_models", batch_sizes:Sequence[int]=ACCEPTANCE_BATCH_SIZES, repeats:int=20, seed:int=42,
+                                  tree_model_max_rows:Optional[int]=None)->dict:
+    """
+    Compares CatBoost's predict_proba with the NumPy oblivious tree evaluator
+    and with the served model, which routes batches of up to
+    `tree_model_max_rows` rows to the trees, on synthetic inputs of the
+    latest saved model's width. The served model is accepted when it is no
+    slower than CatBoost at every size of ACCEPTANCE_BATCH_SIZES.
+    """
+    if tree_model_max_rows is None:
+        tree_model_max_rows = PredictionPipelineConfig().tree_model_max_rows
+    batch_sizes = sorted(set(batch_sizes) | set(ACCEPTANCE_BATCH_SIZES))
+    model_resolver = ModelResolver(model_registry=model_registry)
+    version = model_resolver.get_latest_version()
+    if version is None:
+        raise Exception("Model is not available")
+    model = load_object(file_dir=model_resolver.get_model_path(version))
+    tree_model = export_oblivious_trees(model)
+    served_model = BatchSizeRouter(tree_model=tree_model, model=model, max_tree_rows=tree_model_max_rows)
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(max(batch_sizes), len(model.feature_names_)))
+    max_diff = verify_oblivious_trees(model, tree_model, X)
+
+    results = []
+    for batch_size in batch_sizes:
+        X_batch = X[:batch_size]
+        catboost_timing = time_call(model.predict_proba, X_batch, repeats)
+        tree_timing = time_call(tree_model.predict_proba, X_batch, repeats)
+        served_timing = time_call(served_model.predict_proba, X_batch, repeats)
+        results.append({
+            'batch_size': int(batch_size),
+            'catboost': catboost_timing,
+            'oblivious_trees': tree_timing,
+            'served': served_timing,
+            'speedup': catboost_timing['median_ms'] / max(tree_timing['median_ms'], 1e-9),
+            'accepted': served_timing['median_ms'] <= catboost_timing['median_ms'] * (1 + ACCEPTANCE_TOLERANCE)
+        })
+
+    # Largest batch size up to which the trees win, a value for TREE_MODEL_MAX_ROWS
+    faster_tree_max_rows = 0
+    for result in results:
+        if result['speedup'] < 1:
+            break
+        faster_tree_max_rows = result['batch_size']
+
+    return {
+        'benchmark': 'model_evaluator',
+        'model_version': version,
+        'tree_count': tree_model.tree_count,
+        'max_abs_probability_diff': max_diff,
+        'tree_model_max_rows': tree_model_max_rows,
+        'faster_tree_max_rows': faster_tree_max_rows,
+        'accepted': all(result['accepted'] for result in results if result['batch_size'] in ACCEPTANCE_BATCH_SIZES),
+        'results': results
+    }
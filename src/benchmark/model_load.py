@@ -0,0 +1,49 @@
+import sys
+import json
+import subprocess
+import numpy as np
+from src.components.model_resolver import ModelResolver
+
+PROBE = """
+import json, resource, sys, time
+from src.components.model_resolver import ModelResolver
+from src.pipeline.model_cache import ModelCache
+model_registry, version, source = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+model_cache = ModelCache(model_resolver=ModelResolver(model_registry=model_registry), reload_interval=None)
+if source == "pickle":
+    model_cache.model_resolver.bundle_dir_name = "__no_bundle__"
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+model_cache.load_bundle(version)
+print(json.dumps({
+    'load_s': time.perf_counter() - start,
+    'peak_rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+}))
+"""
+
+
+def run_probe(model_registry:str, version:int, source:str)->dict:
+    completed = subprocess.run([sys.executable, "-c", PROBE, model_registry, str(version), source], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_model_load_benchmark(model_registry:str="saved_models", runs:int=5)->dict:
+    """
+    Loads the latest registry version in fresh interpreters, once from the
+    pickles and once from the binary bundle, and reports the load time and
+    the peak RSS growth of each.
+    """
+    version = ModelResolver(model_registry=model_registry).get_latest_version()
+    if version is None:
+        raise Exception("Model is not available")
+
+    results = []
+    for source in ("pickle", "bundle"):
+        samples = [run_probe(model_registry, version, source) for _ in range(runs)]
+        results.append({
+            'source': source,
+            'load_s': float(np.median([sample['load_s'] for sample in samples])),
+            'peak_rss_growth_kb': float(np.median([sample['peak_rss_growth_kb'] for sample in samples]))
+        })
+
+    return {'benchmark': 'load', 'model_version': version, 'runs': runs, 'results': results}
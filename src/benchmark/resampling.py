@@ -0,0 +1,66 @@
+import time
+import tracemalloc
+import numpy as np
+from typing import Sequence
+from sklearn.datasets import make_classification
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from catboost import CatBoostClassifier
+from src.components.resampling import RESAMPLING_STRATEGIES, AUTO, SMOTE_TOMEK, resample
+
+
+def make_dataset(n_rows:int, n_features:int=60, seed:int=42):
+    """
+    Synthetic data of the transformed census width with its class ratio,
+    about a quarter of the rows in the minority class.
+    """
+    return make_classification(n_samples=n_rows, n_features=n_features, n_informative=12, n_redundant=8,
+                               weights=[0.76], flip_y=0.02, class_sep=0.8, random_state=seed)
+
+
+def run_resampling_benchmark(row_counts:Sequence[int], strategies:Sequence[str]=(SMOTE_TOMEK, "blocked_smote_tomek", "class_weight", "none"),
+                             exact_max_rows:int=500000, block_size:int=50000, iterations:int=200, seed:int=42)->dict:
+    """
+    Resamples the training split of each dataset with every strategy and
+    reports the resampling time, its peak traced memory and the F1 score of
+    a CatBoost model trained on the result, scored on an untouched 20% holdout.
+    The exact SMOTETomek is skipped above `exact_max_rows` rows.
+    """
+    strategies = [strategy for strategy in strategies if strategy != AUTO]
+    unknown = [strategy for strategy in strategies if strategy not in RESAMPLING_STRATEGIES]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown resampling strategies: {unknown}")
+
+    results = []
+    for n_rows in row_counts:
+        X, y = make_dataset(n_rows, seed=seed)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=seed)
+        for strategy in strategies:
+            if strategy == SMOTE_TOMEK and len(y_train) > exact_max_rows:
+                results.append({'rows': n_rows, 'strategy': strategy, 'skipped': f"over {exact_max_rows} rows"})
+                continue
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            X_resampled, y_resampled, class_weights = resample(X_train, y_train, strategy=strategy, block_size=block_size, random_state=seed)
+            resample_s = time.perf_counter() - start
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            clf = CatBoostClassifier(iterations=iterations, learning_rate=0.1, depth=8, l2_leaf_reg=3, class_weights=class_weights, verbose=False, random_seed=seed)
+            start = time.perf_counter()
+            clf.fit(X_resampled, y_resampled)
+            train_s = time.perf_counter() - start
+
+            results.append({
+                'rows': n_rows,
+                'strategy': strategy,
+                'resample_s': resample_s,
+                'resample_peak_mb': peak_bytes / 1024**2,
+                'train_s': train_s,
+                'rows_after_resampling': int(len(y_resampled)),
+                'minority_share': float(np.mean(y_resampled)),
+                'f1_test': float(f1_score(y_test, clf.predict(X_test)))
+            })
+
+    return {'benchmark': 'resampling', 'block_size': block_size, 'iterations': iterations, 'results': results}
@@ -0,0 +1,225 @@
+import sys
+import json
+import time
+import random
+import threading
+import subprocess
+import http.client
+import numpy as np
+from datetime import datetime
+from urllib.parse import urlencode, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+WORKCLASS = ['State-gov', 'Self-emp-not-inc', 'Private', 'Federal-gov', 'Local-gov', 'Self-emp-inc', 'Without-pay']
+EDUCATION = [('Doctorate', 16), ('Masters', 14), ('Bachelors', 13), ('HS-grad', 9), ('Some-college', 10), ('Assoc-acdm', 12), ('Assoc-voc', 11), ('Prof-school', 15), ('12th', 8), ('11th', 7), ('10th', 6), ('9th', 5), ('7th-8th', 4)]
+MARITAL_STATUS = ['Never-married', 'Married-civ-spouse', 'Divorced', 'Married-spouse-absent', 'Separated', 'Married-AF-spouse', 'Widowed']
+OCCUPATION = ['Adm-clerical', 'Exec-managerial', 'Handlers-cleaners', 'Prof-specialty', 'Other-service', 'Sales', 'Craft-repair', 'Transport-moving', 'Farming-fishing', 'Machine-op-inspct', 'Tech-support', 'Protective-serv']
+RELATIONSHIP = ['Not-in-family', 'Husband', 'Wife', 'Own-child', 'Unmarried', 'Other-relative']
+RACE = ['White', 'Black', 'Asian-Pac-Islander', 'Amer-Indian-Eskimo', 'Other']
+SEX = ['Male', 'Female']
+NATIVE_COUNTRY = ['United-States'] * 9 + ['Mexico', 'Philippines', 'Germany', 'Canada', 'India', 'England', 'Cuba']
+
+
+def make_records(n_records:int, seed:int=42)->list:
+    """
+    Synthetic Adult style records keyed by the CustomClass / form field names.
+    Ages and hours are bucketed like real traffic, so records repeat.
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n_records):
+        education, education_num = rng.choice(EDUCATION)
+        records.append({
+            'age': rng.randrange(17, 80, 3),
+            'fnlwgt': rng.randrange(20000, 800000, 1000),
+            'workclass': rng.choice(WORKCLASS),
+            'education': education,
+            'education_num': education_num,
+            'marital_status': rng.choice(MARITAL_STATUS),
+            'occupation': rng.choice(OCCUPATION),
+            'relationship': rng.choice(RELATIONSHIP),
+            'race': rng.choice(RACE),
+            'sex': rng.choice(SEX),
+            'capital_gain': rng.choice([0] * 9 + [rng.randrange(0, 20000, 500)]),
+            'capital_loss': rng.choice([0] * 19 + [rng.randrange(0, 3000, 100)]),
+            'hours_per_week': rng.choice([20, 30, 35, 40, 40, 40, 45, 50, 60]),
+            'native_country': rng.choice(NATIVE_COUNTRY)
+        })
+    return records
+
+
+class InProcessClient:
+    """
+    Flask test client, exercises the app without any network stack.
+    """
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def post_form(self, path:str, form:dict):
+        response = self.client.post(path, data=form)
+        return response.status_code, response.get_data()
+
+    def post_json(self, path:str, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    """
+    Plain HTTP client reusing its connection while the server keeps it open.
+    """
+
+    def __init__(self, base_url:str):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.connection = None
+
+    def _request(self, path:str, body:bytes, content_type:str):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request("POST", path, body=body, headers={"Content-Type": content_type})
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, data
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 1:
+                    raise
+
+    def post_form(self, path:str, form:dict):
+        return self._request(path, urlencode(form).encode(), "application/x-www-form-urlencoded")
+
+    def post_json(self, path:str, payload):
+        return self._request(path, json.dumps(payload).encode(), "application/json")
+
+
+def peak_rss_bytes()->int:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def git_commit()->str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def summarize(latencies:list, elapsed:float)->dict:
+    if len(latencies) == 0:
+        return {'requests': 0}
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed,
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'max_ms': float(latencies_ms.max())
+    }
+
+
+def run_serving_benchmark(mode:str="inprocess", url:str=None, n_requests:int=2000, concurrency:int=8, batch_fraction:float=0.0, batch_size:int=100, warmup_requests:int=50, seed:int=42)->dict:
+    """
+    Drives the prediction service with a mix of single form posts to `/` and
+    JSON posts of `batch_size` records to `/predict/batch`.
+    mode: inprocess (Flask test client) or socket (HTTP on a local port). In
+          socket mode the app is served from this process unless `url` points
+          at an already running server, e.g. gunicorn.
+    The peak RSS is that of this process, client and app together, and is
+    left out when benchmarking a `url`.
+    """
+    server, flask_app = None, None
+    app_in_process = mode == "inprocess" or url is None
+    if app_in_process:
+        import app as app_module
+        flask_app = app_module.app
+
+    if mode == "socket" and url is None:
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+        url = f"http://127.0.0.1:{server.server_port}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    local = threading.local()
+
+    def get_client():
+        if not hasattr(local, "client"):
+            local.client = InProcessClient(flask_app) if mode == "inprocess" else HttpClient(url)
+        return local.client
+
+    records = make_records(4096, seed=seed)
+    rng = random.Random(seed)
+    plan = ['batch' if rng.random() < batch_fraction else 'single' for _ in range(n_requests)]
+
+    def send(index:int):
+        kind = plan[index % len(plan)]
+        client = get_client()
+        start = time.perf_counter()
+        if kind == 'single':
+            status, _ = client.post_form("/", records[index % len(records)])
+        else:
+            offset = (index * batch_size) % len(records)
+            batch = (records[offset:] + records[:offset])[:batch_size]
+            status, _ = client.post_json("/predict/batch", {"records": batch})
+        return kind, status, time.perf_counter() - start
+
+    try:
+        status, body = get_client().post_json("/predict/batch", {"records": records[:1]})
+        model_version = json.loads(body).get('model_version') if status == 200 else None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(send, range(warmup_requests)))
+
+            start = time.perf_counter()
+            outcomes = list(executor.map(send, range(n_requests)))
+            elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    latencies = {'single': [], 'batch': []}
+    errors = 0
+    for kind, status, latency in outcomes:
+        latencies[kind].append(latency)
+        if status != 200:
+            errors += 1
+    n_rows = len(latencies['single']) + len(latencies['batch']) * batch_size
+
+    results = {
+        'benchmark': 'serving',
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'model_version': model_version,
+        'config': {
+            'mode': mode,
+            'url': url,
+            'app_in_process': app_in_process,
+            'requests': n_requests,
+            'concurrency': concurrency,
+            'batch_fraction': batch_fraction,
+            'batch_size': batch_size,
+            'warmup_requests': warmup_requests
+        },
+        'elapsed_s': elapsed,
+        'errors': errors,
+        'rows_per_s': n_rows / elapsed,
+        'all': summarize(latencies['single'] + latencies['batch'], elapsed),
+        'single': summarize(latencies['single'], elapsed),
+        'batch': summarize(latencies['batch'], elapsed)
+    }
+    # RUSAGE_SELF only measures this process, the server behind an external url is not in it
+    if app_in_process:
+        results['client_peak_rss_bytes'] = peak_rss_bytes()
+    return results
@@ -0,0 +1,53 @@
+import os, sys
+import json
+import time
+import subprocess
+import numpy as np
+
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'catboost', 'xgboost', 'imblearn', 'pymongo')
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from src.inference.feature_batch import ColumnarBatch, SAMPLE_RECORD
+app.prediction_pipeline.predict(ColumnarBatch.from_records([SAMPLE_RECORD]))
+predicted = time.perf_counter()
+print(json.dumps({{
+    'import_s': imported - start,
+    'first_prediction_s': predicted - imported,
+    'heavy_modules': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def run_probe(warmup:bool)->dict:
+    env = dict(os.environ, MODEL_WARMUP="1" if warmup else "0", PREDICTION_CACHE_SIZE="0")
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample['process_s'] = time.perf_counter() - start
+    return sample
+
+
+def run_startup_benchmark(runs:int=5)->dict:
+    """
+    Imports the serving app in fresh interpreters and times the import and
+    the first prediction, with and without warmup at import.
+    """
+    results = []
+    for warmup in (False, True):
+        samples = [run_probe(warmup) for _ in range(runs)]
+        import_s = np.asarray([sample['import_s'] for sample in samples])
+        first_prediction_s = np.asarray([sample['first_prediction_s'] for sample in samples])
+        results.append({
+            'warmup': warmup,
+            'import_s': float(np.median(import_s)),
+            'first_prediction_s': float(np.median(first_prediction_s)),
+            'time_to_first_prediction_s': float(np.median(import_s + first_prediction_s)),
+            'process_s': float(np.median([sample['process_s'] for sample in samples])),
+            'heavy_modules': sorted({name for sample in samples for name in sample['heavy_modules']})
+        })
+
+    return {'benchmark': 'startup', 'runs': runs, 'results': results}
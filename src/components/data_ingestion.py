@@ -1,11 +1,18 @@
 import os, sys 
+import json
+import time
+import hashlib
+from datetime import timedelta
 import numpy as np 
 import pandas as pd 
-from sklearn.model_selection import train_test_split
 from src.logger import logging
 from src.exception import CustomException
 from src.entity import config_entity, artifact_entity
-from src.utils import get_collection_dataframe
+from src.inference.cleaning import clean_frame
+from src.pipeline.bulk_load_pipeline import find_incomplete_loads
+from src.utils import get_collection, iter_collection_chunks, compact_dtypes, write_feature_store_part, list_feature_store_parts
+RECENT_IDS_PREFIX = "recent_ids_"
+
 
 class DataIngestion:
 
@@ -15,33 +22,178 @@ class DataIngestion:
         logging.info(f"{'-'*20} Data Ingestion Process {'-'*20}")
         
 
+    def clean_chunk(self, chunk:pd.DataFrame)->pd.DataFrame:
+        chunk = clean_frame(chunk)
+        # chunk.drop(['capital-loss','capital-gain','fnlwgt'], axis=1, inplace=True)
+        return chunk
+
+
+    def load_state(self)->dict:
+        """
+        Watermark and part count of the last completed ingestion.
+        Deleting the state file makes the next run ingest the whole collection.
+        """
+        state = {'watermark': None, 'columns': None, 'rows': 0, 'test_rows': 0, 'parts': 0, 'recent_ids_file': None}
+        if os.path.exists(self.data_ingestion_config.state_file_dir):
+            with open(self.data_ingestion_config.state_file_dir) as file_obj:
+                saved_state = json.load(file_obj)
+            if 'parts' in saved_state:
+                state = saved_state
+            else:
+                logging.info("Ingestion State is from the CSV Feature Store, Rebuilding the Parquet Feature Store")
+        return state
+
+
+    def save_state(self, state:dict):
+        state_file_dir = self.data_ingestion_config.state_file_dir
+        with open(f"{state_file_dir}.tmp", "w") as file_obj:
+            json.dump(state, file_obj, indent=2)
+        os.replace(f"{state_file_dir}.tmp", state_file_dir)
+
+
+    def rollback_partial_writes(self, state:dict):
+        """
+        Removes part files written after the last watermark, and id files the
+        state does not point to, left by a run that failed before saving its state.
+        """
+        for store_dir in (self.data_ingestion_config.feature_store_dir, self.data_ingestion_config.train_data_dir, self.data_ingestion_config.test_data_dir):
+            for part_name in list_feature_store_parts(store_dir)[state['parts']:]:
+                logging.info(f"Removing {part_name} of {store_dir}, written after the last completed ingestion")
+                os.remove(os.path.join(store_dir, part_name))
+        store_dir = self.data_ingestion_config.ingestion_store_dir
+        if os.path.isdir(store_dir):
+            for file_name in os.listdir(store_dir):
+                if file_name.startswith(RECENT_IDS_PREFIX) and file_name != state.get('recent_ids_file'):
+                    os.remove(os.path.join(store_dir, file_name))
+
+
+    def load_recent_ids(self, state:dict)->np.ndarray:
+        """
+        Binary ids of the ingested documents inside the overlap window of the watermark.
+        """
+        if state.get('recent_ids_file') is None:
+            return np.zeros(0, dtype="S12")
+        return np.load(os.path.join(self.data_ingestion_config.ingestion_store_dir, state['recent_ids_file']))
+
+
+    def save_recent_ids(self, state:dict, ids:np.ndarray):
+        """
+        Writes the ids to a new file, the state saved after it points to it.
+        """
+        file_name = f"{RECENT_IDS_PREFIX}{time.time_ns()}.npy"
+        os.makedirs(self.data_ingestion_config.ingestion_store_dir, exist_ok=True)
+        np.save(os.path.join(self.data_ingestion_config.ingestion_store_dir, file_name), ids)
+        state['recent_ids_file'] = file_name
+
+
+    @staticmethod
+    def id_timestamps(ids:np.ndarray)->np.ndarray:
+        """
+        Creation seconds of binary ObjectIds, their first 4 bytes.
+        """
+        head = ids.view(np.uint8).reshape(-1, 12)[:, :4].astype(np.int64)
+        return (head[:, 0] << 24) | (head[:, 1] << 16) | (head[:, 2] << 8) | head[:, 3]
+
+
+    @staticmethod
+    def is_test_record(ids:pd.Series, test_size:float)->np.ndarray:
+        """
+        Stable split: a record is in the test set when the md5 of its _id,
+        read as a fraction of 2**64, is below test_size. It never changes set.
+        """
+        fractions = [int.from_bytes(hashlib.md5(str(_id).encode()).digest()[:8], "big") / 2**64 for _id in ids]
+        return np.asarray(fractions) < test_size
+
+
     def initiate_data_ingestion(self)-> artifact_entity.DataIngestionArtifact:
+        """
+        Appends the documents added since the last run to the feature store.
+
+        Relies only on a document's ObjectId timestamp being at most
+        `watermark_overlap_seconds` older than the newest _id ingested when
+        it becomes visible. Clients with clocks within that skew can insert
+        concurrently. The _id order inside the window does not matter: the
+        window is fetched again each run, and ids ingested before are dropped.
+        Bulk loads write ids out of order over a longer time, so ingestion
+        waits for them to complete.
+        """
         try:
-            logging.info("Exporting Server data into a DataFrame")
-            data = get_collection_dataframe(database_name=self.data_ingestion_config.database_name, collection_name=self.data_ingestion_config.collection_name)
-
-            logging.info(f"Features of the Dataset Include: {data.columns}")
-            
-            cat_cols = [col for col in data.columns if data[col].dtype == 'O']
-            for col in cat_cols:
-                data[col] = data[col].apply(lambda x: x.strip())
-
-            data.replace(to_replace=['na', '?'], value=np.NAN, inplace=True)
-            # data.drop(['capital-loss','capital-gain','fnlwgt'], axis=1, inplace=True)
-            logging.info("Storing the raw files in the Feature Directory")
-            
-            feature_store_path = os.path.dirname(self.data_ingestion_config.feature_store_dir)
-            os.makedirs(feature_store_path, exist_ok=True)
-            data.to_csv(path_or_buf=self.data_ingestion_config.feature_store_dir, index=False, header=True)
-
-            logging.info("Splitting the Raw data for Model Building and Data Transformation")
-            train_df, test_df = train_test_split(data, test_size=self.data_ingestion_config.test_size, random_state=42)
-
-            train_data_path = os.path.dirname(self.data_ingestion_config.train_data_dir)
-            os.makedirs(train_data_path, exist_ok=True)
-
-            train_df.to_csv(path_or_buf=self.data_ingestion_config.train_data_dir, index=False, header=True)
-            test_df.to_csv(path_or_buf=self.data_ingestion_config.test_data_dir, index=False, header=True)
+            from bson import ObjectId
+
+            incomplete_loads = find_incomplete_loads(self.data_ingestion_config.bulk_load_checkpoint_dir, self.data_ingestion_config.database_name, self.data_ingestion_config.collection_name)
+            if len(incomplete_loads) > 0:
+                raise Exception(f"Bulk loads into {self.data_ingestion_config.collection_name} are not complete: {incomplete_loads}. "
+                                "Resume them with data_dump.py, or delete their checkpoints, before ingesting")
+
+            state = self.load_state()
+            self.rollback_partial_writes(state)
+            recent_ids = self.load_recent_ids(state)
+            # A state saved before the overlap window has no ids, everything up to its watermark is in
+            legacy_watermark = ObjectId(state['watermark']) if state['watermark'] is not None and 'recent_ids_file' not in state else None
+            overlap_seconds = self.data_ingestion_config.watermark_overlap_seconds
+            query = dict()
+            if state['watermark'] is not None:
+                window_start = ObjectId(state['watermark']).generation_time - timedelta(seconds=overlap_seconds)
+                logging.info(f"Fetching Documents added after the Watermark: {state['watermark']} || Overlap Window from: {window_start}")
+                query = {"_id": {"$gte": ObjectId.from_datetime(window_start)}}
+            else:
+                logging.info("No Watermark found, Fetching the whole Collection")
+
+            collection = get_collection(database_name=self.data_ingestion_config.database_name, collection_name=self.data_ingestion_config.collection_name)
+            chunks = iter_collection_chunks(collection, chunk_size=self.data_ingestion_config.chunk_size, batch_size=self.data_ingestion_config.cursor_batch_size,
+                                            query=query, include_id=True, sort_key="_id")
+
+            columns = state['columns']
+            n_new_rows, n_new_test_rows = 0, 0
+            new_ids = []
+            for chunk in chunks:
+                ids = chunk.pop("_id")
+                if state['watermark'] is None or ids.iloc[-1] > ObjectId(state['watermark']):
+                    state['watermark'] = str(ids.iloc[-1])
+                id_bytes = np.asarray([_id.binary for _id in ids], dtype="S12")
+                is_new = ~np.isin(id_bytes, recent_ids)
+                if legacy_watermark is not None:
+                    is_new &= np.asarray([_id > legacy_watermark for _id in ids], dtype=bool)
+                if not is_new.all():
+                    logging.info(f"Skipping {int((~is_new).sum())} Documents of the Overlap Window already ingested")
+                    chunk, ids, id_bytes = chunk[is_new].reset_index(drop=True), ids[is_new].reset_index(drop=True), id_bytes[is_new]
+                if len(chunk) == 0:
+                    continue
+                new_ids.append(id_bytes)
+                if columns is None:
+                    columns = list(chunk.columns)
+                    logging.info(f"Features of the Dataset Include: {columns}")
+                new_columns = [col for col in chunk.columns if col not in columns]
+                if len(new_columns) > 0:
+                    logging.info(f"Dropping Columns not in the Feature Store: {new_columns}")
+                chunk = compact_dtypes(self.clean_chunk(chunk.reindex(columns=columns)))
+
+                is_test = self.is_test_record(ids, self.data_ingestion_config.test_size)
+                part_name = f"part-{state['parts']:06d}.parquet"
+                write_feature_store_part(self.data_ingestion_config.feature_store_dir, part_name, chunk)
+                write_feature_store_part(self.data_ingestion_config.train_data_dir, part_name, chunk[~is_test])
+                write_feature_store_part(self.data_ingestion_config.test_data_dir, part_name, chunk[is_test])
+                state['parts'] += 1
+
+                n_new_rows += len(chunk)
+                n_new_test_rows += int(is_test.sum())
+                logging.info(f"Ingested Rows: {n_new_rows}")
+
+            if state['rows'] + n_new_rows == 0:
+                raise Exception(f"Collection: {self.data_ingestion_config.collection_name} is empty")
+
+            state['columns'] = columns
+            state['rows'] += n_new_rows
+            state['test_rows'] += n_new_test_rows
+            # Only the ids the next run's overlap window can return are kept
+            recent_ids = np.concatenate([recent_ids] + new_ids)
+            window_start = int(ObjectId(state['watermark']).generation_time.timestamp()) - overlap_seconds
+            previous_ids_file = state.get('recent_ids_file')
+            self.save_recent_ids(state, recent_ids[self.id_timestamps(recent_ids) >= window_start])
+            self.save_state(state)
+            if previous_ids_file is not None:
+                os.remove(os.path.join(self.data_ingestion_config.ingestion_store_dir, previous_ids_file))
+            logging.info(f"New Rows: {n_new_rows} || Data Rows: {state['rows']} || Train Rows: {state['rows']-state['test_rows']} || Test Rows: {state['test_rows']} || Watermark: {state['watermark']}")
 
             data_ingestion_artifact = artifact_entity.DataIngestionArtifact(
                 feature_store_dir=self.data_ingestion_config.feature_store_dir,
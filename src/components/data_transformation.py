@@ -5,12 +5,24 @@ from src.exception import CustomException
 from src.logger import logging 
 from src.entity import config_entity, artifact_entity
 from src import utils 
-from imblearn.combine import SMOTETomek
+from src.inference.compiled_transformer import compile_transformer, verify_compiled_transformer
+from src.components.resampling import resample, resolve_strategy
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, RobustScaler, LabelEncoder, OneHotEncoder, OrdinalEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 
+WORKCLASS_CATEGORIES = [
+    'State-gov', 'Self-emp-not-inc', 'Private', 'Federal-gov', 'Local-gov',
+    'Self-emp-inc', 'Without-pay', 'Never-worked'
+]
+
+EDUCATION_CATEGORIES = [
+    'Doctorate', 'Masters', 'Bachelors', 'HS-grad',  'Some-college', 'Assoc-acdm',
+    'Assoc-voc',  'Prof-school', '12th', '10th', '11th', '9th', '7th-8th',  '5th-6th',
+    '1st-4th', 'Preschool'
+]
+
 
 class DataTransformation:
 
@@ -22,7 +34,11 @@ class DataTransformation:
 
     
     @classmethod 
-    def get_data_transformer_obj(cls, num_cols, ordinal_cat_cols, nom_cat_cols, workclass_cat, education_cat)->ColumnTransformer:
+    def get_data_transformer_obj(cls, num_cols, ordinal_cat_cols, nom_cat_cols, workclass_cat, education_cat, sparse_one_hot:bool=False)->ColumnTransformer:
+        """
+        sparse_one_hot: leave the one hot columns unscaled, which the trees do
+                        not need, so the output is a sparse matrix
+        """
         try:
             numerical_pipeline = Pipeline(steps=[
                 ('impute', SimpleImputer(strategy='mean')),
@@ -35,17 +51,23 @@ class DataTransformation:
                 ('scale', RobustScaler())
             ])
 
-            nominal_cat_pipeline = Pipeline(steps=[
-                ('impute', SimpleImputer(strategy='most_frequent')),
-                ('encode', OneHotEncoder(handle_unknown='ignore', sparse=False)),
-                ('scaler', RobustScaler())
-            ])
+            if sparse_one_hot:
+                nominal_cat_pipeline = Pipeline(steps=[
+                    ('impute', SimpleImputer(strategy='most_frequent')),
+                    ('encode', OneHotEncoder(handle_unknown='ignore', dtype=np.float32))
+                ])
+            else:
+                nominal_cat_pipeline = Pipeline(steps=[
+                    ('impute', SimpleImputer(strategy='most_frequent')),
+                    ('encode', OneHotEncoder(handle_unknown='ignore', sparse=False)),
+                    ('scaler', RobustScaler())
+                ])
 
             preprocessor = ColumnTransformer(transformers=[
                 ('numerical', numerical_pipeline, num_cols),
                 ('ordinal_enc', ordinal_cat_pipeline, ordinal_cat_cols),
                 ('nominal_enc', nominal_cat_pipeline, nom_cat_cols)
-            ])
+            ], sparse_threshold=1.0 if sparse_one_hot else 0.3)
 
             return preprocessor
                      
@@ -56,8 +78,8 @@ class DataTransformation:
         try:
             logging.info(f"{'='*20} Data Transformation {'='*20}")
             logging.info("Reading the Training and Testing Data")
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_dir)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_dir)
+            train_df = utils.read_feature_store(self.data_ingestion_artifact.train_file_dir)
+            test_df = utils.read_feature_store(self.data_ingestion_artifact.test_file_dir)
             logging.info(f"Training Data Columns: {train_df.columns} || Testing Data Size: {test_df.shape}")    
 
 
@@ -86,56 +108,57 @@ class DataTransformation:
             logging.info("Passing the Input Data into Transformer")
 
             ordinal_cat_cols = ['workclass', 'education']
-            numerical_features = input_train_df.select_dtypes(exclude='object').columns
+            # String features are stored as categoricals, so only number dtypes are numerical
+            numerical_features = input_train_df.select_dtypes(include='number').columns
             nom_cat_features = [col for col in input_train_df.columns if col not in numerical_features and col not in ordinal_cat_cols]
             logging.info(f"Numerical Features: {numerical_features} | Nominal Features {nom_cat_features} | Ordinal Features: {ordinal_cat_cols}")
             logging.info(train_df.head)
             
             
-            workclass_cat = [
-                'State-gov', 'Self-emp-not-inc', 'Private', 'Federal-gov', 'Local-gov',
-                                'Self-emp-inc', 'Without-pay', 'Never-worked'
-            ]
-
-            education_cat = [
-                'Doctorate', 'Masters', 'Bachelors', 'HS-grad',  'Some-college', 'Assoc-acdm',
-                'Assoc-voc',  'Prof-school', '12th', '10th', '11th', '9th', '7th-8th',  '5th-6th',
-                '1st-4th', 'Preschool'
-            ]
-
-            transformation_pipeline = DataTransformation.get_data_transformer_obj(num_cols=numerical_features, ordinal_cat_cols=ordinal_cat_cols, nom_cat_cols=nom_cat_features, workclass_cat=workclass_cat, education_cat=education_cat)
+            workclass_cat = WORKCLASS_CATEGORIES
+            education_cat = EDUCATION_CATEGORIES
+
+            config = self.data_transformation_config
+            transformation_pipeline = DataTransformation.get_data_transformer_obj(num_cols=numerical_features, ordinal_cat_cols=ordinal_cat_cols, nom_cat_cols=nom_cat_features, workclass_cat=workclass_cat, education_cat=education_cat, sparse_one_hot=config.sparse_one_hot)
             transformation_pipeline.fit(input_train_df)
-            input_train_arr = transformation_pipeline.transform(input_train_df)
-            input_test_arr = transformation_pipeline.transform(input_test_df)
+            input_train_arr = utils.as_feature_matrix(transformation_pipeline.transform(input_train_df), dtype=config.feature_dtype)
+            input_test_arr = utils.as_feature_matrix(transformation_pipeline.transform(input_test_df), dtype=config.feature_dtype)
             logging.info(f"Shape of Data before Sampling: {input_train_arr.shape}")
             
-            logging.info("Resampling the Dataset to generate samples for Minority class")
-            smt = SMOTETomek(sampling_strategy='minority', random_state=10, n_jobs=-1)
-            
+            resampling_strategy = resolve_strategy(config.resampling_strategy, len(train_target_arr), config.resampling_exact_max_rows)
+            logging.info(f"Resampling the Dataset to generate samples for Minority class || Strategy: {resampling_strategy}")
+            resample_params = dict(strategy=resampling_strategy, block_size=config.resampling_block_size, random_state=10, n_workers=config.resampling_workers)
+
             logging.info(f"Before Resampling - Train Data: {input_train_arr.shape}, Target Data: {train_target_arr.shape}")
-            train_input_arr, target_train_arr = smt.fit_resample(input_train_arr, train_target_arr)
-            logging.info(f"After Resampling - Train Data: {train_input_arr.shape} || Target Data: {target_train_arr.shape}")
+            train_input_arr, target_train_arr, class_weights = resample(input_train_arr, train_target_arr, **resample_params)
+            logging.info(f"After Resampling - Train Data: {train_input_arr.shape} || Target Data: {target_train_arr.shape} || Class Weights: {class_weights}")
 
             logging.info(f"Before Resampling - Test Data: {input_test_arr.shape}, Target Data: {test_target_arr.shape}")
-            test_input_arr, target_test_arr = smt.fit_resample(input_test_arr, test_target_arr)
+            test_input_arr, target_test_arr, _ = resample(input_test_arr, test_target_arr, **resample_params)
             logging.info(f"After Resampling - Test Data: {test_input_arr.shape} || Test Data: {target_test_arr.shape}")
 
-            train_arr = np.c_[train_input_arr, target_train_arr]
-            test_arr = np.c_[test_input_arr, target_test_arr]
-            logging.info(f"Dataset after Joining with the Transformed Output: {train_arr.shape}")
-            # logging.info(f"Saving the Processed Data: {pd.DataFrame(data=train_input_arr, columns=transformation_pipeline.feature_names_in_).head()}")
-            utils.save_numpy_data(file_dir=self.data_transformation_config.transform_train_dir, array=train_arr)
-            utils.save_numpy_data(file_dir=self.data_transformation_config.transform_test_dir, array=test_arr)
+            # Features and labels are saved apart, joining them would copy the matrix
+            feature_names = list(transformation_pipeline.get_feature_names_out())
+            utils.save_feature_matrix(dir_path=self.data_transformation_config.transform_train_dir, features=train_input_arr, target=target_train_arr, feature_names=feature_names, target_column=config.target_column)
+            utils.save_feature_matrix(dir_path=self.data_transformation_config.transform_test_dir, features=test_input_arr, target=target_test_arr, feature_names=feature_names, target_column=config.target_column)
 
             logging.info("Saving the Preprocessor Object and Target Encoder")
             utils.save_object(file_dir=self.data_transformation_config.transform_obj_dir, obj=transformation_pipeline)
             utils.save_object(file_dir=self.data_transformation_config.target_encoder_dir, obj=label)
 
+            logging.info("Compiling the Preprocessor for Inference and Checking Parity on the Test Data")
+            compiled_transformer = compile_transformer(transformation_pipeline)
+            max_diff = verify_compiled_transformer(transformation_pipeline, compiled_transformer, input_test_df)
+            logging.info(f"Compiled Preprocessor Output Features: {compiled_transformer.n_features_out} || Max Abs Difference: {max_diff}")
+            utils.save_object(file_dir=self.data_transformation_config.compiled_transform_obj_dir, obj=compiled_transformer)
+
             data_transformation_artifact = artifact_entity.DataTransformationArtifacts(
                 transform_obj_dir=self.data_transformation_config.transform_obj_dir,
                 transform_train_dir=self.data_transformation_config.transform_train_dir,
                 transform_test_dir=self.data_transformation_config.transform_test_dir,
-                target_encoder_dir=self.data_transformation_config.target_encoder_dir
+                target_encoder_dir=self.data_transformation_config.target_encoder_dir,
+                compiled_transform_obj_dir=self.data_transformation_config.compiled_transform_obj_dir,
+                class_weights=class_weights
             )
             logging.info(f"{'='*20} Exiting Data Transformation {'='*20}")
             return data_transformation_artifact
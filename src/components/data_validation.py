@@ -1,11 +1,14 @@
-import os, sys 
-import numpy as np 
-import pandas as pd 
-from typing import Optional
-from scipy.stats import ks_2samp
+import os, sys
+import json
+import time
+import pandas as pd
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
 from src.logger import logging
 from  src.exception import CustomException
-from src.utils import write_yaml_file
+from src.inference.cleaning import clean_frame
+from src.components.reference_profile import profile_frame, merge_profiles, profile_columns, column_drift
+from src.utils import write_yaml_file, iter_feature_store, get_feature_store_columns
 from src.entity import config_entity, artifact_entity
 
 
@@ -17,42 +20,100 @@ class DataValidation:
         self.data_validation_config = data_validation_config
         self.data_ingestion_artifact = data_ingestion_artifact
         self.validation_error = dict()
+        self.check_timings = dict()
 
-    def drop_missing_value_columns(self, df:pd.DataFrame, report_key:str):
+    @staticmethod
+    def run_check(column:str, check:Callable, *args):
+        start = time.perf_counter()
+        result = check(*args)
+        return column, result, time.perf_counter() - start
+
+    def record_timing(self, check_name:str, column:str, seconds:float):
+        timings = self.check_timings.setdefault(check_name, dict())
+        timings[column] = timings.get(column, 0.0) + seconds
+
+    def get_reference_profile(self)->dict:
+        """
+        Profile of the base dataset, built once and rebuilt only when the
+        base file changes.
+        """
+        try:
+            base_file_dir = self.data_validation_config.base_file_dir
+            profile_dir = self.data_validation_config.reference_profile_dir
+            base_stat = os.stat(base_file_dir)
+            fingerprint = {'base_file': os.path.abspath(base_file_dir), 'size': base_stat.st_size, 'mtime_ns': base_stat.st_mtime_ns}
+
+            if os.path.exists(profile_dir):
+                with open(profile_dir) as file_obj:
+                    reference_profile = json.load(file_obj)
+                if reference_profile.get('fingerprint') == fingerprint:
+                    return reference_profile
+                logging.info(f"Base Dataset: {base_file_dir} changed, Rebuilding the Reference Profile")
+
+            logging.info(f"Building the Reference Profile of the Base Dataset: {base_file_dir}")
+            base_df = clean_frame(pd.read_csv(base_file_dir))
+            reference_profile = profile_frame(base_df)
+            reference_profile['fingerprint'] = fingerprint
+
+            os.makedirs(os.path.dirname(profile_dir) or ".", exist_ok=True)
+            with open(f"{profile_dir}.tmp", "w") as file_obj:
+                json.dump(reference_profile, file_obj)
+            os.replace(f"{profile_dir}.tmp", profile_dir)
+            return reference_profile
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def profile_feature_store(self, store_dir:str, columns:list, reference_profile:dict, executor:ThreadPoolExecutor, check_name:str)->dict:
+        """
+        Counts of the stored data on the reference bins. Parts are read one at
+        a time and their columns profiled concurrently on the shared frame.
+        """
+        try:
+            profiles = []
+            for df in iter_feature_store(store_dir, columns=columns):
+                futures = [executor.submit(self.run_check, col, profile_frame, df[[col]], reference_profile) for col in columns]
+                profile = {'rows': len(df), 'columns': dict()}
+                for future in futures:
+                    col, column_profile, seconds = future.result()
+                    profile['columns'][col] = column_profile['columns'][col]
+                    self.record_timing(check_name, col, seconds)
+                profiles.append(profile)
+            return merge_profiles(profiles)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def drop_missing_value_columns(self, profile:dict, report_key:str)->Optional[dict]:
         """
         Drop Columns with Missing values over the threshold parameter
 
-        df: Dataframe Input Variable
+        profile: counts of the dataset, see reference_profile.profile_frame
         threshold: Percentage criteria to drop a column
-        returns Pandas DataFrame
+        returns the profile without the dropped columns
         ===============================================
-        
+
 
         """
         try:
             threshold = self.data_validation_config.missing_values_threshold
-            missing_value_report = df.isnull().sum()
-            
-            drop_columns_list = missing_value_report[missing_value_report > threshold].index
+            drop_columns_list = [col for col, column in profile['columns'].items() if column['nulls'] > threshold]
             logging.info(f"Filtering Columns with Null values above threshold: {threshold}, Columns: {drop_columns_list}")
-            df.drop(drop_columns_list, axis=1, inplace=True)
-            if len(df.columns) == 0:
+            profile = profile_columns(profile, [col for col in profile['columns'] if col not in drop_columns_list])
+            if len(profile['columns']) == 0:
                 logging.info("Dataset does not meet the minimum criteria")
-                return None 
-            return df 
+                return None
+            return profile
         except Exception as e:
             raise CustomException(e, sys)
 
-    def is_required_columns_exists(self, base_df: pd.DataFrame, current_df:pd.DataFrame, report_key:str)-> bool:
+    def is_required_columns_exists(self, base_columns:list, current_columns:list, report_key:str)-> bool:
         try:
-            base_columns = base_df.columns 
-            current_columns = current_df.columns 
             missing_columns = []
 
             for column in base_columns:
                 if column not in current_columns:
                     missing_columns.append(column)
-            
+
             if len(missing_columns) > 0:
                 self.validation_error[report_key] = missing_columns
                 return False
@@ -61,65 +122,65 @@ class DataValidation:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def data_drift(self, base_df: pd.DataFrame, current_df:pd.DataFrame, report_key:str):
+    def data_drift(self, base_profile:dict, current_profile:dict, report_key:str, executor:ThreadPoolExecutor):
         try:
             drift_rec = dict()
-            base_columns = base_df.columns 
-            current_columns = current_df.columns
-            for column in base_columns:
-                base_data, current_data = base_df[column], current_df[column]
-                column_distribution = ks_2samp(base_data, current_data)
-
-                if column_distribution.pvalue > 0.05:
-                    drift_rec[column] = {
-                        'p_value': column_distribution.pvalue,
-                        'same_distribution': True
-                    }
-                else:
-                    drift_rec[column] = {
-                        'p_value': column_distribution.pvalue,
-                        'same_distribution': False
-                    }
-                self.validation_error[report_key] = drift_rec
+            futures = [executor.submit(self.run_check, column, column_drift, reference_column, current_profile['columns'][column])
+                       for column, reference_column in base_profile['columns'].items()]
+            for future in futures:
+                column, column_distribution, seconds = future.result()
+                self.record_timing(report_key, column, seconds)
+                p_value = column_distribution['p_value']
+                drift_rec[column] = {
+                    **column_distribution,
+                    'same_distribution': p_value is None or p_value > 0.05
+                }
+            self.validation_error[report_key] = drift_rec
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    
+
     def initiate_data_validation(self)-> artifact_entity.DataValidationArtifact:
         try:
-            base_df = pd.read_csv(self.data_validation_config.base_file_dir)
-            cat_cols = [col for col in base_df.columns if base_df[col].dtype == 'O']
-            for col in cat_cols:
-                base_df[col] = base_df[col].apply(lambda x: x.strip())
-            base_df.replace(to_replace=['na', '?'], value=np.NAN, inplace=True)
+            reference_profile = self.get_reference_profile()
             logging.info("Validating the Missing Values Against the Base Dataset")
-            base_df = self.drop_missing_value_columns(df=base_df, report_key='missing_values_base')
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_dir)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_dir)
-
-            logging.info("Validating the Missing Values Against the Train Dataset")
-            train_df = self.drop_missing_value_columns(df=train_df, report_key='missing_values_train')
-            logging.info("Validating the Missing Values Against the Test Dataset")
-            test_df = self.drop_missing_value_columns(df=test_df, report_key='missing_values_test')
-
-            logging.info("Validating the Features of the Dataset")
-            train_status = self.is_required_columns_exists(base_df=base_df, current_df=train_df, report_key='missing+columns_train')
-            test_status = self.is_required_columns_exists(base_df=base_df, current_df=test_df, report_key='missing+columns_test')
-
-            if train_status:
-                self.data_drift(base_df=base_df, current_df=train_df, report_key='data_drift_train')
-            if test_status:
-                self.data_drift(base_df=base_df, current_df=test_df, report_key='data_drift_test')
+            base_profile = self.drop_missing_value_columns(profile=reference_profile, report_key='missing_values_base')
+            # Only the columns of the base dataset are validated, the rest are not read
+            store_columns = get_feature_store_columns(self.data_ingestion_artifact.train_file_dir)
+            columns = [col for col in base_profile['columns'] if col in store_columns]
+
+            # Threads share the loaded frames, the column work runs in pandas and
+            # numpy code that releases the GIL. The train and test splits are
+            # profiled side by side on their own threads feeding the column pool.
+            n_workers = self.data_validation_config.n_workers
+            with ThreadPoolExecutor(max_workers=n_workers) as executor, ThreadPoolExecutor(max_workers=2) as split_executor:
+                train_future = split_executor.submit(self.profile_feature_store, self.data_ingestion_artifact.train_file_dir, columns, reference_profile, executor, 'profile_train')
+                test_future = split_executor.submit(self.profile_feature_store, self.data_ingestion_artifact.test_file_dir, columns, reference_profile, executor, 'profile_test')
+                train_profile, test_profile = train_future.result(), test_future.result()
+
+                logging.info("Validating the Missing Values Against the Train Dataset")
+                train_profile = self.drop_missing_value_columns(profile=train_profile, report_key='missing_values_train')
+                logging.info("Validating the Missing Values Against the Test Dataset")
+                test_profile = self.drop_missing_value_columns(profile=test_profile, report_key='missing_values_test')
+
+                logging.info("Validating the Features of the Dataset")
+                train_status = self.is_required_columns_exists(base_columns=list(base_profile['columns']), current_columns=list(train_profile['columns']), report_key='missing+columns_train')
+                test_status = self.is_required_columns_exists(base_columns=list(base_profile['columns']), current_columns=list(test_profile['columns']), report_key='missing+columns_test')
+
+                if train_status:
+                    self.data_drift(base_profile=base_profile, current_profile=train_profile, report_key='data_drift_train', executor=executor)
+                if test_status:
+                    self.data_drift(base_profile=base_profile, current_profile=test_profile, report_key='data_drift_test', executor=executor)
 
             logging.info("Composing the Validation Report..")
+            self.validation_error['check_timings_s'] = self.check_timings
             write_yaml_file(file_path=self.data_validation_config.report_file_dir, data=self.validation_error)
             data_validation_artifact = artifact_entity.DataValidationArtifact(report_file_dir=self.data_validation_config.report_file_dir)
 
             logging.info(f"{'='*20} Exiting Data Validation {'='*20}")
-            return data_validation_artifact    
+            return data_validation_artifact
 
 
-        except Exception as e: 
+        except Exception as e:
             raise CustomException(e, sys)
-
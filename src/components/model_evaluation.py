@@ -2,10 +2,11 @@ from src.components.model_resolver import ModelResolver
 from src.entity import config_entity, artifact_entity
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import load_object
+from src.utils import load_object, iter_feature_store
+from src.inference.binary_bundle import MANIFEST_FILE_NAME, load_binary_bundle
 from sklearn.metrics import f1_score 
+import numpy as np
 import os, sys 
-import pandas as pd 
 
 class ModelEvaluation:
 
@@ -29,38 +30,44 @@ class ModelEvaluation:
                 return model_eval_artifact
             
             logging.info("Loading Model, Transformer and Target_Encoder for the Saved Model.")
-            model_path = self.model_resolver.get_latest_model_path()
-            transformer_path = self.model_resolver.get_latest_transformer_path()
-            target_enc_path = self.model_resolver.get_latest_target_encoder_path()
+            bundle_dir = self.model_resolver.get_bundle_dir(self.model_resolver.get_latest_version())
+            if os.path.exists(os.path.join(bundle_dir, MANIFEST_FILE_NAME)):
+                # The CatBoost model itself, so both scores come from the same predict
+                model, transformer, target_encoder = load_binary_bundle(bundle_dir)
+            else:
+                model_path = self.model_resolver.get_latest_model_path()
+                transformer_path = self.model_resolver.get_latest_transformer_path()
+                target_enc_path = self.model_resolver.get_latest_target_encoder_path()
 
-            model = load_object(file_dir=model_path)
-            transformer = load_object(file_dir=transformer_path)
-            target_encoder = load_object(file_dir=target_enc_path)
+                model = load_object(file_dir=model_path)
+                transformer = load_object(file_dir=transformer_path)
+                target_encoder = load_object(file_dir=target_enc_path)
 
             current_model = load_object(file_dir=self.model_trainer_artifact.model_dir)
             current_transformer = load_object(file_dir=self.data_transformation_artifact.transform_obj_dir)
             current_target_encoder = load_object(file_dir=self.data_transformation_artifact.target_encoder_dir)
 
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_dir)
-            target_df = test_df[self.model_eval_config.target_column]
-            y_true = target_encoder.transform(target_df)
+            columns = list(dict.fromkeys(list(transformer.feature_names_in_) + list(current_transformer.feature_names_in_) + [self.model_eval_config.target_column]))
+            input_feature_names = list(transformer.feature_names_in_)
+            current_input_feature_names = list(current_transformer.feature_names_in_)
+            logging.info(f"FEATURES:{input_feature_names} || Current FEATURES:{current_input_feature_names}")
+
+            # The test split is scored one feature store part at a time, so
+            # only a part's rows and transformed matrix are in memory at once
+            saved_true, saved_pred, current_true, current_pred = [], [], [], []
+            for test_df in iter_feature_store(self.data_ingestion_artifact.test_file_dir, columns=columns):
+                target_df = test_df[self.model_eval_config.target_column]
+                saved_true.append(target_encoder.transform(target_df))
+                saved_pred.append(np.asarray(model.predict(transformer.transform(test_df[input_feature_names]))).ravel())
+                current_true.append(current_target_encoder.transform(target_df))
+                current_pred.append(np.asarray(current_model.predict(current_transformer.transform(test_df[current_input_feature_names]))).ravel())
 
             logging.info("Accuracy Test: Model in Saved Model")
-            input_feature_names = list(transformer.feature_names_in_)
-            logging.info(f"FEATURES:{input_feature_names}")
-            input_arr = transformer.transform(test_df[input_feature_names])
-            y_pred = model.predict(input_arr)
-            saved_model_score = f1_score(y_true=y_true, y_pred=y_pred)
+            saved_model_score = f1_score(y_true=np.concatenate(saved_true), y_pred=np.concatenate(saved_pred))
             logging.info(f"Accuracy Score for Saved Model: {saved_model_score}")
 
             logging.info("Accuracy Test for Model in Testnet")
-            input_feature_names = list(current_transformer.feature_names_in_)
-            logging.info(f"Current FEATURES:{input_feature_names}")
-
-            y_true = current_target_encoder.transform(target_df)
-            input_arr = current_transformer.transform(test_df[input_feature_names])
-            y_pred = current_model.predict(input_arr)
-            current_model_score = f1_score(y_pred=y_pred, y_true=y_true)
+            current_model_score = f1_score(y_pred=np.concatenate(current_pred), y_true=np.concatenate(current_true))
             logging.info(f"Accuracy Score for Model in Testnet: {current_model_score}")
 
             if current_model_score <= saved_model_score:
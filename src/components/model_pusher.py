@@ -3,6 +3,7 @@ from src.logger import logging
 from src.exception import CustomException
 from src.components.model_resolver import ModelResolver
 from src.utils import load_object, save_object
+from src.inference.binary_bundle import save_binary_bundle
 from src.entity.config_entity import ModelPusherConfig
 from src.entity.artifact_entity import ModelPusherArtifact, ModelTrainerArtifact, DataTransformationArtifacts
 
@@ -19,19 +20,36 @@ class ModelPusher:
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         try:
             transformer = load_object(file_dir=self.data_transformation_artifact.transform_obj_dir)
+            compiled_transformer = load_object(file_dir=self.data_transformation_artifact.compiled_transform_obj_dir)
             model = load_object(file_dir=self.model_trainer_artifact.model_dir)
+            tree_model = None
+            if os.path.exists(self.model_trainer_artifact.tree_model_dir):
+                tree_model = load_object(file_dir=self.model_trainer_artifact.tree_model_dir)
             target_encoder = load_object(file_dir=self.data_transformation_artifact.target_encoder_dir)
 
             save_object(file_dir=self.model_pusher_config.pusher_model_path, obj=model)
+            if tree_model is not None:
+                save_object(file_dir=self.model_pusher_config.pusher_tree_model_path, obj=tree_model)
             save_object(file_dir=self.model_pusher_config.pusher_transformer_path, obj=transformer)
+            save_object(file_dir=self.model_pusher_config.pusher_compiled_transformer_path, obj=compiled_transformer)
             save_object(file_dir=self.model_pusher_config.pusher_target_enc_path, obj=target_encoder)
+            save_binary_bundle(bundle_dir=self.model_pusher_config.pusher_bundle_dir, model=model, transformer=compiled_transformer, target_encoder=target_encoder, tree_model=tree_model)
 
             transformer_path = self.model_resolver.get_latest_save_transformer_path()
+            compiled_transformer_path = self.model_resolver.get_latest_save_compiled_transformer_path()
             model_path = self.model_resolver.get_latest_save_model_path()
+            tree_model_path = self.model_resolver.get_latest_save_tree_model_path()
             target_enc_path = self.model_resolver.get_latest_save_target_encoder_path()
+            bundle_dir = self.model_resolver.get_latest_save_bundle_dir()
 
+            # Pickles are kept next to the binary bundle for tools that still read them
+            logging.info(f"Saving the Binary Bundle: {bundle_dir}")
+            save_binary_bundle(bundle_dir=bundle_dir, model=model, transformer=compiled_transformer, target_encoder=target_encoder, tree_model=tree_model)
             save_object(file_dir=transformer_path, obj=transformer)
+            save_object(file_dir=compiled_transformer_path, obj=compiled_transformer)
             save_object(file_dir=model_path, obj=model)
+            if tree_model is not None:
+                save_object(file_dir=tree_model_path, obj=tree_model)
             save_object(file_dir=target_enc_path, obj=target_encoder)
 
             model_pusher_artifact = ModelPusherArtifact(
@@ -2,20 +2,22 @@ import os, sys
 from typing import Optional 
 from src.logger import logging 
 from src.exception import CustomException
-from src.entity.config_entity import TRANSFORMER_OBJ_FILE_NAME, MODEL_FILE_NAME, TARGET_ENCODER_OBJ_FILE_NAME
+from src.entity.config_entity import TRANSFORMER_OBJ_FILE_NAME, COMPILED_TRANSFORMER_OBJ_FILE_NAME, MODEL_FILE_NAME, TREE_MODEL_FILE_NAME, TARGET_ENCODER_OBJ_FILE_NAME
 
 class ModelResolver:
     
     def __init__(self,model_registry:str = "saved_models",
                 transformer_dir_name="transformer",
                 target_encoder_dir_name = "target_encoder",
-                model_dir_name = "model"):
+                model_dir_name = "model",
+                bundle_dir_name = "bundle"):
 
         self.model_registry=model_registry
         os.makedirs(self.model_registry,exist_ok=True)
         self.transformer_dir_name = transformer_dir_name
         self.target_encoder_dir_name=target_encoder_dir_name
         self.model_dir_name=model_dir_name
+        self.bundle_dir_name=bundle_dir_name
 
 
     def get_latest_dir_path(self)->Optional[str]:
@@ -29,6 +31,36 @@ class ModelResolver:
         except Exception as e:
             raise e
 
+    def get_latest_version(self)->Optional[int]:
+        try:
+            latest_dir = self.get_latest_dir_path()
+            if latest_dir is None:
+                return None
+            return int(os.path.basename(latest_dir))
+        except Exception as e:
+            raise e
+
+    def get_version_dir_path(self, version:int)->str:
+        return os.path.join(self.model_registry,f"{version}")
+
+    def get_model_path(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.model_dir_name,MODEL_FILE_NAME)
+
+    def get_tree_model_path(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.model_dir_name,TREE_MODEL_FILE_NAME)
+
+    def get_transformer_path(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.transformer_dir_name,TRANSFORMER_OBJ_FILE_NAME)
+
+    def get_compiled_transformer_path(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.transformer_dir_name,COMPILED_TRANSFORMER_OBJ_FILE_NAME)
+
+    def get_target_encoder_path(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.target_encoder_dir_name,TARGET_ENCODER_OBJ_FILE_NAME)
+
+    def get_bundle_dir(self, version:int)->str:
+        return os.path.join(self.get_version_dir_path(version),self.bundle_dir_name)
+
     def get_latest_model_path(self):
         try:
             latest_dir = self.get_latest_dir_path()
@@ -74,6 +106,13 @@ class ModelResolver:
         except Exception as e:
             raise e
 
+    def get_latest_save_tree_model_path(self):
+        try:
+            latest_dir = self.get_latest_save_dir_path()
+            return os.path.join(latest_dir,self.model_dir_name,TREE_MODEL_FILE_NAME)
+        except Exception as e:
+            raise e
+
     def get_latest_save_transformer_path(self):
         try:
             latest_dir = self.get_latest_save_dir_path()
@@ -81,6 +120,20 @@ class ModelResolver:
         except Exception as e:
             raise e
 
+    def get_latest_save_compiled_transformer_path(self):
+        try:
+            latest_dir = self.get_latest_save_dir_path()
+            return os.path.join(latest_dir,self.transformer_dir_name,COMPILED_TRANSFORMER_OBJ_FILE_NAME)
+        except Exception as e:
+            raise e
+
+    def get_latest_save_bundle_dir(self):
+        try:
+            latest_dir = self.get_latest_save_dir_path()
+            return os.path.join(latest_dir,self.bundle_dir_name)
+        except Exception as e:
+            raise e
+
     def get_latest_save_target_encoder_path(self):
         try:
             latest_dir = self.get_latest_save_dir_path()
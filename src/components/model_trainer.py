@@ -3,15 +3,19 @@ from src.entity import config_entity, artifact_entity
 from src.exception import CustomException
 from src.logger import logging 
 from src import utils 
+from src.inference.oblivious_trees import export_oblivious_trees, verify_oblivious_trees
 from typing import Optional 
 from sklearn.metrics import f1_score 
 import pandas as pd 
 import numpy as np 
+from scipy import sparse
 from catboost import CatBoostClassifier
 from xgboost import XGBClassifier
 from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
 
 
+VERIFY_ROWS = 10000
+
 
 class ModelTrainer: 
 
@@ -24,9 +28,9 @@ class ModelTrainer:
         self.data_transformation_artifact = data_transformation_artifact
 
 
-    def train_model(self, X, y):
+    def train_model(self, X, y, class_weights:Optional[list]=None):
         try:
-            clf = CatBoostClassifier(iterations=1000, learning_rate=0.1, depth=8, l2_leaf_reg=3)
+            clf = CatBoostClassifier(iterations=1000, learning_rate=0.1, depth=8, l2_leaf_reg=3, class_weights=class_weights)
             # clf = XGBClassifier(n_estimators=200,learning_rate=0.1,max_depth=3,reg_lambda=1)
             clf.fit(X, y)
             return clf 
@@ -34,27 +38,45 @@ class ModelTrainer:
             CustomException(e, sys)
 
 
+    def predict_in_chunks(self, model, dir_path:str):
+        """
+        Predictions and labels of a saved split, scored chunk by chunk from
+        the memory mapped arrays.
+        returns y_true, y_pred
+        """
+        try:
+            y_true, y_pred = [], []
+            for X_chunk, y_chunk in utils.iter_feature_matrix_chunks(dir_path, chunk_size=self.model_trainer_config.predict_chunk_size):
+                # Sliced CSR rows are already a copy, a dense slice is a read-only view of the map
+                X_chunk = X_chunk if sparse.issparse(X_chunk) else np.array(X_chunk)
+                y_true.append(np.array(y_chunk))
+                y_pred.append(np.asarray(model.predict(X_chunk)).ravel())
+            return np.concatenate(y_true), np.concatenate(y_pred)
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def initiate_model_trainer(self, )-> artifact_entity.ModelTrainerArtifact:
         try:
             logging.info("Loading the Transformed Data for Model Trainer")
-            train_df = utils.load_numpy_obj(self.data_transformation_artifact.transform_train_dir)
-            test_df = utils.load_numpy_obj(self.data_transformation_artifact.transform_test_dir)
-            logging.info(f"Shape of Train Data: {train_df.shape} || Shape of Test Data: {test_df.shape} \n")
-
-            logging.info("Splitting the Train and Test data ")
-            X_train, y_train = train_df[:,:-1], train_df[:,-1]
-            X_test, y_test = test_df[:,:-1], test_df[:,-1]
-
-            model = self.train_model(X=X_train, y=y_train)
+            train_dir = self.data_transformation_artifact.transform_train_dir
+            test_dir = self.data_transformation_artifact.transform_test_dir
+            # CatBoost gets writable arrays: fit builds its own copy of the data
+            # anyway, and its loaders are not relied on to take read-only buffers.
+            # Scoring and the test split stay memory mapped and are copied chunk by chunk.
+            X_train, y_train = utils.load_feature_matrix(train_dir, mmap_mode=None)
+            X_test, _ = utils.load_feature_matrix(test_dir)
+            logging.info(f"Shape of Train Data: {X_train.shape} || Shape of Test Data: {X_test.shape} \n")
+
+            model = self.train_model(X=X_train, y=y_train, class_weights=self.data_transformation_artifact.class_weights)
             logging.info(f"Model is trained on these features: {model.feature_names_}")
             
             logging.info("Computing th F1_score for Train Data")
-            y_train_pred = model.predict(X_train)
-            f1_train_score = f1_score(y_true=y_train, y_pred=y_train_pred)
+            y_train_true, y_train_pred = self.predict_in_chunks(model, train_dir)
+            f1_train_score = f1_score(y_true=y_train_true, y_pred=y_train_pred)
 
             logging.info("Computing th F1_score for Test Data")
-            y_test_pred = model.predict(X_test)
-            f1_test_score = f1_score(y_true=y_test, y_pred=y_test_pred)
+            y_test_true, y_test_pred = self.predict_in_chunks(model, test_dir)
+            f1_test_score = f1_score(y_true=y_test_true, y_pred=y_test_pred)
 
             logging.info(f"F1 Score: Train Data- {f1_train_score} || Test Data- {f1_test_score}")
             logging.info("Checking for Overfitting and Underfitting Conditions")
@@ -66,10 +88,23 @@ class ModelTrainer:
                 raise Exception(f"Difference {abs(f1_train_score-f1_test_score)} > Threshold: {self.model_trainer_config.overfitting_thresh}")
 
             utils.save_object(file_dir=self.model_trainer_config.model_dir, obj=model)
+
+            logging.info("Exporting the Oblivious Trees for Serving and Checking Parity on the Test Data")
+            try:
+                tree_model = export_oblivious_trees(model)
+                # The tree evaluator takes dense rows, as served
+                X_verify = X_test[:VERIFY_ROWS]
+                max_diff = verify_oblivious_trees(model, tree_model, X_verify.toarray() if sparse.issparse(X_verify) else np.array(X_verify))
+                logging.info(f"Exported Trees: {tree_model.tree_count} || Max Abs Probability Difference: {max_diff}")
+                utils.save_object(file_dir=self.model_trainer_config.tree_model_dir, obj=tree_model)
+            except ValueError as e:
+                logging.info(f"Serving will use the CatBoost Model, Tree Export failed: {e}")
+
             model_trainer_artifact = artifact_entity.ModelTrainerArtifact(
                 model_dir=self.model_trainer_config.model_dir,
                 f1_train_score= f1_train_score,
-                f1_test_score= f1_test_score
+                f1_test_score= f1_test_score,
+                tree_model_dir=self.model_trainer_config.tree_model_dir
             )
 
             return model_trainer_artifact
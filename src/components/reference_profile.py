@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional
+from scipy.special import kolmogorov
+from scipy.stats import chi2_contingency
+
+NUMERIC_COLUMN = "numeric"
+CATEGORICAL_COLUMN = "categorical"
+N_QUANTILES = 100
+PSI_FLOOR = 1e-4
+
+
+def _numeric_values(series:pd.Series)->np.ndarray:
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    return values[~np.isnan(values)]
+
+
+def profile_frame(df:pd.DataFrame, reference:Optional[dict]=None)->dict:
+    """
+    Counts summarizing `df`: per column the null count plus bin counts over
+    quantile edges for numerics or a frequency table for categoricals.
+    Without a reference the edges are the quantiles of `df` itself, with one
+    the reference edges and column kinds are used so the counts compare.
+    """
+    columns = dict()
+    for col in df.columns:
+        series = df[col]
+        reference_column = None if reference is None else reference['columns'].get(col)
+        if reference_column is not None:
+            kind = reference_column['kind']
+        else:
+            kind = NUMERIC_COLUMN if pd.api.types.is_numeric_dtype(series.dtype) else CATEGORICAL_COLUMN
+
+        column = {'kind': kind, 'nulls': int(series.isnull().sum())}
+        if kind == NUMERIC_COLUMN:
+            values = _numeric_values(series)
+            if reference_column is not None:
+                edges = np.asarray(reference_column['edges'], dtype=np.float64)
+            else:
+                edges = np.unique(np.quantile(values, np.linspace(0, 1, N_QUANTILES + 1))) if len(values) > 0 else np.zeros(0)
+            counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+            column.update({'edges': edges.tolist(), 'counts': counts.tolist()})
+        else:
+            frequencies = series.dropna().astype(str).value_counts()
+            column['frequencies'] = {str(value): int(count) for value, count in frequencies.items() if count > 0}
+        columns[col] = column
+
+    return {'rows': int(len(df)), 'columns': columns}
+
+
+def merge_profiles(profiles:Iterable[dict])->dict:
+    """
+    Sums the counts of profiles taken on the same edges, e.g. one per chunk.
+    """
+    merged = None
+    for profile in profiles:
+        if merged is None:
+            merged = profile
+            continue
+        merged['rows'] += profile['rows']
+        for col, column in profile['columns'].items():
+            merged_column = merged['columns'][col]
+            merged_column['nulls'] += column['nulls']
+            if column['kind'] == NUMERIC_COLUMN:
+                merged_column['counts'] = (np.asarray(merged_column['counts']) + np.asarray(column['counts'])).tolist()
+            else:
+                for value, count in column['frequencies'].items():
+                    merged_column['frequencies'][value] = merged_column['frequencies'].get(value, 0) + count
+    return merged
+
+
+def population_stability_index(reference_counts:np.ndarray, current_counts:np.ndarray)->float:
+    reference_share = np.maximum(reference_counts / max(reference_counts.sum(), 1), PSI_FLOOR)
+    current_share = np.maximum(current_counts / max(current_counts.sum(), 1), PSI_FLOOR)
+    return float(np.sum((current_share - reference_share) * np.log(current_share / reference_share)))
+
+
+def column_drift(reference_column:dict, current_column:dict)->dict:
+    """
+    Numerics: two sample KS statistic on the reference bins, with its
+    asymptotic p-value, and PSI over the same bins.
+    Categoricals: chi-square test of the two frequency tables and PSI.
+    """
+    if reference_column['kind'] == NUMERIC_COLUMN:
+        reference_counts = np.asarray(reference_column['counts'], dtype=np.float64)
+        current_counts = np.asarray(current_column['counts'], dtype=np.float64)
+        n_reference, n_current = reference_counts.sum(), current_counts.sum()
+        if n_reference == 0 or n_current == 0:
+            return {'test': 'ks', 'statistic': None, 'p_value': None, 'psi': None}
+        statistic = float(np.max(np.abs(np.cumsum(reference_counts) / n_reference - np.cumsum(current_counts) / n_current)))
+        effective_n = n_reference * n_current / (n_reference + n_current)
+        p_value = float(kolmogorov(np.sqrt(effective_n) * statistic))
+        return {'test': 'ks', 'statistic': statistic, 'p_value': p_value, 'psi': population_stability_index(reference_counts, current_counts)}
+
+    categories = sorted(set(reference_column['frequencies']) | set(current_column['frequencies']))
+    reference_counts = np.asarray([reference_column['frequencies'].get(value, 0) for value in categories], dtype=np.float64)
+    current_counts = np.asarray([current_column['frequencies'].get(value, 0) for value in categories], dtype=np.float64)
+    if len(categories) < 2 or reference_counts.sum() == 0 or current_counts.sum() == 0:
+        return {'test': 'chi_square', 'statistic': None, 'p_value': None, 'psi': None}
+    statistic, p_value, _, _ = chi2_contingency(np.vstack([reference_counts, current_counts]))
+    return {'test': 'chi_square', 'statistic': float(statistic), 'p_value': float(p_value), 'psi': population_stability_index(reference_counts, current_counts)}
+
+
+def profile_columns(profile:dict, columns:List[str])->dict:
+    return {'rows': profile['rows'], 'columns': {col: profile['columns'][col] for col in columns if col in profile['columns']}}
@@ -0,0 +1,93 @@
+import os
+import numpy as np
+from scipy import sparse
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from imblearn.combine import SMOTETomek
+
+AUTO = "auto"
+SMOTE_TOMEK = "smote_tomek"
+BLOCKED_SMOTE_TOMEK = "blocked_smote_tomek"
+CLASS_WEIGHT = "class_weight"
+NO_RESAMPLING = "none"
+RESAMPLING_STRATEGIES = (AUTO, SMOTE_TOMEK, BLOCKED_SMOTE_TOMEK, CLASS_WEIGHT, NO_RESAMPLING)
+SMOTE_K_NEIGHBORS = 5
+
+
+def resolve_strategy(strategy:str, n_rows:int, exact_max_rows:int)->str:
+    """
+    "auto" keeps the exact SMOTETomek up to `exact_max_rows` rows and switches
+    to the blocked one above, where the exact neighbour searches blow up.
+    """
+    if strategy not in RESAMPLING_STRATEGIES:
+        raise ValueError(f"Unknown resampling strategy: {strategy}, expected one of {RESAMPLING_STRATEGIES}")
+    if strategy == AUTO:
+        return SMOTE_TOMEK if n_rows <= exact_max_rows else BLOCKED_SMOTE_TOMEK
+    return strategy
+
+
+def balanced_class_weights(y:np.ndarray)->List[float]:
+    """
+    Weight of each encoded class, n_samples / (n_classes * class count).
+    """
+    counts = np.bincount(y.astype(np.int64))
+    return (len(y) / (len(counts) * np.maximum(counts, 1))).tolist()
+
+
+def stratified_blocks(y:np.ndarray, block_size:int, random_state:int)->List[np.ndarray]:
+    """
+    Splits the row indices into random blocks of about `block_size` rows with
+    the class ratio of `y`, few enough that every block has minority samples
+    for SMOTE to interpolate between.
+    """
+    rng = np.random.default_rng(random_state)
+    labels, counts = np.unique(y, return_counts=True)
+    n_blocks = int(np.ceil(len(y) / block_size))
+    n_blocks = max(1, min(n_blocks, counts.min() // (SMOTE_K_NEIGHBORS + 1)))
+    blocks = [[] for _ in range(n_blocks)]
+    for label in labels:
+        indices = rng.permutation(np.flatnonzero(y == label))
+        for block, part in zip(blocks, np.array_split(indices, n_blocks)):
+            block.append(part)
+    return [np.sort(np.concatenate(parts)) for parts in blocks]
+
+
+def smote_tomek(X, y:np.ndarray, random_state:int, n_jobs:int=-1)->Tuple[np.ndarray, np.ndarray]:
+    smt = SMOTETomek(sampling_strategy='minority', random_state=random_state, n_jobs=n_jobs)
+    return smt.fit_resample(X, y)
+
+
+def blocked_smote_tomek(X, y:np.ndarray, block_size:int, random_state:int, n_workers:Optional[int]=None)->Tuple[np.ndarray, np.ndarray]:
+    """
+    SMOTETomek run on each stratified block on its own. Synthetic samples and
+    Tomek links are found among the neighbours inside a block, so the work
+    grows linearly with the number of blocks instead of with the square of
+    the rows. The blocks run on a thread pool, the neighbour searches spend
+    their time in numpy code that releases the GIL.
+    """
+    blocks = stratified_blocks(y, block_size, random_state)
+    with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count() or 1) as executor:
+        results = list(executor.map(lambda args: smote_tomek(X[args[1]], y[args[1]], random_state=random_state + args[0], n_jobs=1), enumerate(blocks)))
+    if sparse.issparse(X):
+        X_resampled = sparse.vstack([X_block for X_block, _ in results], format="csr")
+    else:
+        X_resampled = np.concatenate([X_block for X_block, _ in results])
+    return X_resampled, np.concatenate([y_block for _, y_block in results])
+
+
+def resample(X, y:np.ndarray, strategy:str=AUTO, block_size:int=50000, exact_max_rows:int=100000,
+             random_state:int=10, n_workers:Optional[int]=None)->Tuple[np.ndarray, np.ndarray, Optional[List[float]]]:
+    """
+    Balances the classes of (X, y) with the chosen strategy, X is a dense
+    array or a CSR matrix.
+    returns the resampled X and y, and the class weights for the model when
+    the strategy weights the classes instead of resampling
+    """
+    strategy = resolve_strategy(strategy, len(y), exact_max_rows)
+    if strategy == SMOTE_TOMEK:
+        X, y = smote_tomek(X, y, random_state=random_state)
+    elif strategy == BLOCKED_SMOTE_TOMEK:
+        X, y = blocked_smote_tomek(X, y, block_size=block_size, random_state=random_state, n_workers=n_workers)
+    elif strategy == CLASS_WEIGHT:
+        return X, y, balanced_class_weights(y)
+    return X, y, None
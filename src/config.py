@@ -1,5 +1,4 @@
 import os, sys
-import pymongo 
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
@@ -9,4 +8,14 @@ class EnviromentVariable:
 
 
 env_var = EnviromentVariable()
-mongo_client = pymongo.MongoClient(env_var.mongo_db_url)
+
+
+def __getattr__(name):
+    # pymongo is imported and the client created on first use of `mongo_client`,
+    # so importing the serving code never touches Mongo
+    if name == "mongo_client":
+        global mongo_client
+        import pymongo
+        mongo_client = pymongo.MongoClient(env_var.mongo_db_url)
+        return mongo_client
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass 
 class DataIngestionArtifact:
@@ -16,12 +17,16 @@ class DataTransformationArtifacts:
     transform_train_dir: str
     transform_test_dir: str
     target_encoder_dir: str
+    compiled_transform_obj_dir: str
+    # Set when the classes are weighted in the model instead of resampled
+    class_weights: Optional[list] = None
 
 @dataclass 
 class ModelTrainerArtifact:
     model_dir: str 
     f1_train_score: float 
     f1_test_score: float 
+    tree_model_dir: str
 
 @dataclass 
 class ModelEvaluationArtifact:
@@ -6,14 +6,23 @@ from datetime import datetime
 FILE_NAME = "raw_data.csv"
 TRAIN_FILE_NAME = "train.csv"
 TEST_FILE_NAME = "test.csv"
+INGESTION_STATE_FILE_NAME = "ingestion_state.json"
+BULK_LOAD_CHECKPOINT_DIR_NAME = "bulk_load_checkpoints"
 TRANSFORMER_OBJ_FILE_NAME = "transformer.pkl"
+COMPILED_TRANSFORMER_OBJ_FILE_NAME = "compiled_transformer.pkl"
 TARGET_ENCODER_OBJ_FILE_NAME = "target_encoder.pkl"
 MODEL_FILE_NAME = "model.pkl"
+TREE_MODEL_FILE_NAME = "tree_model.pkl"
 
 class TrainingPipelineConfig:
 
-    def __init__(self):
-        self.artifact_dir = os.path.join(os.getcwd(), "artifact", f"{datetime.now().strftime('%m%d%Y__%H%M%S')}")
+    def __init__(self, artifact_dir:str=None):
+        """
+        artifact_dir: directory of an earlier run to resume, a new timestamped one by default
+        """
+        self.artifact_root_dir = os.path.join(os.getcwd(), "artifact")
+        self.artifact_dir = artifact_dir or os.path.join(self.artifact_root_dir, f"{datetime.now().strftime('%m%d%Y__%H%M%S')}")
+        self.n_workers = int(os.getenv("PIPELINE_WORKERS", 2))
 
 class DataIngestionConfig:
     
@@ -21,10 +30,20 @@ class DataIngestionConfig:
         self.database_name = "hr"
         self.collection_name = "details"
         self.data_ingestion_dir = os.path.join(training_pipeline_config.artifact_dir, 'data_ingestion')
-        self.feature_store_dir = os.path.join(self.data_ingestion_dir, "feature_store", FILE_NAME)
-        self.train_data_dir = os.path.join(self.data_ingestion_dir, "dataset", TRAIN_FILE_NAME)
-        self.test_data_dir = os.path.join(self.data_ingestion_dir, "dataset", TEST_FILE_NAME)
+        # Shared by every run, each run only appends the documents added since the last one
+        self.ingestion_store_dir = os.path.join("feature_store")
+        # Directories of Parquet part files, one part per ingested chunk
+        self.feature_store_dir = os.path.join(self.ingestion_store_dir, "raw_data")
+        self.train_data_dir = os.path.join(self.ingestion_store_dir, "dataset", "train")
+        self.test_data_dir = os.path.join(self.ingestion_store_dir, "dataset", "test")
+        self.state_file_dir = os.path.join(self.ingestion_store_dir, INGESTION_STATE_FILE_NAME)
         self.test_size = 0.2
+        self.chunk_size = 50000
+        self.cursor_batch_size = 5000
+        # Documents may show up this long after newer _ids, e.g. from clients with skewed clocks
+        self.watermark_overlap_seconds = int(os.getenv("INGESTION_OVERLAP_SECONDS", 600))
+        # Ingestion waits for the bulk loads recorded here to complete
+        self.bulk_load_checkpoint_dir = os.path.join(BULK_LOAD_CHECKPOINT_DIR_NAME)
 
 class DataValidationConfig:
 
@@ -33,6 +52,9 @@ class DataValidationConfig:
         self.report_file_dir = os.path.join(self.data_validation_dir, "report.yaml") 
         self.missing_values_threshold: fload = 0.2
         self.base_file_dir = os.path.join("salary.csv")
+        # Built from the base dataset on first use, shared by every run
+        self.reference_profile_dir = os.path.join("reference_profile", "salary_profile.json")
+        self.n_workers = int(os.getenv("VALIDATION_WORKERS", os.cpu_count() or 1))
 
 
 class DataTransformationConfig:
@@ -41,9 +63,20 @@ class DataTransformationConfig:
         self.data_transformation_dir = os.path.join(training_pipeline_config.artifact_dir,"data_transformation")
         self.target_column = 'salary'
         self.transform_obj_dir = os.path.join(self.data_transformation_dir,"transformer", TRANSFORMER_OBJ_FILE_NAME)
-        self.transform_train_dir = os.path.join(self.data_transformation_dir,"transformer",TRAIN_FILE_NAME.replace('csv','npz'))
-        self.transform_test_dir = os.path.join(self.data_transformation_dir,"transformer",TEST_FILE_NAME.replace('csv','npz'))
+        self.compiled_transform_obj_dir = os.path.join(self.data_transformation_dir,"transformer", COMPILED_TRANSFORMER_OBJ_FILE_NAME)
+        # Directories with the features and target.npy of each split
+        self.transform_train_dir = os.path.join(self.data_transformation_dir,"transformer","train")
+        self.transform_test_dir = os.path.join(self.data_transformation_dir,"transformer","test")
         self.target_encoder_dir = os.path.join(self.data_transformation_dir,"transformer", TARGET_ENCODER_OBJ_FILE_NAME)
+        # Unscaled one hot columns kept sparse, 0 for the dense scaled ones
+        self.sparse_one_hot = os.getenv("TRANSFORM_SPARSE_ONE_HOT", "1") == "1"
+        # CatBoost compares features as float32, so float32 storage loses nothing
+        self.feature_dtype = os.getenv("TRANSFORM_FEATURE_DTYPE", "float32")
+        # auto, smote_tomek, blocked_smote_tomek, class_weight or none, see components/resampling.py
+        self.resampling_strategy = os.getenv("RESAMPLING_STRATEGY", "auto")
+        self.resampling_exact_max_rows = int(os.getenv("RESAMPLING_EXACT_MAX_ROWS", 100000))
+        self.resampling_block_size = int(os.getenv("RESAMPLING_BLOCK_SIZE", 50000))
+        self.resampling_workers = int(os.getenv("RESAMPLING_WORKERS", os.cpu_count() or 1))
          
 
 class ModelTrainerConfig:
@@ -51,6 +84,9 @@ class ModelTrainerConfig:
     def __init__(self, training_pipeline_config:TrainingPipelineConfig):
         self.model_trainer_dir = os.path.join(training_pipeline_config.artifact_dir, "model_trainer")
         self.model_dir = os.path.join(self.model_trainer_dir, 'model', MODEL_FILE_NAME)
+        self.tree_model_dir = os.path.join(self.model_trainer_dir, 'model', TREE_MODEL_FILE_NAME)
+        # Rows scored per predict call when computing the F1 scores
+        self.predict_chunk_size = int(os.getenv("PREDICT_CHUNK_SIZE", 100000))
         self.expected_score = 0.7 
         self.overfitting_thresh = 0.1 
 
@@ -65,5 +101,51 @@ class ModelPusherConfig:
         self.saved_model_dir = os.path.join("saved_models")
         self.pusher_model_dir = os.path.join(self.model_pusher_dir, self.saved_model_dir)
         self.pusher_model_path = os.path.join(self.pusher_model_dir, MODEL_FILE_NAME)
+        self.pusher_tree_model_path = os.path.join(self.pusher_model_dir, TREE_MODEL_FILE_NAME)
         self.pusher_transformer_path = os.path.join(self.pusher_model_dir, TRANSFORMER_OBJ_FILE_NAME)
-        self.pusher_target_enc_path = os.path.join(self.pusher_model_dir, TARGET_ENCODER_OBJ_FILE_NAME) 
\ No newline at end of file
+        self.pusher_compiled_transformer_path = os.path.join(self.pusher_model_dir, COMPILED_TRANSFORMER_OBJ_FILE_NAME)
+        self.pusher_target_enc_path = os.path.join(self.pusher_model_dir, TARGET_ENCODER_OBJ_FILE_NAME) 
+        self.pusher_bundle_dir = os.path.join(self.pusher_model_dir, "bundle")
+
+
+class PredictionPipelineConfig:
+
+    def __init__(self):
+        self.model_registry = os.path.join("saved_models")
+        # 0 turns polling off, new versions are then only picked up by ModelCache.refresh
+        self.reload_interval = float(os.getenv("MODEL_RELOAD_INTERVAL", 30)) or None
+        self.max_batch_size = int(os.getenv("MAX_BATCH_SIZE", 10000))
+        self.micro_batch_max_wait = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", 2))/1000
+        self.micro_batch_max_size = int(os.getenv("MICRO_BATCH_MAX_SIZE", 256))
+        self.prediction_cache_size = int(os.getenv("PREDICTION_CACHE_SIZE", 10000))
+        self.prediction_cache_ttl = float(os.getenv("PREDICTION_CACHE_TTL", 0)) or None
+        self.warmup = os.getenv("MODEL_WARMUP", "1") == "1"
+        # Batches up to this many rows go to the NumPy tree evaluator, larger ones to CatBoost, 0 turns it off
+        self.tree_model_max_rows = int(os.getenv("TREE_MODEL_MAX_ROWS", 1))
+
+
+class ScoringConfig:
+
+    def __init__(self):
+        self.model_registry = os.path.join("saved_models")
+        self.chunk_size = int(os.getenv("SCORING_CHUNK_SIZE", 100000))
+        self.n_workers = int(os.getenv("SCORING_WORKERS", os.cpu_count() or 1))
+        self.max_pending_chunks = 2 * self.n_workers
+
+
+class BulkLoadConfig:
+
+    def __init__(self):
+        self.database_name = "hr"
+        self.collection_name = "details"
+        self.chunk_size = int(os.getenv("BULK_LOAD_CHUNK_SIZE", 10000))
+        self.n_workers = int(os.getenv("BULK_LOAD_WORKERS", 4))
+        self.max_pending_chunks = 2 * self.n_workers
+        self.checkpoint_dir = os.path.join(BULK_LOAD_CHECKPOINT_DIR_NAME)
+
+
+class StageCacheConfig:
+
+    def __init__(self):
+        self.cache_dir = os.path.join("stage_cache")
+        self.max_size_bytes = int(os.getenv("STAGE_CACHE_MAX_BYTES", 5 * 1024**3))
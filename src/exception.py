@@ -18,4 +18,15 @@ class CustomException(Exception):
         self.error_message = error_message_details(error_message, error_details)
 
     def __str__(self):
-        return self.error_message
\ No newline at end of file
+        return self.error_message
+
+
+class InputValidationError(Exception):
+    """
+    Raised when prediction input does not match the expected feature schema.
+    errors: column name -> description of what is wrong with it
+    """
+
+    def __init__(self, error_message, errors:dict=None):
+        super().__init__(error_message)
+        self.errors = errors or dict()
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import numpy as np
+from typing import Optional, Tuple
+from src.inference.compiled_transformer import CompiledTransformer, TransformerBlock
+from src.inference.oblivious_trees import BatchSizeRouter, ObliviousTreeModel
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = "manifest.json"
+CATBOOST_MODEL_FILE_NAME = "model.cbm"
+TREE_ARRAYS = ("split_features", "split_borders", "leaf_values", "nan_values")
+
+
+class LabelTable:
+    """
+    Fitted LabelEncoder without sklearn: classes_ with transform / inverse_transform.
+    """
+
+    def __init__(self, classes:np.ndarray):
+        self.classes_ = classes
+        self._codes = {label: code for code, label in enumerate(classes.tolist())}
+
+    def transform(self, labels)->np.ndarray:
+        labels = np.asarray(labels).ravel()
+        unknown = [label for label in set(labels.tolist()) if label not in self._codes]
+        if len(unknown) > 0:
+            raise ValueError(f"y contains previously unseen labels: {unknown}")
+        return np.fromiter((self._codes[label] for label in labels.tolist()), dtype=np.int64, count=len(labels))
+
+    def inverse_transform(self, codes)->np.ndarray:
+        return self.classes_[np.asarray(codes).ravel().astype(np.int64)]
+
+
+def file_sha256(file_path:str)->str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def _array_entry(bundle_dir:str, name:str, array:Optional[np.ndarray], files:dict)->Optional[str]:
+    if array is None:
+        return None
+    file_name = f"{name}.npy"
+    np.save(os.path.join(bundle_dir, file_name), np.ascontiguousarray(array))
+    files[file_name] = None
+    return file_name
+
+
+def save_binary_bundle(bundle_dir:str, model, transformer:CompiledTransformer, target_encoder, tree_model:Optional[ObliviousTreeModel]=None):
+    """
+    Writes a served model version as flat files:
+        model.cbm       the CatBoost model in its native binary format
+        *.npy           scaler vectors and tree arrays, loadable with mmap
+        manifest.json   format version, block layout, labels and sha256 per file
+    The manifest is written last, so a bundle without one is incomplete.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    files = dict()
+
+    blocks = []
+    for index, block in enumerate(transformer.blocks):
+        blocks.append({
+            'kind': block.kind,
+            'columns': list(block.columns),
+            'fill_values': None if block.fill_values is None else [_to_json(value) for value in block.fill_values],
+            'categories': None if block.categories is None else [np.asarray(categories).tolist() for categories in block.categories],
+            'center': _array_entry(bundle_dir, f"transformer_{index}_center", block.center, files),
+            'scale': _array_entry(bundle_dir, f"transformer_{index}_scale", block.scale, files),
+            'unknown_value': float(block.unknown_value)
+        })
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'transformer': {'feature_names_in': transformer.feature_names_in_.tolist(), 'blocks': blocks},
+        'target_encoder': {'classes': np.asarray(target_encoder.classes_).tolist(), 'dtype': np.asarray(target_encoder.classes_).dtype.str},
+        'catboost_model': None,
+        'tree_model': None
+    }
+
+    if hasattr(model, "save_model"):
+        model.save_model(os.path.join(bundle_dir, CATBOOST_MODEL_FILE_NAME), format="cbm")
+        files[CATBOOST_MODEL_FILE_NAME] = None
+        manifest['catboost_model'] = CATBOOST_MODEL_FILE_NAME
+
+    if tree_model is not None:
+        manifest['tree_model'] = {
+            'arrays': {name: _array_entry(bundle_dir, f"tree_{name}", getattr(tree_model, name), files) for name in TREE_ARRAYS},
+            'scale': float(tree_model.scale),
+            'bias': float(tree_model.bias),
+            'classes': np.asarray(tree_model.classes_).tolist(),
+            'classes_dtype': np.asarray(tree_model.classes_).dtype.str
+        }
+
+    manifest['files'] = {file_name: file_sha256(os.path.join(bundle_dir, file_name)) for file_name in files}
+
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE_NAME)
+    with open(f"{manifest_path}.tmp", "w") as file_obj:
+        json.dump(manifest, file_obj, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def read_manifest(bundle_dir:str, verify:bool=True)->dict:
+    with open(os.path.join(bundle_dir, MANIFEST_FILE_NAME)) as file_obj:
+        manifest = json.load(file_obj)
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version: {manifest.get('format_version')}")
+    if verify:
+        for file_name, checksum in manifest['files'].items():
+            if file_sha256(os.path.join(bundle_dir, file_name)) != checksum:
+                raise ValueError(f"Checksum mismatch for {os.path.join(bundle_dir, file_name)}")
+    return manifest
+
+
+def _load_array(bundle_dir:str, file_name:Optional[str], mmap_mode:Optional[str])->Optional[np.ndarray]:
+    if file_name is None:
+        return None
+    return np.load(os.path.join(bundle_dir, file_name), mmap_mode=mmap_mode)
+
+
+def load_binary_bundle(bundle_dir:str, tree_model_max_rows:int=0, mmap_mode:Optional[str]="r", verify:bool=True)->Tuple[object, CompiledTransformer, LabelTable]:
+    """
+    Loads a bundle written by `save_binary_bundle`.
+    tree_model_max_rows: batches of up to this many rows are scored by the
+                  NumPy tree evaluator, larger ones by the CatBoost model.
+                  The default 0 serves CatBoost alone, the evaluator is only
+                  faster on small batches. Bundles without a CatBoost model
+                  are always served by the trees.
+    returns (model, transformer, target_encoder)
+    """
+    manifest = read_manifest(bundle_dir, verify=verify)
+
+    transformer_spec = manifest['transformer']
+    blocks = [TransformerBlock(
+        kind=block['kind'],
+        columns=block['columns'],
+        fill_values=block['fill_values'],
+        categories=None if block['categories'] is None else [np.asarray(categories, dtype=object) for categories in block['categories']],
+        center=_load_array(bundle_dir, block['center'], mmap_mode),
+        scale=_load_array(bundle_dir, block['scale'], mmap_mode),
+        unknown_value=block['unknown_value']
+    ) for block in transformer_spec['blocks']]
+    transformer = CompiledTransformer(blocks=blocks, feature_names_in=transformer_spec['feature_names_in'])
+
+    target_spec = manifest['target_encoder']
+    target_encoder = LabelTable(np.asarray(target_spec['classes'], dtype=np.dtype(target_spec['dtype'])))
+
+    tree_model = None
+    tree_spec = manifest['tree_model']
+    if tree_spec is not None and (tree_model_max_rows > 0 or manifest['catboost_model'] is None):
+        arrays = {name: _load_array(bundle_dir, file_name, mmap_mode) for name, file_name in tree_spec['arrays'].items()}
+        tree_model = ObliviousTreeModel(
+            scale=tree_spec['scale'],
+            bias=tree_spec['bias'],
+            classes=np.asarray(tree_spec['classes'], dtype=np.dtype(tree_spec['classes_dtype'])),
+            **arrays
+        )
+
+    if manifest['catboost_model'] is not None:
+        from catboost import CatBoostClassifier
+        model = CatBoostClassifier()
+        model.load_model(os.path.join(bundle_dir, manifest['catboost_model']), format="cbm")
+        if tree_model is not None:
+            model = BatchSizeRouter(tree_model=tree_model, model=model, max_tree_rows=tree_model_max_rows)
+    elif tree_model is not None:
+        model = tree_model
+    else:
+        raise ValueError(f"Bundle {bundle_dir} has no model")
+
+    return model, transformer, target_encoder
@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Sequence
+
+# Raw values that mean "unknown" in the census data, compared after stripping
+MISSING_MARKERS = frozenset(['na', '?'])
+
+
+def clean_value(value):
+    """
+    Strips a string and turns the missing markers and None into NaN, the
+    way pandas sees None in the training data. Other values are unchanged.
+    """
+    if value is None:
+        return np.nan
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    return np.nan if value in MISSING_MARKERS else value
+
+
+def clean_values(values:Sequence)->np.ndarray:
+    """
+    Object array of cleaned `values`, each distinct value is cleaned once.
+    Used on the serving path, where pandas is not imported.
+    """
+    values = np.asarray(values, dtype=object).ravel()
+    cleaned = dict()
+    output = np.empty(len(values), dtype=object)
+    for row, value in enumerate(values):
+        if isinstance(value, str):
+            result = cleaned.get(value)
+            if result is None:
+                result = cleaned[value] = clean_value(value)
+            value = result
+        elif value is None:
+            value = np.nan
+        output[row] = value
+    return output
+
+
+def clean_column(series:"pd.Series")->"pd.Series":
+    """
+    Cleans the distinct values of an object or categorical column and maps
+    the codes back, so the string work is proportional to the cardinality.
+    """
+    import pandas as pd
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return series
+    cleaned = clean_values(np.asarray(uniques, dtype=object))
+    values = np.where(codes < 0, np.nan, cleaned.take(np.maximum(codes, 0)))
+    output = pd.Series(values, index=series.index, name=series.name, dtype=object)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        output = output.astype("category")
+    return output
+
+
+def clean_frame(df:"pd.DataFrame")->"pd.DataFrame":
+    """
+    The cleaning shared by ingestion, validation and scoring: strips the
+    string columns and replaces 'na' and '?' with NaN. Modifies `df` in place.
+    """
+    import pandas as pd
+    for col in df.columns:
+        if df[col].dtype == 'O' or isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = clean_column(df[col])
+    return df
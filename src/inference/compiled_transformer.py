@@ -0,0 +1,262 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+NUMERIC_BLOCK = "numeric"
+ORDINAL_BLOCK = "ordinal"
+ONE_HOT_BLOCK = "one_hot"
+
+
+@dataclass
+class TransformerBlock:
+    """
+    Flattened form of one ColumnTransformer pipeline.
+    kind: numeric (impute -> scale), ordinal (impute -> ordinal encode -> scale)
+          or one_hot (impute -> one hot encode -> scale)
+    fill_values: imputer statistics per input column, None when not imputed
+    categories: category array per input column for the encoded kinds
+    center, scale: scaler vectors over the block output, None when not scaled
+    """
+    kind: str
+    columns: List[str]
+    fill_values: Optional[list]
+    categories: Optional[list]
+    center: Optional[np.ndarray]
+    scale: Optional[np.ndarray]
+    unknown_value: float = -1.0
+    _lookups: Optional[list] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def width(self)->int:
+        if self.kind == ONE_HOT_BLOCK:
+            return sum(len(categories) for categories in self.categories)
+        return len(self.columns)
+
+    @property
+    def lookups(self)->list:
+        if self._lookups is None:
+            self._lookups = [{category: index for index, category in enumerate(categories.tolist())} for categories in self.categories]
+        return self._lookups
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_lookups'] = None
+        return state
+
+    def encode(self, values, column_index:int)->np.ndarray:
+        """
+        Category codes of one column, -1 for unknown categories.
+        Only NaN counts as missing, the same way SimpleImputer sees object data.
+        """
+        values = np.asarray(values, dtype=object).ravel()
+        lookup = self.lookups[column_index]
+        codes = np.fromiter((lookup.get(value, -1) for value in values), dtype=np.int64, count=len(values))
+        fill_code = -1
+        if self.fill_values is not None:
+            fill_code = lookup.get(self.fill_values[column_index], -1)
+        if fill_code != -1:
+            for row in np.flatnonzero(codes < 0):
+                value = values[row]
+                if isinstance(value, float) and value != value:
+                    codes[row] = fill_code
+        return codes
+
+    def scale_block(self, block:np.ndarray)->np.ndarray:
+        if self.center is not None:
+            block -= self.center
+        if self.scale is not None:
+            block /= self.scale
+        return block
+
+    def transform(self, columns, n_rows:int)->np.ndarray:
+        if self.kind == NUMERIC_BLOCK:
+            block = np.empty((n_rows, len(self.columns)), dtype=np.float64)
+            for index, col in enumerate(self.columns):
+                block[:, index] = np.asarray(columns[col], dtype=np.float64).ravel()
+            if self.fill_values is not None:
+                block = np.where(np.isnan(block), np.asarray(self.fill_values, dtype=np.float64), block)
+            return self.scale_block(block)
+
+        if self.kind == ORDINAL_BLOCK:
+            block = np.empty((n_rows, len(self.columns)), dtype=np.float64)
+            for index, col in enumerate(self.columns):
+                codes = self.encode(columns[col], index)
+                block[:, index] = np.where(codes < 0, self.unknown_value, codes)
+            return self.scale_block(block)
+
+        # one hot: every output cell is either the scaled 0 or the scaled 1 of its column
+        width = self.width
+        zeros = self.scale_block(np.zeros((1, width), dtype=np.float64))[0]
+        ones = self.scale_block(np.ones((1, width), dtype=np.float64))[0]
+        block = np.tile(zeros, (n_rows, 1))
+        offset = 0
+        for index, col in enumerate(self.columns):
+            codes = self.encode(columns[col], index)
+            rows = np.flatnonzero(codes >= 0)
+            hot_columns = offset + codes[rows]
+            block[rows, hot_columns] = ones[hot_columns]
+            offset += len(self.categories[index])
+        return block
+
+
+class CompiledTransformer:
+    """
+    NumPy replacement for the fitted preprocessing ColumnTransformer.
+
+    Holds only the fitted numbers (impute fill values, category tables and
+    scaler vectors) and reproduces `ColumnTransformer.transform` without sklearn.
+    Accepts a DataFrame or any mapping of column name -> values.
+    """
+
+    def __init__(self, blocks:List[TransformerBlock], feature_names_in:List[str]):
+        self.blocks = blocks
+        self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+        self.n_features_out = sum(block.width for block in blocks)
+
+    def transform(self, features)->np.ndarray:
+        missing_columns = [col for block in self.blocks for col in block.columns if col not in features]
+        if len(missing_columns) > 0:
+            raise ValueError(f"Columns missing from the input: {missing_columns}")
+
+        n_rows = len(np.asarray(features[self.blocks[0].columns[0]], dtype=object).ravel()) if len(self.blocks) > 0 else 0
+        output = np.empty((n_rows, self.n_features_out), dtype=np.float64)
+        offset = 0
+        for block in self.blocks:
+            width = block.width
+            output[:, offset:offset+width] = block.transform(features, n_rows)
+            offset += width
+        return output
+
+
+def _get_steps(transformer)->list:
+    steps = getattr(transformer, "steps", None)
+    if steps is None:
+        return [transformer]
+    return [step for _, step in steps if step not in (None, "passthrough")]
+
+
+def _compile_block(transformer, columns:List[str])->TransformerBlock:
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OrdinalEncoder, OneHotEncoder, RobustScaler, StandardScaler
+
+    steps = _get_steps(transformer)
+    imputer, encoder, scaler = None, None, None
+    for step in steps:
+        if isinstance(step, SimpleImputer) and encoder is None and scaler is None and imputer is None:
+            imputer = step
+        elif isinstance(step, (OrdinalEncoder, OneHotEncoder)) and encoder is None and scaler is None:
+            encoder = step
+        elif isinstance(step, (RobustScaler, StandardScaler)) and scaler is None:
+            scaler = step
+        else:
+            raise ValueError(f"Unsupported step for compilation: {step}")
+
+    fill_values = None
+    if imputer is not None:
+        if not (isinstance(imputer.missing_values, float) and np.isnan(imputer.missing_values)):
+            raise ValueError(f"Unsupported missing value marker: {imputer.missing_values}")
+        if getattr(imputer, "add_indicator", False):
+            raise ValueError("Missing indicators are not supported")
+        fill_values = list(imputer.statistics_)
+        if any(isinstance(value, float) and np.isnan(value) for value in fill_values):
+            raise ValueError("Imputer dropped empty features, which is not supported")
+
+    categories = None
+    kind = NUMERIC_BLOCK
+    unknown_value = -1.0
+    if isinstance(encoder, OrdinalEncoder):
+        kind = ORDINAL_BLOCK
+        categories = [np.asarray(cats) for cats in encoder.categories_]
+        if encoder.handle_unknown == 'use_encoded_value':
+            unknown_value = float(encoder.unknown_value)
+        else:
+            raise ValueError("OrdinalEncoder must use handle_unknown='use_encoded_value'")
+    elif isinstance(encoder, OneHotEncoder):
+        kind = ONE_HOT_BLOCK
+        categories = [np.asarray(cats) for cats in encoder.categories_]
+        if getattr(encoder, "drop_idx_", None) is not None:
+            raise ValueError("OneHotEncoder with drop is not supported")
+        if getattr(encoder, "infrequent_categories_", None) is not None and any(cats is not None for cats in encoder.infrequent_categories_):
+            raise ValueError("OneHotEncoder with infrequent categories is not supported")
+
+    center, scale = None, None
+    if isinstance(scaler, RobustScaler):
+        center = None if scaler.center_ is None else np.asarray(scaler.center_, dtype=np.float64)
+        scale = None if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+    elif isinstance(scaler, StandardScaler):
+        center = None if scaler.mean_ is None or not scaler.with_mean else np.asarray(scaler.mean_, dtype=np.float64)
+        scale = None if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+
+    return TransformerBlock(kind=kind, columns=list(columns), fill_values=fill_values, categories=categories, center=center, scale=scale, unknown_value=unknown_value)
+
+
+def compile_transformer(column_transformer)->CompiledTransformer:
+    """
+    Flattens a fitted ColumnTransformer of impute/encode/scale pipelines.
+    Raises ValueError for steps it cannot reproduce exactly.
+    """
+    feature_names_in = list(column_transformer.feature_names_in_)
+    blocks = []
+    for name, transformer, columns in column_transformer.transformers_:
+        if isinstance(transformer, str):
+            if transformer == "drop":
+                continue
+            raise ValueError(f"Unsupported transformer '{transformer}' for {name}")
+        columns = [feature_names_in[col] if isinstance(col, (int, np.integer)) else col for col in list(columns)]
+        if len(columns) == 0:
+            continue
+        blocks.append(_compile_block(transformer, columns))
+    return CompiledTransformer(blocks=blocks, feature_names_in=feature_names_in)
+
+
+UNSEEN_CATEGORY = "__unseen_category__"
+
+
+def make_parity_probe(features, n_rows:int=1000):
+    """
+    Rows to compare the two transformers on: the first `n_rows` of the
+    `features` DataFrame, plus a row with an unseen category in every
+    categorical column, a row of NaN, and a row whose categoricals are None.
+    returns the probe DataFrame, which holds NaN where None is sent, and the
+    raw probe columns as serving receives them
+    """
+    import pandas as pd
+    probe = features.head(n_rows)
+    numeric_columns = [col for col in probe.columns if pd.api.types.is_numeric_dtype(probe[col].dtype)]
+    categorical_columns = [col for col in probe.columns if col not in numeric_columns]
+    raw_columns = {col: probe[col].to_numpy(dtype=np.float64 if col in numeric_columns else object).tolist() for col in probe.columns}
+    for col in probe.columns:
+        first_value = raw_columns[col][0]
+        raw_columns[col].append(UNSEEN_CATEGORY if col in categorical_columns else first_value)
+        raw_columns[col].append(np.nan)
+        raw_columns[col].append(None if col in categorical_columns else first_value)
+    frame = pd.DataFrame({col: np.asarray(values, dtype=np.float64) if col in numeric_columns else np.asarray([np.nan if value is None else value for value in values], dtype=object)
+                          for col, values in raw_columns.items()})
+    return frame, raw_columns, numeric_columns
+
+
+def verify_compiled_transformer(column_transformer, compiled_transformer:CompiledTransformer, features)->float:
+    """
+    Parity check of the compiled transformer against the sklearn one, on rows
+    of `features` and on the edge cases of `make_parity_probe`. The compiled
+    transformer is fed both the DataFrame and the column arrays serving
+    builds, with categoricals cleaned the way ColumnarBatch cleans them.
+    returns the maximum absolute difference, raises if the outputs differ
+    """
+    from src.inference.cleaning import clean_values
+    frame, raw_columns, numeric_columns = make_parity_probe(features)
+    expected = column_transformer.transform(frame)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    columnar = {col: np.asarray(values, dtype=np.float64) if col in numeric_columns else clean_values(values) for col, values in raw_columns.items()}
+
+    max_diff = 0.0
+    for input_name, inputs in (("DataFrame", frame), ("column arrays", columnar)):
+        actual = compiled_transformer.transform(inputs)
+        if expected.shape != actual.shape:
+            raise ValueError(f"Compiled transformer output shape {actual.shape} != {expected.shape} on {input_name} input")
+        diff = float(np.max(np.abs(expected - actual))) if expected.size > 0 else 0.0
+        if not np.array_equal(expected, actual):
+            raise ValueError(f"Compiled transformer output differs from the fitted transformer on {input_name} input, max abs diff: {diff}")
+        max_diff = max(max_diff, diff)
+    return max_diff
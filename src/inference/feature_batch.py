@@ -0,0 +1,103 @@
+import numpy as np
+from typing import Dict, List, Sequence
+from src.inference.cleaning import clean_values
+
+INPUT_FEATURES = ['age', 'workclass', 'fnlwgt', 'education', 'education-num', 'marital-status', 'occupation', 'relationship', 'race', 'sex', 'capital-gain', 'capital-loss', 'hours-per-week', 'native-country']
+NUMERICAL_FEATURES = ['age', 'fnlwgt', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']
+CATEGORICAL_FEATURES = [col for col in INPUT_FEATURES if col not in NUMERICAL_FEATURES]
+NUMERICAL_MASK = [col in NUMERICAL_FEATURES for col in INPUT_FEATURES]
+SAMPLE_RECORD = (39, 'State-gov', 77516, 'Bachelors', 13, 'Never-married', 'Adm-clerical', 'Not-in-family', 'White', 'Male', 2174, 0, 40, 'United-States')
+
+
+class ColumnarBatch:
+    """
+    Column arrays of a batch of input records, keyed like the training frame.
+    Numerical columns are float64 arrays and categorical ones object arrays.
+    Supports `in` and `[]` by column name, so the compiled transformer reads
+    it directly without building a DataFrame.
+    """
+    __slots__ = ("columns", "n_rows")
+
+    def __init__(self, columns:Dict[str, np.ndarray]):
+        self.columns = columns
+        self.n_rows = len(next(iter(columns.values()))) if len(columns) > 0 else 0
+
+    def __len__(self)->int:
+        return self.n_rows
+
+    def __contains__(self, column:str)->bool:
+        return column in self.columns
+
+    def __getitem__(self, column:str)->np.ndarray:
+        return self.columns[column]
+
+    def keys(self):
+        return self.columns.keys()
+
+    @classmethod
+    def from_columns(cls, columns:Dict[str, Sequence])->"ColumnarBatch":
+        """
+        Categorical values go through the same cleaning as the training data.
+        """
+        return cls({col: np.asarray(columns[col], dtype=np.float64) if col in NUMERICAL_FEATURES else clean_values(columns[col]) for col in INPUT_FEATURES})
+
+    @classmethod
+    def from_records(cls, records:Sequence[Sequence])->"ColumnarBatch":
+        """
+        records: tuples of feature values in INPUT_FEATURES order
+        """
+        columns = list(zip(*records)) if len(records) > 0 else [()] * len(INPUT_FEATURES)
+        return cls.from_columns(dict(zip(INPUT_FEATURES, columns)))
+
+    @classmethod
+    def concat(cls, batches:List["ColumnarBatch"])->"ColumnarBatch":
+        return cls({col: np.concatenate([batch.columns[col] for batch in batches]) for col in batches[0].columns})
+
+    def take(self, rows:Sequence[int])->"ColumnarBatch":
+        rows = np.asarray(rows, dtype=np.int64)
+        return ColumnarBatch({col: values[rows] for col, values in self.columns.items()})
+
+    def to_DataFrame(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns, columns=list(self.columns))
+
+
+def coerce_numeric(values:Sequence):
+    """
+    float64 array of `values`, None becomes NaN.
+    returns (array, rows whose value is not a number)
+    """
+    array = np.empty(len(values), dtype=np.float64)
+    bad_rows = []
+    for row, value in enumerate(values):
+        if value is None:
+            array[row] = np.nan
+            continue
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            array[row] = float(value)
+        except (TypeError, ValueError):
+            array[row] = np.nan
+            bad_rows.append(row)
+    return array, bad_rows
+
+
+def take_rows(features, rows:Sequence[int]):
+    """
+    Row subset of a ColumnarBatch or a DataFrame.
+    """
+    if isinstance(features, ColumnarBatch):
+        return features.take(rows)
+    return features.iloc[list(rows)]
+
+
+def concat_features(features_list:list):
+    """
+    Concatenates ColumnarBatches, or DataFrames when any input is one.
+    """
+    if all(isinstance(features, ColumnarBatch) for features in features_list):
+        return ColumnarBatch.concat(features_list)
+    import pandas as pd
+    frames = [features.to_DataFrame() if isinstance(features, ColumnarBatch) else features for features in features_list]
+    return pd.concat(frames, ignore_index=True)
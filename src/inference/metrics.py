@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+REPORTED_QUANTILES = (0.5, 0.95, 0.99)
+SNAPSHOT_PREFIX = "metrics_"
+EXITED_SNAPSHOT_FILE_NAME = f"{SNAPSHOT_PREFIX}exited.json"
+
+STAGE_LATENCY = "income_classifier_stage_latency_seconds"
+REQUEST_LATENCY = "income_classifier_request_latency_seconds"
+REQUESTS_TOTAL = "income_classifier_requests_total"
+PREDICTIONS_TOTAL = "income_classifier_predictions_total"
+BATCH_SIZE = "income_classifier_batch_rows"
+
+METRIC_HELP = {
+    STAGE_LATENCY: "Time spent in each serving stage",
+    REQUEST_LATENCY: "End to end request latency per route",
+    REQUESTS_TOTAL: "Requests served per route and status code",
+    PREDICTIONS_TOTAL: "Rows transformed and scored per model version, cache hits excluded",
+    BATCH_SIZE: "Rows per transform and predict call",
+}
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram, the Prometheus kind.
+    Quantiles are interpolated inside the bucket they fall in.
+    """
+
+    def __init__(self, buckets:Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q:float)->float:
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = 0.0 if index == 0 else self.buckets[index-1]
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+def _format_labels(labels:Tuple[Tuple[str, str], ...], extra:Optional[Tuple[str, str]]=None)->str:
+    items = list(labels) + ([extra] if extra is not None else [])
+    if len(items) == 0:
+        return ""
+    escaped = [(key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for key, value in items]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value:float)->str:
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value))
+
+
+def _labels_key(labels)->tuple:
+    return tuple((key, value) for key, value in labels)
+
+
+def read_snapshots(multiprocess_dir:str)->List[dict]:
+    """
+    Snapshots written to `multiprocess_dir` by `MetricsRegistry.write_snapshot`.
+    """
+    snapshots = []
+    for file_name in sorted(os.listdir(multiprocess_dir)):
+        if not (file_name.startswith(SNAPSHOT_PREFIX) and file_name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(multiprocess_dir, file_name)) as file_obj:
+                snapshots.append(json.load(file_obj))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge_snapshots(snapshots:List[dict], label_pid:bool=False)->Tuple[dict, dict, dict]:
+    """
+    Sums the counters and histograms of the snapshots by name and labels.
+    Gauges are kept apart, labelled with their pid when `label_pid`.
+    returns (counters, histograms, gauges) by metric name
+    """
+    counters: Dict[str, Dict[tuple, float]] = dict()
+    histograms: Dict[str, Dict[tuple, Histogram]] = dict()
+    gauges: Dict[str, Tuple[str, list]] = dict()
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            series = counters.setdefault(name, dict())
+            key = _labels_key(labels)
+            series[key] = series.get(key, 0) + value
+        for name, labels, buckets, counts, total, count in snapshot['histograms']:
+            series = histograms.setdefault(name, dict())
+            key = _labels_key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.counts = [current + added for current, added in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+        for name, help_text, labels, value in snapshot['gauges']:
+            key = _labels_key(labels) + ((('pid', str(snapshot['pid'])),) if label_pid else ())
+            gauges.setdefault(name, (help_text, []))[1].append((key, value))
+    return counters, histograms, gauges
+
+
+def _write_json(file_path:str, obj:dict):
+    with open(f"{file_path}.tmp", "w") as file_obj:
+        json.dump(obj, file_obj)
+    os.replace(f"{file_path}.tmp", file_path)
+
+
+def mark_process_dead(multiprocess_dir:str, pid:int):
+    """
+    Folds the counters and histograms of an exited process into one file of
+    exited processes, so the totals do not drop and recycled workers do not
+    pile up files. Its gauges, which only hold while it runs, are dropped.
+    """
+    exited_path = os.path.join(multiprocess_dir, EXITED_SNAPSHOT_FILE_NAME)
+    file_paths = [os.path.join(multiprocess_dir, file_name) for file_name in os.listdir(multiprocess_dir)
+                  if file_name.startswith(f"{SNAPSHOT_PREFIX}{pid}_") and file_name.endswith(".json")]
+    if len(file_paths) == 0:
+        return
+    snapshots = []
+    for file_path in file_paths + ([exited_path] if os.path.exists(exited_path) else []):
+        with open(file_path) as file_obj:
+            snapshots.append(json.load(file_obj))
+    counters, histograms, _ = merge_snapshots(snapshots)
+    _write_json(exited_path, {
+        'pid': None,
+        'counters': [[name, list(key), value] for name, series in counters.items() for key, value in series.items()],
+        'histograms': [[name, list(key), list(histogram.buckets), histogram.counts, histogram.sum, histogram.count]
+                       for name, series in histograms.items() for key, histogram in series.items()],
+        'gauges': []
+    })
+    for file_path in file_paths:
+        os.remove(file_path)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms rendered in the Prometheus text format.
+    Every update takes one short lock; quantiles are computed only on render.
+
+    Under a pre-forking server each worker has its own registry. Call
+    `enable_multiprocess` in every worker, and render then reports the sum of
+    all the workers instead of the one that answered the scrape.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[tuple, float]] = dict()
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = dict()
+        self._buckets: Dict[str, Sequence[float]] = dict()
+        self._gauge_callbacks: List[Tuple[str, str, Callable]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._multiprocess_dir: Optional[str] = None
+        self._snapshot_path: Optional[str] = None
+
+    def enable_multiprocess(self, multiprocess_dir:str, flush_interval:float=5.0):
+        """
+        Shares this process's series with the others writing to
+        `multiprocess_dir`. A snapshot file is written every `flush_interval`
+        seconds and on each render, so the other workers' series are at most
+        that old in a scrape. Call it in the worker after the fork. It drops the
+        series recorded before, e.g. by the warmup in the master, so they are
+        not counted once per worker.
+        """
+        os.makedirs(multiprocess_dir, exist_ok=True)
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._multiprocess_dir = multiprocess_dir
+            self._snapshot_path = os.path.join(multiprocess_dir, f"{SNAPSHOT_PREFIX}{os.getpid()}_{time.time_ns()}.json")
+        self.write_snapshot()
+        if flush_interval:
+            threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True).start()
+
+    def _flush_loop(self, flush_interval:float):
+        while True:
+            time.sleep(flush_interval)
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+    def snapshot(self)->dict:
+        """
+        JSON-ready copy of the series and the current gauge values.
+        """
+        with self._lock:
+            counters = [[name, list(key), value] for name, series in self._counters.items() for key, value in series.items()]
+            histograms = [[name, list(key), list(histogram.buckets), list(histogram.counts), histogram.sum, histogram.count]
+                          for name, series in self._histograms.items() for key, histogram in series.items()]
+        gauges = [[name, help_text, sorted(labels.items()), value] for name, help_text, callback in self._gauge_callbacks for labels, value in callback() if value is not None]
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def write_snapshot(self):
+        if self._snapshot_path is None:
+            return
+        snapshot = self.snapshot()
+        with self._flush_lock:
+            _write_json(self._snapshot_path, snapshot)
+
+    def inc(self, name:str, value:float=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, dict())
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name:str, value:float, buckets:Sequence[float]=LATENCY_BUCKETS, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, dict())
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.setdefault(name, buckets))
+            histogram.observe(value)
+
+    @contextmanager
+    def time_stage(self, stage:str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(STAGE_LATENCY, time.perf_counter() - start, stage=stage, **labels)
+
+    def register_gauge(self, name:str, help_text:str, callback:Callable):
+        """
+        callback: returns a list of (labels dict, value) read at scrape time
+        """
+        self._gauge_callbacks.append((name, help_text, callback))
+
+    def render(self)->str:
+        """
+        Sums the counters and histograms of every process sharing the
+        multiprocess dir, or of this one. Gauges are per process, labelled
+        with the pid when there are several.
+        """
+        if self._multiprocess_dir is not None:
+            self.write_snapshot()
+            snapshots = read_snapshots(self._multiprocess_dir)
+        else:
+            snapshots = [self.snapshot()]
+        counters, histograms, gauges = merge_snapshots(snapshots, label_pid=self._multiprocess_dir is not None)
+
+        lines = []
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                for upper, bucket_count in zip(list(histogram.buckets) + [float("inf")], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(upper)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+            quantile_name = f"{name}_quantile"
+            lines.append(f"# HELP {quantile_name} p50/p95/p99 estimated from the {name} buckets")
+            lines.append(f"# TYPE {quantile_name} gauge")
+            for key, histogram in series.items():
+                for q in REPORTED_QUANTILES:
+                    lines.append(f"{quantile_name}{_format_labels(key, ('quantile', str(q)))} {_format_value(histogram.quantile(q))}")
+
+        for name, (help_text, series) in gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in series:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,190 @@
+import os
+import json
+import tempfile
+import numpy as np
+from typing import Optional
+
+NAN_AS_MAX_TREATMENTS = ("AsTrue", "Max")
+
+
+class ObliviousTreeModel:
+    """
+    NumPy evaluator for a binary CatBoost model made of oblivious trees.
+
+    Every tree uses the same (feature, border) split on each depth level, so a
+    row's leaf is the bit pattern of its split results:
+        leaf = sum((x[split_features[t, d]] > split_borders[t, d]) << d)
+    Trees shallower than the deepest one are padded with never-true splits.
+    Only needs numpy. It is faster than CatBoost on single rows, where the
+    call overhead dominates, and slower on batches, see `BatchSizeRouter`.
+    """
+
+    def __init__(self, split_features:np.ndarray, split_borders:np.ndarray, leaf_values:np.ndarray, scale:float, bias:float, classes:np.ndarray, nan_values:np.ndarray, chunk_size:int=1024):
+        self.split_features = split_features
+        self.split_borders = split_borders
+        self.leaf_values = leaf_values
+        self.scale = scale
+        self.bias = bias
+        self.classes_ = classes
+        self.nan_values = nan_values
+        self.chunk_size = chunk_size
+
+    @property
+    def tree_count(self)->int:
+        return self.split_features.shape[0]
+
+    @property
+    def n_features_in_(self)->int:
+        return self.nan_values.shape[0]
+
+    def _as_features(self, X)->np.ndarray:
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        # CatBoost compares float32 feature values against float32 borders
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        nan_mask = np.isnan(X)
+        if nan_mask.any():
+            X = np.where(nan_mask, self.nan_values, X)
+        return X
+
+    def _levels(self)->list:
+        """
+        (split features, split borders) of each depth level over all the
+        trees, and the offset of each tree's leaves in the flat leaf values.
+        Built on first use, pickles of older versions do not have them.
+        """
+        levels = getattr(self, "_cached_levels", None)
+        if levels is None:
+            depth = self.split_features.shape[1]
+            leaf_offsets = (np.arange(self.tree_count, dtype=np.intp) * self.leaf_values.shape[1])[:, None]
+            levels = self._cached_levels = (
+                [(np.ascontiguousarray(self.split_features[:, level]), np.ascontiguousarray(self.split_borders[:, level, None])) for level in range(depth)],
+                leaf_offsets
+            )
+        return levels
+
+    def decision_function(self, X)->np.ndarray:
+        """
+        Raw formula value per row, the log odds of the positive class.
+        Leaf indices are built one depth level at a time for all the trees,
+        from the transposed features, so a level gathers whole feature rows.
+        """
+        X_T = np.ascontiguousarray(self._as_features(X).T)
+        n_rows = X_T.shape[1]
+        levels, leaf_offsets = self._levels()
+        flat_leaf_values = self.leaf_values.reshape(-1)
+
+        raw = np.empty(n_rows, dtype=np.float64)
+        for start in range(0, n_rows, self.chunk_size):
+            columns = X_T[:, start:start+self.chunk_size]
+            # The offsets are multiples of the leaf count, so the level bits are OR-ed in
+            leaf_index = np.repeat(leaf_offsets, columns.shape[1], axis=1)
+            for level, (features, borders) in enumerate(levels):
+                bits = columns[features] > borders
+                leaf_index |= bits.view(np.uint8) << np.uint8(level) if level < 8 else bits.astype(np.intp) << level
+            raw[start:start+self.chunk_size] = flat_leaf_values.take(leaf_index).sum(axis=0)
+        return raw * self.scale + self.bias
+
+    def predict_proba(self, X)->np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X)->np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(np.int64)]
+
+
+class BatchSizeRouter:
+    """
+    Scores batches of up to `max_tree_rows` rows with the NumPy tree
+    evaluator and larger ones with the CatBoost model. Run
+    `python benchmark.py evaluator` to find the crossover of a model.
+    """
+
+    def __init__(self, tree_model:ObliviousTreeModel, model, max_tree_rows:int):
+        self.tree_model = tree_model
+        self.model = model
+        self.max_tree_rows = max_tree_rows
+
+    @property
+    def classes_(self)->np.ndarray:
+        return self.tree_model.classes_
+
+    def pick(self, X)->object:
+        n_rows = X.shape[0] if getattr(X, "ndim", 2) > 1 else 1
+        return self.tree_model if n_rows <= self.max_tree_rows else self.model
+
+    def predict_proba(self, X)->np.ndarray:
+        return np.asarray(self.pick(X).predict_proba(X))
+
+    def predict(self, X)->np.ndarray:
+        return np.asarray(self.pick(X).predict(X)).ravel()
+
+
+def export_oblivious_trees(model)->ObliviousTreeModel:
+    """
+    Builds an ObliviousTreeModel from a fitted binary CatBoostClassifier
+    through CatBoost's JSON export. Raises ValueError for models it can not
+    evaluate: categorical or one hot splits, multiclass or non symmetric trees.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "model.json")
+        model.save_model(json_path, format="json")
+        with open(json_path) as file_obj:
+            model_json = json.load(file_obj)
+
+    trees = model_json.get("oblivious_trees")
+    if not trees:
+        raise ValueError("Model has no oblivious trees")
+
+    float_features = model_json.get("features_info", {}).get("float_features", [])
+    n_features = max([feature["feature_index"] for feature in float_features], default=-1) + 1
+    nan_values = np.full(n_features, -np.inf, dtype=np.float32)
+    for feature in float_features:
+        if feature.get("nan_value_treatment") in NAN_AS_MAX_TREATMENTS:
+            nan_values[feature["feature_index"]] = np.inf
+
+    depth = max(len(tree["splits"]) for tree in trees)
+    split_features = np.zeros((len(trees), depth), dtype=np.int64)
+    split_borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((len(trees), 2**depth), dtype=np.float64)
+    for tree_index, tree in enumerate(trees):
+        splits = tree["splits"]
+        if len(tree["leaf_values"]) != 2**len(splits):
+            raise ValueError("Only single dimension (binary) models are supported")
+        for level, split in enumerate(splits):
+            if split.get("split_type", "FloatFeature") != "FloatFeature":
+                raise ValueError(f"Unsupported split type: {split.get('split_type')}")
+            split_features[tree_index, level] = split["float_feature_index"]
+            split_borders[tree_index, level] = split["border"]
+        leaf_values[tree_index, :len(tree["leaf_values"])] = tree["leaf_values"]
+
+    scale, bias = model_json.get("scale_and_bias", [1.0, 0.0])
+    if isinstance(bias, list):
+        if len(bias) != 1:
+            raise ValueError("Only single dimension (binary) models are supported")
+        bias = bias[0]
+
+    return ObliviousTreeModel(
+        split_features=split_features,
+        split_borders=split_borders,
+        leaf_values=leaf_values,
+        scale=float(scale),
+        bias=float(bias),
+        classes=np.asarray(model.classes_),
+        nan_values=nan_values
+    )
+
+
+def verify_oblivious_trees(model, tree_model:ObliviousTreeModel, X, atol:float=1e-9)->float:
+    """
+    Parity check of the exported trees against `model.predict_proba`.
+    returns the maximum absolute probability difference, raises above `atol`
+    """
+    expected = np.asarray(model.predict_proba(X))
+    actual = tree_model.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size > 0 else 0.0
+    if expected.shape != actual.shape or max_diff > atol:
+        raise ValueError(f"Exported trees differ from the CatBoost model, max abs diff: {max_diff}")
+    return max_diff
@@ -0,0 +1,93 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+
+def canonical_key(values:Sequence, numerical_mask:Sequence[bool])->bytes:
+    """
+    Hash of one input record. Numbers are compared by value (39, 39.0 and "39"
+    share a key) and a missing number is NaN whether it came as None or NaN.
+    Categorical values are kept as given, since the transformer treats them so.
+    """
+    canonical = []
+    for value, is_numerical in zip(values, numerical_mask):
+        if is_numerical:
+            try:
+                value = float("nan") if value is None else float(value)
+            except (TypeError, ValueError):
+                value = ("invalid", repr(value))
+        elif isinstance(value, float) and value != value:
+            value = ("nan",)
+        canonical.append(value)
+    return hashlib.blake2b(repr(tuple(canonical)).encode(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of per-record predictions with an optional TTL.
+    Entries belong to one model version; seeing another version clears it.
+    """
+
+    def __init__(self, max_size:int=10000, ttl:Optional[float]=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, keys:Iterable[bytes], version)->List[Optional[tuple]]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (entry[0] is None or entry[0] > now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    values.append(entry[1])
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                values.append(None)
+        return values
+
+    def put_many(self, keys:Iterable[bytes], values:Iterable[tuple], version):
+        expires_at = None if not self.ttl else time.monotonic() + self.ttl
+        with self._lock:
+            self._check_version(version)
+            for key, value in zip(keys, values):
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self)->dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_version': self._version,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+            }
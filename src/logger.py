@@ -5,12 +5,21 @@ import logging
 
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 log_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
-
-os.makedirs(log_path, exist_ok=True)
 LOG_FILE_PATH = os.path.join(log_path, LOG_FILE)
 
+
+class LazyFileHandler(logging.FileHandler):
+    """
+    Creates the log directory with the first record instead of at import.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
+    handlers=[LazyFileHandler(LOG_FILE_PATH, delay=True)],
     format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO
 )
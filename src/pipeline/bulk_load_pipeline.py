@@ -0,0 +1,175 @@
+import os, sys
+import json
+import time
+import hashlib
+import pandas as pd
+from collections import deque
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from src.entity.config_entity import BulkLoadConfig
+from src.utils import get_collection, read_file_chunks
+from src.logger import logging
+from src.exception import CustomException
+
+DUPLICATE_KEY_ERROR = 11000
+# Bumped when the ids given to rows change, checkpoints of another version cannot be resumed
+OBJECT_ID_VERSION = 2
+MAX_ROWS_PER_LOAD = 2**32
+
+
+def source_key(source_path:str)->bytes:
+    """
+    4 bytes identifying the source file, so loads of different files started
+    in the same second do not get the same ids.
+    """
+    return hashlib.md5(os.path.abspath(source_path).encode()).digest()[:4]
+
+
+def object_id_for_row(load_timestamp:int, source:bytes, row:int):
+    """
+    Deterministic ObjectId of a source row: the load start time, the source
+    key and the row number. Retried chunks get the same ids, so documents
+    already inserted are rejected as duplicates instead of being inserted twice.
+    """
+    from bson import ObjectId
+    if row >= MAX_ROWS_PER_LOAD:
+        raise ValueError(f"Row {row} is over the {MAX_ROWS_PER_LOAD} rows a single load can give ids to")
+    return ObjectId(load_timestamp.to_bytes(4, "big") + source + row.to_bytes(4, "big"))
+
+
+def chunk_to_documents(chunk:pd.DataFrame, load_timestamp:int, source:bytes, first_row:int)->List[dict]:
+    """
+    Rows as documents of native Python values, NaN stored as null.
+    """
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+    for offset, record in enumerate(records):
+        record["_id"] = object_id_for_row(load_timestamp, source, first_row + offset)
+    return records
+
+
+def insert_documents(collection, documents:List[dict])->int:
+    """
+    Unordered insert, so one bad document does not stop the rest of the batch.
+    Duplicate key errors from a retried chunk are ignored.
+    returns the number of documents inserted
+    """
+    from pymongo.errors import BulkWriteError
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in write_errors):
+            raise e
+        return e.details.get("nInserted", 0)
+
+
+class LoadCheckpoint:
+    """
+    Completed chunks of one source file and collection, saved after every
+    chunk so an interrupted load resumes where it stopped. `complete` is set
+    once every chunk is in, until then ingestion does not run, see
+    `find_incomplete_loads`.
+    """
+
+    def __init__(self, checkpoint_dir:str, source_path:str, database_name:str, collection_name:str, chunk_size:int):
+        checkpoint_key = hashlib.md5(os.path.abspath(source_path).encode()).hexdigest()[:12]
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{collection_name}_{checkpoint_key}.json")
+        self.state = {'source': os.path.abspath(source_path), 'database': database_name, 'collection': collection_name, 'id_version': OBJECT_ID_VERSION,
+                      'chunk_size': chunk_size, 'load_timestamp': int(time.time()), 'completed_chunks': [], 'rows': 0, 'complete': False}
+
+    def load(self)->bool:
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path) as file_obj:
+            self.state = json.load(file_obj)
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        with open(f"{self.checkpoint_path}.tmp", "w") as file_obj:
+            json.dump(self.state, file_obj)
+        os.replace(f"{self.checkpoint_path}.tmp", self.checkpoint_path)
+
+
+def find_incomplete_loads(checkpoint_dir:str, database_name:str, collection_name:str)->List[str]:
+    """
+    Sources of the loads into the collection that started and did not finish.
+    Their chunks are inserted in any order, so part of their ids may be in the
+    collection while lower ones are still missing.
+    """
+    incomplete = []
+    if not os.path.isdir(checkpoint_dir):
+        return incomplete
+    for file_name in sorted(os.listdir(checkpoint_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(checkpoint_dir, file_name)) as file_obj:
+            state = json.load(file_obj)
+        if state.get('database', database_name) != database_name or state.get('collection', collection_name) != collection_name:
+            continue
+        if not state.get('complete', False):
+            incomplete.append(state['source'])
+    return incomplete
+
+
+def start_bulk_load(source_path:str, restart:bool=False, bulk_load_config:Optional[BulkLoadConfig]=None)->int:
+    """
+    Streams a CSV or Parquet file into the collection in chunks, inserted by
+    a pool of `n_workers` threads with at most `max_pending_chunks` chunks
+    in memory. Resumes from the checkpoint of an earlier run unless `restart`.
+    Chunks finish in any order, so ingestion of the collection is refused
+    until the load is complete.
+    returns the number of rows loaded by the source, over all runs
+    """
+    try:
+        bulk_load_config = bulk_load_config or BulkLoadConfig()
+        checkpoint = LoadCheckpoint(bulk_load_config.checkpoint_dir, source_path, bulk_load_config.database_name, bulk_load_config.collection_name, bulk_load_config.chunk_size)
+        if not restart and checkpoint.load():
+            if checkpoint.state.get('id_version') != OBJECT_ID_VERSION:
+                raise Exception(f"Checkpoint: {checkpoint.checkpoint_path} was written by an older loader and cannot be resumed, load again with --restart")
+            logging.info(f"Resuming the Load of {source_path}: {len(checkpoint.state['completed_chunks'])} Chunks already loaded")
+        checkpoint.state['complete'] = False
+        checkpoint.save()
+        chunk_size = checkpoint.state['chunk_size']
+        load_timestamp = checkpoint.state['load_timestamp']
+        source = source_key(source_path)
+        completed_chunks = set(checkpoint.state['completed_chunks'])
+
+        collection = get_collection(database_name=bulk_load_config.database_name, collection_name=bulk_load_config.collection_name)
+        n_rows = 0
+        start_time = time.perf_counter()
+
+        def collect(index:int, future):
+            nonlocal n_rows
+            chunk_rows = future.result()
+            n_rows += chunk_rows
+            completed_chunks.add(index)
+            checkpoint.state['completed_chunks'] = sorted(completed_chunks)
+            checkpoint.state['rows'] += chunk_rows
+            checkpoint.save()
+            elapsed = time.perf_counter() - start_time
+            message = f"Loaded Rows: {n_rows} || {n_rows/max(elapsed, 1e-9):.0f} rows/sec"
+            logging.info(message)
+            print(message)
+
+        with ThreadPoolExecutor(max_workers=bulk_load_config.n_workers) as executor:
+            pending = deque()
+            for index, chunk in enumerate(read_file_chunks(source_path, chunk_size)):
+                if index in completed_chunks:
+                    continue
+                documents = chunk_to_documents(chunk, load_timestamp, source, first_row=index*chunk_size)
+                pending.append((index, executor.submit(insert_documents, collection, documents)))
+                if len(pending) >= bulk_load_config.max_pending_chunks:
+                    collect(*pending.popleft())
+            while len(pending) > 0:
+                collect(*pending.popleft())
+
+        checkpoint.state['complete'] = True
+        checkpoint.save()
+
+        elapsed = time.perf_counter() - start_time
+        logging.info(f"Bulk Load of {source_path} Complete: {n_rows} Rows in {elapsed:.1f}s || {n_rows/max(elapsed, 1e-9):.0f} rows/sec")
+        return checkpoint.state['rows']
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,111 @@
+import os, sys
+import time
+import queue
+import threading
+import numpy as np
+from typing import Callable, Optional
+from concurrent.futures import Future
+from src.inference.feature_batch import concat_features
+from src.logger import logging
+from src.exception import CustomException
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one vectorized call.
+
+    The first queued request opens a window of `max_wait` seconds; every request
+    arriving inside it (up to `max_batch_size` rows) is scored with the same
+    `predict_fn` call and each caller gets back its own slice of the result.
+    predict_fn: ColumnarBatch or DataFrame -> array with one prediction per row
+    """
+
+    def __init__(self, predict_fn:Callable, max_wait:float=0.002, max_batch_size:int=256):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self)->bool:
+        return self.max_batch_size > 1 and self.max_wait > 0
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so a forked worker process starts its own
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def submit(self, features)->Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict(self, features, timeout:Optional[float]=None):
+        if not self.enabled:
+            return self.predict_fn(features)
+        return self.submit(features).result(timeout=timeout)
+
+    def _collect(self)->list:
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _process(self, batch:list):
+        batch = [(features, future) for features, future in batch if future.set_running_or_notify_cancel()]
+        if len(batch) == 0:
+            return
+        try:
+            if len(batch) == 1:
+                frame = batch[0][0]
+            else:
+                frame = concat_features([features for features, _ in batch])
+            pred = np.asarray(self.predict_fn(frame))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad request fails the whole call, scored alone each caller
+            # gets its own result or its own error
+            logging.info(f"Coalesced Prediction of {len(batch)} Requests Failed, Scoring them one by one: {e}")
+            for features, future in batch:
+                try:
+                    future.set_result(np.asarray(self.predict_fn(features)))
+                except Exception as request_error:
+                    future.set_exception(request_error)
+            return
+
+        offset = 0
+        for features, future in batch:
+            n_rows = len(features)
+            future.set_result(pred[offset:offset+n_rows])
+            offset += n_rows
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._collect()
+                self._process(batch)
+            except Exception as e:
+                logging.info(f"Micro Batcher Failed: {CustomException(e, sys)}")
@@ -0,0 +1,172 @@
+import os, sys
+import time
+import threading
+import numpy as np
+from typing import Optional
+from dataclasses import dataclass
+from src.components.model_resolver import ModelResolver
+from src.entity.config_entity import PredictionPipelineConfig
+from src.inference.compiled_transformer import compile_transformer
+from src.inference.binary_bundle import MANIFEST_FILE_NAME, LabelTable, load_binary_bundle
+from src.inference.oblivious_trees import BatchSizeRouter
+from src.inference.metrics import metrics
+from src.utils import load_object
+from src.logger import logging
+from src.exception import CustomException
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    version: int
+    model: object
+    transformer: object
+    target_encoder: object
+
+
+class ModelCache:
+    """
+    Keeps the latest model bundle of the registry in memory.
+
+    The registry is looked at no more than once every `reload_interval` seconds,
+    and only its directory mtime is checked unless it changed. A newer
+    `saved_models/<N>` is loaded by the request that notices it and swapped in
+    as a single reference, so readers never see a half loaded bundle.
+    """
+
+    def __init__(self, model_resolver:Optional[ModelResolver]=None, reload_interval:Optional[float]=30.0, tree_model_max_rows:int=0):
+        self.model_resolver = model_resolver or ModelResolver()
+        self.reload_interval = reload_interval
+        self.tree_model_max_rows = tree_model_max_rows
+        self._bundle: Optional[ModelBundle] = None
+        self._registry_mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self)->Optional[int]:
+        bundle = self._bundle
+        return None if bundle is None else bundle.version
+
+    def _is_check_due(self)->bool:
+        if self.reload_interval is None:
+            return False
+        return time.monotonic() - self._last_check >= self.reload_interval
+
+    def get_bundle(self)->ModelBundle:
+        bundle = self._bundle
+        if bundle is None or self._is_check_due():
+            self.refresh()
+            bundle = self._bundle
+        return bundle
+
+    def load_transformer(self, version:int)->object:
+        """
+        Prefers the compiled preprocessor. Versions pushed before it existed
+        are compiled on load, keeping the sklearn object if that is not possible.
+        """
+        compiled_transformer_path = self.model_resolver.get_compiled_transformer_path(version)
+        if os.path.exists(compiled_transformer_path):
+            return load_object(file_dir=compiled_transformer_path)
+
+        transformer = load_object(file_dir=self.model_resolver.get_transformer_path(version))
+        try:
+            return compile_transformer(transformer)
+        except ValueError as e:
+            logging.info(f"Serving the sklearn Transformer for Version: {version}, Compilation failed: {e}")
+            return transformer
+
+    def load_model(self, version:int)->object:
+        """
+        The CatBoost model. Batches of up to `tree_model_max_rows` rows go to
+        the exported oblivious trees, which only beat CatBoost on small batches.
+        """
+        model = load_object(file_dir=self.model_resolver.get_model_path(version))
+        tree_model_path = self.model_resolver.get_tree_model_path(version)
+        if self.tree_model_max_rows > 0 and os.path.exists(tree_model_path):
+            return BatchSizeRouter(tree_model=load_object(file_dir=tree_model_path), model=model, max_tree_rows=self.tree_model_max_rows)
+        return model
+
+    def load_target_encoder(self, version:int)->LabelTable:
+        """
+        The pickle holds an sklearn LabelEncoder, so unpickling it imports
+        sklearn. Only its classes are kept, in the label table the bundles use.
+        """
+        target_encoder = load_object(file_dir=self.model_resolver.get_target_encoder_path(version))
+        return LabelTable(np.asarray(target_encoder.classes_))
+
+    def load_bundle(self, version:int)->ModelBundle:
+        """
+        Reads the binary bundle of the version, its arrays memory mapped.
+        Versions pushed before the bundle format fall back to the pickles,
+        which import sklearn for their target encoder.
+        """
+        logging.info(f"Loading Model Bundle for Version: {version}")
+        bundle_dir = self.model_resolver.get_bundle_dir(version)
+        with metrics.time_stage("load", model_version=str(version)):
+            if os.path.exists(os.path.join(bundle_dir, MANIFEST_FILE_NAME)):
+                model, transformer, target_encoder = load_binary_bundle(bundle_dir, tree_model_max_rows=self.tree_model_max_rows)
+            else:
+                transformer = self.load_transformer(version)
+                model = self.load_model(version)
+                target_encoder = self.load_target_encoder(version)
+        return ModelBundle(version=version, model=model, transformer=transformer, target_encoder=target_encoder)
+
+    def refresh(self, force:bool=False)->Optional[int]:
+        """
+        Swap in the latest registry version if it differs from the served one.
+        Callers arriving while another thread reloads keep the current bundle.
+        """
+        if not self._lock.acquire(blocking=self._bundle is None or force):
+            return self.version
+        try:
+            if self._bundle is not None and not force and not self._is_check_due():
+                return self.version
+            self._last_check = time.monotonic()
+
+            registry_mtime = os.stat(self.model_resolver.model_registry).st_mtime_ns
+            if self._bundle is not None and not force and registry_mtime == self._registry_mtime:
+                return self.version
+
+            latest_version = self.model_resolver.get_latest_version()
+            if latest_version is None:
+                raise Exception("Model is not available")
+
+            if self._bundle is None or force or latest_version != self._bundle.version:
+                try:
+                    self._bundle = self.load_bundle(latest_version)
+                except Exception as e:
+                    if self._bundle is None:
+                        raise e
+                    # The pusher may still be writing the new version, retry on the next check
+                    logging.info(f"Keeping Model Version: {self._bundle.version}, Version {latest_version} failed to load: {e}")
+                    self._registry_mtime = None
+                    return self.version
+
+            self._registry_mtime = registry_mtime
+            return self.version
+
+        except Exception as e:
+            raise CustomException(e, sys)
+        finally:
+            self._lock.release()
+
+
+_model_cache: Optional[ModelCache] = None
+_model_cache_lock = threading.Lock()
+
+
+def get_model_cache()->ModelCache:
+    """
+    Returns the process wide ModelCache, created on first use.
+    """
+    global _model_cache
+    if _model_cache is None:
+        with _model_cache_lock:
+            if _model_cache is None:
+                prediction_config = PredictionPipelineConfig()
+                _model_cache = ModelCache(
+                    model_resolver=ModelResolver(model_registry=prediction_config.model_registry),
+                    reload_interval=prediction_config.reload_interval,
+                    tree_model_max_rows=prediction_config.tree_model_max_rows
+                )
+    return _model_cache
@@ -1,33 +1,199 @@
 import os, sys 
 import numpy as np 
-import pandas as pd 
 from dataclasses import dataclass 
-from src.components.model_resolver import ModelResolver
-from src.utils import load_object
+from typing import Optional, Union, List, Dict, Tuple
+from src.pipeline.model_cache import ModelCache, get_model_cache
+from src.inference.prediction_cache import PredictionCache, canonical_key
+from src.inference.compiled_transformer import CompiledTransformer
+from src.inference.metrics import metrics, BATCH_SIZE, BATCH_SIZE_BUCKETS, PREDICTIONS_TOTAL
+from src.inference.feature_batch import ColumnarBatch, INPUT_FEATURES, NUMERICAL_FEATURES, CATEGORICAL_FEATURES, NUMERICAL_MASK, take_rows, coerce_numeric, SAMPLE_RECORD
+from src.entity.config_entity import PredictionPipelineConfig
 from src.logger import logging 
-from src.exception import CustomException
+from src.exception import CustomException, InputValidationError
+
+MAX_REPORTED_ROWS = 10
+
 
 class PredictionPipeline:
 
-    def __init__(self):
-        self.model_resolver = ModelResolver()
+    def __init__(self, model_cache:Optional[ModelCache]=None, prediction_config:Optional[PredictionPipelineConfig]=None):
+        self.prediction_config = prediction_config or PredictionPipelineConfig()
+        self.model_cache = model_cache or get_model_cache()
+        self.prediction_cache = None
+        if self.prediction_config.prediction_cache_size > 0:
+            self.prediction_cache = PredictionCache(max_size=self.prediction_config.prediction_cache_size, ttl=self.prediction_config.prediction_cache_ttl)
 
     def predict(self, features):
-        preprocessor_path = self.model_resolver.get_latest_transformer_path()
-        print(preprocessor_path)
-        model_path = self.model_resolver.get_latest_model_path()
-        
-        preprocessor = load_object(file_dir=preprocessor_path)
-        # print(preprocessor.feature_names_in_)
-        model = load_object(file_dir=model_path)
+        if self.prediction_cache is not None:
+            _, pred, _ = self.score(features)
+            return pred
 
-        scaled = preprocessor.transform(features)
-        pred = model.predict(scaled) 
+        bundle = self.get_bundle()
+        pred, _ = self.run_model(bundle, features, with_proba=False)
         
         return pred
 
+    def warmup(self):
+        """
+        Loads the served bundle and runs a sample record through transform
+        and predict, outside the prediction cache and metrics, so the first
+        real request does not pay for loading and first call setup.
+        """
+        bundle = self.get_bundle()
+        features = ColumnarBatch.from_records([SAMPLE_RECORD])
+        scaled = self.transform(bundle, features)
+        bundle.model.predict(scaled)
+        bundle.model.predict_proba(scaled)
+        logging.info(f"Warmed up Model Version: {bundle.version}")
+
+    def get_bundle(self):
+        with metrics.time_stage("registry_lookup"):
+            return self.model_cache.get_bundle()
+
+    def run_model(self, bundle, features, with_proba:bool=True):
+        """
+        One transform and predict call, timed per stage.
+        returns (predictions, positive class probabilities or None)
+        """
+        model_version = str(bundle.version)
+        metrics.observe(BATCH_SIZE, len(features), buckets=BATCH_SIZE_BUCKETS)
+        with metrics.time_stage("transform", model_version=model_version):
+            scaled = self.transform(bundle, features)
+        with metrics.time_stage("predict", model_version=model_version):
+            pred = np.asarray(bundle.model.predict(scaled)).ravel()
+            proba = np.asarray(bundle.model.predict_proba(scaled))[:, 1] if with_proba else None
+        metrics.inc(PREDICTIONS_TOTAL, len(features), model_version=model_version)
+        return pred, proba
+
+    @staticmethod
+    def transform(bundle, features):
+        """
+        The compiled transformer reads a ColumnarBatch as is, the sklearn
+        fallback still needs a DataFrame.
+        """
+        if isinstance(features, ColumnarBatch) and not isinstance(bundle.transformer, CompiledTransformer):
+            features = features.to_DataFrame()
+        return bundle.transformer.transform(features)
+
+    def score(self, features:Union[ColumnarBatch, "pd.DataFrame"]):
+        """
+        Predicted classes and positive class probabilities for every row.
+        Records already seen by the served model version come from the
+        prediction cache, only the rest are transformed and scored.
+        returns (bundle, predictions, probabilities)
+        """
+        bundle = self.get_bundle()
+        if self.prediction_cache is None:
+            pred, proba = self.run_model(bundle, features)
+            return bundle, pred, proba
+
+        with metrics.time_stage("cache_lookup"):
+            rows = zip(*(features[col].tolist() for col in INPUT_FEATURES))
+            keys = [canonical_key(row, NUMERICAL_MASK) for row in rows]
+            values = self.prediction_cache.get_many(keys, bundle.version)
+            miss_rows = [row for row, value in enumerate(values) if value is None]
+        if len(miss_rows) > 0:
+            miss_pred, miss_proba = self.run_model(bundle, take_rows(features, miss_rows))
+            miss_values = list(zip(miss_pred.tolist(), miss_proba.tolist()))
+            self.prediction_cache.put_many([keys[row] for row in miss_rows], miss_values, bundle.version)
+            for row, value in zip(miss_rows, miss_values):
+                values[row] = value
+
+        pred = np.asarray([value[0] for value in values])
+        proba = np.asarray([value[1] for value in values], dtype=np.float64)
+        return bundle, pred, proba
+
+    def cache_stats(self)->dict:
+        if self.prediction_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.prediction_cache.stats()}
+
+    @staticmethod
+    def get_batch_columns(records:Union[List[dict], Dict[str, list]])->Tuple[Dict[str, list], int]:
+        """
+        Accepts either a list of records or a mapping of column name -> values
+        and returns the columnar form and the number of rows, counted from the
+        records, not from the columns, which may all be missing.
+        Keys may use '_' in place of '-'.
+        """
+        if isinstance(records, dict):
+            columns = {str(key).replace('_', '-'): values for key, values in records.items()}
+            if not all(isinstance(values, list) for values in columns.values()):
+                raise InputValidationError("Columnar input must map every column to a list of values")
+            lengths = {len(values) for values in columns.values()}
+            if len(lengths) > 1:
+                raise InputValidationError(f"Columns have different lengths: {sorted(lengths)}")
+            return columns, lengths.pop() if len(lengths) > 0 else 0
+
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise InputValidationError("Input must be a list of records or a mapping of columns")
+
+        keys = {key for record in records for key in record}
+        aliases = {key.replace('_', '-'): key for key in keys}
+        return {col: [record.get(aliases[col]) for record in records] for col in INPUT_FEATURES if col in aliases}, len(records)
+
+    def get_batch_features(self, records:Union[List[dict], Dict[str, list]])->ColumnarBatch:
+        """
+        Validates the input column by column and builds one ColumnarBatch.
+        """
+        columns, n_rows = self.get_batch_columns(records)
+        if len(records) == 0:
+            raise InputValidationError("No records to predict")
+
+        errors = dict()
+        missing_columns = [col for col in INPUT_FEATURES if col not in columns]
+        if len(missing_columns) > 0:
+            raise InputValidationError(f"Missing Columns: {missing_columns}", errors={col: "missing" for col in missing_columns})
+
+        if n_rows == 0:
+            raise InputValidationError("No records to predict")
+        if n_rows > self.prediction_config.max_batch_size:
+            raise InputValidationError(f"Batch of {n_rows} records exceeds the limit of {self.prediction_config.max_batch_size}")
+
+        data = dict()
+        for col in NUMERICAL_FEATURES:
+            data[col], bad_rows = coerce_numeric(columns[col])
+            if len(bad_rows) > 0:
+                errors[col] = f"non numeric values at rows {bad_rows[:MAX_REPORTED_ROWS]}"
+
+        for col in CATEGORICAL_FEATURES:
+            values = columns[col]
+            bad_rows = [row for row, value in enumerate(values) if value is not None and not isinstance(value, str)]
+            if len(bad_rows) > 0:
+                errors[col] = f"non string values at rows {bad_rows[:MAX_REPORTED_ROWS]}"
+            data[col] = values
+
+        if len(errors) > 0:
+            raise InputValidationError(f"Invalid values in columns: {list(errors)}", errors=errors)
+
+        return ColumnarBatch.from_columns(data)
+
+    def predict_batch(self, records:Union[List[dict], Dict[str, list]])->dict:
+        """
+        Scores a whole batch with one transform and one predict call.
+        returns the model version, predicted classes, their labels and the
+        probability of the positive class, in input order.
+        """
+        with metrics.time_stage("convert"):
+            data = self.get_batch_features(records)
+        try:
+            bundle, pred, proba = self.score(data)
+            pred = pred.astype(int)
+            labels = bundle.target_encoder.inverse_transform(pred)
+
+            return {
+                'model_version': bundle.version,
+                'predictions': pred.tolist(),
+                'labels': [str(label) for label in labels],
+                'probabilities': proba.tolist()
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
 
 class CustomClass:
+    __slots__ = ('age', 'fnlwgt', 'workclass', 'education', 'education_num', 'marital_status', 'occupation', 'relationship', 'race', 'sex', 'capital_gain', 'capital_loss', 'hours_per_week', 'native_country')
+
     def __init__(self, age:int, fnlwgt:int, workclass:str, education:str, education_num:int, marital_status:str, occupation:str, relationship:str, race:str, sex:str, capital_gain:int, capital_loss:int, hours_per_week:int, native_country:str):
         # Current FEATURES:['age', 'workclass', 'fnlwgt', 'education', 'education-num', 'marital-status', 'occupation', 'relationship', 'race', 'sex', 'capital-gain', 'capital-loss', 'hours-per-week', 'native-country']
         
@@ -48,6 +214,7 @@ class CustomClass:
 
     def get_data_DataFrame(self):
         try:
+            import pandas as pd
             custom_input = {
                 'age':[self.age],
                 'fnlwgt':[self.fnlwgt],
@@ -69,5 +236,17 @@ class CustomClass:
             data = pd.DataFrame(custom_input)
             return data
         except Exception as e:
-            raise CustomException(e, sys)    
-    
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def get_record(self)->tuple:
+        """
+        Feature values in INPUT_FEATURES order.
+        """
+        return (self.age, self.workclass, self.fnlwgt, self.education, self.education_num, self.marital_status, self.occupation,
+                self.relationship, self.race, self.sex, self.capital_gain, self.capital_loss, self.hours_per_week, self.native_country)
+
+    def get_feature_batch(self)->ColumnarBatch:
+        """
+        One row ColumnarBatch, the pandas free input of the prediction pipeline.
+        """
+        return ColumnarBatch.from_records([self.get_record()])
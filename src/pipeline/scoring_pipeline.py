@@ -0,0 +1,127 @@
+import os, sys
+import time
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Iterator, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from src.components.model_resolver import ModelResolver
+from src.pipeline.model_cache import ModelCache, ModelBundle
+from src.inference.cleaning import clean_frame
+from src.utils import read_file_chunks, PARQUET_EXTENSIONS
+from src.entity.config_entity import ScoringConfig
+from src.logger import logging
+from src.exception import CustomException
+
+# Bundle loaded once per scoring process by `init_scoring_worker`
+_worker_bundle: Optional[ModelBundle] = None
+
+
+def init_scoring_worker(model_registry:str, version:int):
+    global _worker_bundle
+    # Chunks are far past the batch size the tree evaluator is faster at, so CatBoost scores them
+    model_cache = ModelCache(model_resolver=ModelResolver(model_registry=model_registry), reload_interval=None, tree_model_max_rows=0)
+    _worker_bundle = model_cache.load_bundle(version)
+
+
+def score_chunk(chunk:pd.DataFrame, keep_columns:List[str])->pd.DataFrame:
+    """
+    Scores one chunk with the bundle of the current process.
+    returns keep_columns followed by prediction, label and probability
+    """
+    try:
+        bundle = _worker_bundle
+        chunk = clean_frame(chunk)
+
+        scaled = bundle.transformer.transform(chunk[list(bundle.transformer.feature_names_in_)])
+        pred = np.asarray(bundle.model.predict(scaled)).ravel().astype(int)
+        proba = bundle.model.predict_proba(scaled)[:, 1]
+
+        scored = chunk[keep_columns].reset_index(drop=True)
+        scored['prediction'] = pred
+        scored['label'] = bundle.target_encoder.inverse_transform(pred)
+        scored['probability'] = proba
+        return scored
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ChunkWriter:
+    """
+    Appends scored chunks to a CSV or Parquet file as they arrive.
+    """
+
+    def __init__(self, output_path:str):
+        self.output_path = output_path
+        self.is_parquet = output_path.lower().endswith(PARQUET_EXTENSIONS)
+        self._parquet_writer = None
+        self._header_written = False
+        output_dir = os.path.dirname(output_path)
+        if output_dir != "":
+            os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, scored:pd.DataFrame):
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            scored.to_csv(self.output_path, mode='a' if self._header_written else 'w', header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def start_scoring_pipeline(input_path:str, output_path:str, keep_columns:Optional[List[str]]=None, scoring_config:Optional[ScoringConfig]=None)->int:
+    """
+    Streams `input_path` in chunks through the latest saved model and writes
+    the predictions to `output_path` in input order. Chunks are scored on a
+    process pool with at most `max_pending_chunks` of them held in memory.
+    returns the number of scored rows
+    """
+    try:
+        scoring_config = scoring_config or ScoringConfig()
+        keep_columns = keep_columns or []
+        model_resolver = ModelResolver(model_registry=scoring_config.model_registry)
+        version = model_resolver.get_latest_version()
+        if version is None:
+            raise Exception("Model is not available")
+        logging.info(f"Scoring {input_path} with Model Version: {version} || Workers: {scoring_config.n_workers}")
+
+        writer = ChunkWriter(output_path=output_path)
+        n_rows = 0
+        start_time = time.perf_counter()
+        try:
+            if scoring_config.n_workers <= 1:
+                init_scoring_worker(scoring_config.model_registry, version)
+                for chunk in read_file_chunks(input_path, scoring_config.chunk_size):
+                    scored = score_chunk(chunk, keep_columns)
+                    writer.write(scored)
+                    n_rows += len(scored)
+            else:
+                with ProcessPoolExecutor(max_workers=scoring_config.n_workers, initializer=init_scoring_worker, initargs=(scoring_config.model_registry, version)) as executor:
+                    pending = deque()
+                    for chunk in read_file_chunks(input_path, scoring_config.chunk_size):
+                        pending.append(executor.submit(score_chunk, chunk, keep_columns))
+                        if len(pending) >= scoring_config.max_pending_chunks:
+                            scored = pending.popleft().result()
+                            writer.write(scored)
+                            n_rows += len(scored)
+                    while len(pending) > 0:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        n_rows += len(scored)
+        finally:
+            writer.close()
+
+        elapsed = time.perf_counter() - start_time
+        logging.info(f"Scored Rows: {n_rows} in {elapsed:.1f}s || {n_rows/max(elapsed, 1e-9):.0f} rows/sec")
+        return n_rows
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,212 @@
+import os, sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import threading
+import dataclasses
+from typing import Callable, List, Optional
+from src.entity.config_entity import StageCacheConfig
+from src.logger import logging
+from src.exception import CustomException
+
+ARTIFACT_FILE_NAME = "artifact.json"
+HASH_INDEX_FILE_NAME = "file_hashes.json"
+PATH_FIELD_SUFFIXES = ("_dir", "_path")
+# Config fields that change how a stage runs but not what it produces
+EXECUTION_ONLY_FIELDS = ("n_workers", "resampling_workers", "predict_chunk_size")
+# Libraries whose versions change the fitted and pickled artifacts
+FINGERPRINT_LIBRARIES = ("numpy", "pandas", "scipy", "pyarrow", "scikit-learn", "imbalanced-learn", "catboost", "dill")
+
+
+def library_versions()->dict:
+    from importlib.metadata import version, PackageNotFoundError
+    versions = dict()
+    for name in FINGERPRINT_LIBRARIES:
+        try:
+            versions[name] = version(name)
+        except PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def is_path_field(name:str)->bool:
+    return name.endswith(PATH_FIELD_SUFFIXES)
+
+
+def get_dir_size(dir_path:str)->int:
+    return sum(os.path.getsize(os.path.join(root, file_name)) for root, _, file_names in os.walk(dir_path) for file_name in file_names)
+
+
+class StageCache:
+    """
+    Reuses the artifact of a pipeline stage when nothing it depends on changed.
+
+    A stage's fingerprint hashes its config values (paths inside the run's
+    artifact dir and execution only settings left out), the content of its
+    upstream artifacts, the source of the code it runs and the versions of
+    the libraries that fit and pickle the artifacts. A hit returns the artifact stored under
+    `<cache_dir>/<stage>/<fingerprint>`; a miss runs the stage and copies its
+    output files there. Entries are evicted least recently used first once
+    the cache grows past `max_size_bytes`.
+    """
+
+    def __init__(self, stage_cache_config:StageCacheConfig, artifact_dir:str, force:bool=False):
+        self.cache_dir = stage_cache_config.cache_dir
+        self.max_size_bytes = stage_cache_config.max_size_bytes
+        self.artifact_dir = artifact_dir
+        self.force = force
+        self.libraries = library_versions()
+        # Entries whose artifacts this run uses are never evicted by it
+        self._entries_in_use = set()
+        # Stages may run concurrently, they share the hash index and the eviction
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hash_index_path = os.path.join(self.cache_dir, HASH_INDEX_FILE_NAME)
+        self.hash_index = dict()
+        if os.path.exists(self.hash_index_path):
+            with open(self.hash_index_path) as file_obj:
+                self.hash_index = json.load(file_obj)
+
+    def file_hash(self, file_path:str)->str:
+        """
+        sha256 of a file, remembered by path, size and mtime so unchanged
+        files such as feature store parts are hashed once.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = self.hash_index.get(file_path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(1 << 20), b""):
+                digest.update(block)
+        self.hash_index[file_path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path_hash(self, path:str)->str:
+        if os.path.isfile(path):
+            return self.file_hash(path)
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(root, file_name)
+                    digest.update(os.path.relpath(file_path, path).encode())
+                    digest.update(self.file_hash(file_path).encode())
+            return digest.hexdigest()
+        return "missing"
+
+    def fingerprint(self, stage_name:str, config:object, upstream_artifacts:list, code:list, inputs:List[str])->str:
+        with self._lock:
+            return self._fingerprint(stage_name, config, upstream_artifacts, code, inputs)
+
+    def _fingerprint(self, stage_name:str, config:object, upstream_artifacts:list, code:list, inputs:List[str])->str:
+        config_values = {key: value for key, value in vars(config).items()
+                         if key not in EXECUTION_ONLY_FIELDS and not (isinstance(value, str) and self.artifact_dir in value)}
+        upstream = []
+        for artifact in upstream_artifacts:
+            fields = dict()
+            for name, value in dataclasses.asdict(artifact).items():
+                fields[name] = self.path_hash(value) if is_path_field(name) else value
+            upstream.append({'type': type(artifact).__name__, 'fields': fields})
+        code_hashes = sorted(self.file_hash(inspect.getsourcefile(obj)) for obj in code)
+        input_hashes = {path: self.path_hash(path) for path in inputs}
+
+        payload = json.dumps({'stage': stage_name, 'config': config_values, 'upstream': upstream, 'code': code_hashes, 'inputs': input_hashes,
+                              'libraries': self.libraries}, sort_keys=True, default=str)
+        with open(self.hash_index_path, "w") as file_obj:
+            json.dump(self.hash_index, file_obj)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def load(self, entry_dir:str, artifact_cls:type)->Optional[object]:
+        artifact_file = os.path.join(entry_dir, ARTIFACT_FILE_NAME)
+        if not os.path.exists(artifact_file):
+            return None
+        with open(artifact_file) as file_obj:
+            stored = json.load(file_obj)
+        fields = {name: os.path.join(entry_dir, value['path']) if 'path' in value else value['value'] for name, value in stored.items()}
+        os.utime(entry_dir)
+        return artifact_cls(**fields)
+
+    def save(self, entry_dir:str, artifact:object):
+        """
+        Copies the artifact's files into the entry, artifact.json is written last.
+        """
+        tmp_dir = f"{entry_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        stored = dict()
+        for name, value in dataclasses.asdict(artifact).items():
+            if not is_path_field(name):
+                stored[name] = {'value': value}
+                continue
+            relative_path = os.path.join("files", name, os.path.basename(os.path.normpath(value)))
+            if os.path.isdir(value):
+                shutil.copytree(value, os.path.join(tmp_dir, relative_path))
+            elif os.path.isfile(value):
+                os.makedirs(os.path.dirname(os.path.join(tmp_dir, relative_path)), exist_ok=True)
+                shutil.copy2(value, os.path.join(tmp_dir, relative_path))
+            stored[name] = {'path': relative_path}
+        with open(os.path.join(tmp_dir, ARTIFACT_FILE_NAME), "w") as file_obj:
+            json.dump(stored, file_obj, indent=2)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        # Entries in use count towards the size but are not evicted
+        total_size = 0
+        for stage_name in os.listdir(self.cache_dir):
+            stage_dir = os.path.join(self.cache_dir, stage_name)
+            if not os.path.isdir(stage_dir):
+                continue
+            for fingerprint in os.listdir(stage_dir):
+                entry_dir = os.path.join(stage_dir, fingerprint)
+                if fingerprint.endswith(".tmp"):
+                    continue
+                size = get_dir_size(entry_dir)
+                total_size += size
+                if entry_dir not in self._entries_in_use:
+                    entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            logging.info(f"Evicting Stage Cache Entry: {entry_dir} || {size} bytes")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+
+    def run(self, stage_name:str, config:object, upstream_artifacts:list, code:list, artifact_cls:type, stage_fn:Callable[[], object], inputs:Optional[List[str]]=None)->object:
+        """
+        Returns the cached artifact of the stage, or runs `stage_fn` and caches its artifact.
+        code: modules, classes or functions whose source files the stage runs
+        inputs: files read by the stage that are not upstream artifacts
+        """
+        try:
+            fingerprint = self.fingerprint(stage_name, config, upstream_artifacts, code, inputs or [])
+            entry_dir = os.path.join(self.cache_dir, stage_name, fingerprint)
+            self._entries_in_use.add(entry_dir)
+            if not self.force:
+                artifact = self.load(entry_dir, artifact_cls)
+                if artifact is not None:
+                    logging.info(f"Stage Cache Hit: {stage_name} || Fingerprint: {fingerprint[:12]}")
+                    print(f"{'='*20} {stage_name}: Reusing Cached Artifact {'='*20}")
+                    return artifact
+
+            logging.info(f"Stage Cache Miss: {stage_name} || Fingerprint: {fingerprint[:12]}")
+            start_time = time.perf_counter()
+            artifact = stage_fn()
+            logging.info(f"Stage: {stage_name} ran in {time.perf_counter()-start_time:.1f}s, Caching its Artifact")
+            self.save(entry_dir, artifact)
+            self.evict()
+            return artifact
+
+        except Exception as e:
+            raise CustomException(e, sys)
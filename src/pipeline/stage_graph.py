@@ -0,0 +1,200 @@
+import os, sys
+import json
+import time
+import threading
+import dataclasses
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from src.pipeline.stage_cache import is_path_field
+from src.logger import logging
+from src.exception import CustomException
+
+RUN_STATE_FILE_NAME = "run_state.json"
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class Stage:
+    """
+    name: unique name of the stage
+    depends_on: names of the stages whose artifacts it needs
+    artifact_cls: dataclass of the artifact it returns
+    run: called with the artifacts of finished stages, by stage name
+    """
+    name: str
+    depends_on: List[str]
+    artifact_cls: type
+    run: Callable[[Dict[str, object]], object]
+
+
+def find_incomplete_run(artifact_root_dir:str)->Optional[str]:
+    """
+    returns the artifact dir of the latest run that did not finish, if any
+    """
+    if not os.path.isdir(artifact_root_dir):
+        return None
+    runs = []
+    for run_name in os.listdir(artifact_root_dir):
+        run_state_path = os.path.join(artifact_root_dir, run_name, RUN_STATE_FILE_NAME)
+        if os.path.exists(run_state_path):
+            with open(run_state_path) as file_obj:
+                run_state = json.load(file_obj)
+            if run_state['status'] != SUCCEEDED:
+                runs.append((run_state['started_at'], os.path.join(artifact_root_dir, run_name)))
+    if len(runs) == 0:
+        return None
+    return max(runs)[1]
+
+
+class StageGraph:
+    """
+    Runs stages as soon as the stages they depend on have succeeded, up to
+    `n_workers` at a time.
+
+    The status, timing and artifact of every stage are written to
+    `<artifact_dir>/run_state.json` as they change. Resuming a run restores
+    the artifacts of its succeeded stages from that file and runs the rest,
+    starting from the stage that failed.
+    """
+
+    def __init__(self, stages:List[Stage], artifact_dir:str, n_workers:int=2):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        for stage in stages:
+            unknown = [name for name in stage.depends_on if name not in self.stages]
+            if len(unknown) > 0:
+                raise ValueError(f"Stage: {stage.name} depends on unknown stages: {unknown}")
+        self.order = self.topological_order()
+        self.artifact_dir = artifact_dir
+        self.n_workers = n_workers
+        self.run_state_path = os.path.join(artifact_dir, RUN_STATE_FILE_NAME)
+        self._lock = threading.Lock()
+        self.run_state = None
+
+    def topological_order(self)->List[str]:
+        order, visiting, visited = [], set(), set()
+
+        def visit(name:str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through: {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def save_run_state(self, **fields):
+        """
+        Sets `fields` on the run state and writes it. Stage threads change the
+        state while others write it, so both happen under the lock.
+        """
+        with self._lock:
+            self.run_state.update(fields)
+            self._write_run_state()
+
+    def update_stage(self, name:str, **fields):
+        with self._lock:
+            self.run_state['stages'][name].update(fields)
+            self._write_run_state()
+
+    def _write_run_state(self):
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        with open(f"{self.run_state_path}.tmp", "w") as file_obj:
+            json.dump(self.run_state, file_obj, indent=2)
+        os.replace(f"{self.run_state_path}.tmp", self.run_state_path)
+
+    def restore(self)->Dict[str, object]:
+        """
+        Loads the run state of the artifact dir, returns the artifacts of its
+        succeeded stages. A stage whose files are gone, e.g. evicted from the
+        stage cache since, runs again, and so do the stages after it.
+        """
+        with open(self.run_state_path) as file_obj:
+            self.run_state = json.load(file_obj)
+        artifacts = dict()
+        for name in self.order:
+            stage_state = self.run_state['stages'].get(name)
+            if stage_state is not None and stage_state['status'] == SUCCEEDED:
+                missing_paths = [stage_state['artifact'][field] for field in stage_state.get('present_paths', []) if not os.path.exists(stage_state['artifact'][field])]
+                if len(missing_paths) > 0:
+                    logging.info(f"Stage: {name} runs again, its files are missing: {missing_paths}")
+                elif all(dependency in artifacts for dependency in self.stages[name].depends_on):
+                    artifacts[name] = self.stages[name].artifact_cls(**stage_state['artifact'])
+                    continue
+            self.run_state['stages'][name] = {'status': PENDING, 'depends_on': self.stages[name].depends_on}
+        logging.info(f"Resuming Run: {self.artifact_dir} || Restored Stages: {list(artifacts)}")
+        return artifacts
+
+    def run_stage(self, name:str, artifacts:Dict[str, object])->object:
+        self.update_stage(name, status=RUNNING, started_at=datetime.now().isoformat())
+        start_time = time.perf_counter()
+        logging.info(f"Starting Stage: {name}")
+        artifact = self.stages[name].run(artifacts)
+        fields = dataclasses.asdict(artifact)
+        # Paths that may legitimately be absent, like an optional export, are not checked on resume
+        present_paths = [field for field, value in fields.items() if is_path_field(field) and isinstance(value, str) and os.path.exists(value)]
+        self.update_stage(name, status=SUCCEEDED, duration_s=round(time.perf_counter() - start_time, 3), artifact=fields, present_paths=present_paths)
+        logging.info(f"Stage: {name} Succeeded in {time.perf_counter() - start_time:.1f}s")
+        return artifact
+
+    def execute(self, resume:bool=False)->Dict[str, object]:
+        """
+        Runs the graph, or what is left of an earlier run with `resume`.
+        returns the artifacts of all the stages, by stage name
+        """
+        try:
+            if resume and os.path.exists(self.run_state_path):
+                artifacts = self.restore()
+            else:
+                artifacts = dict()
+                self.run_state = {'started_at': datetime.now().isoformat(), 'stages': {name: {'status': PENDING, 'depends_on': self.stages[name].depends_on} for name in self.order}}
+            self.save_run_state(status=RUNNING)
+
+            failure = None
+            running = dict()
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                while True:
+                    if failure is None:
+                        for name in self.order:
+                            if name in artifacts or name in running.values():
+                                continue
+                            if all(dependency in artifacts for dependency in self.stages[name].depends_on):
+                                # Each stage gets its own copy, stages finishing meanwhile do not change it
+                                running[executor.submit(self.run_stage, name, dict(artifacts))] = name
+                    if len(running) == 0:
+                        break
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            artifacts[name] = future.result()
+                        except Exception as e:
+                            logging.info(f"Stage: {name} Failed || {e}")
+                            self.update_stage(name, status=FAILED, error=str(e))
+                            failure = failure or e
+
+            for name in self.order:
+                if self.run_state['stages'][name]['status'] == PENDING:
+                    self.update_stage(name, status=SKIPPED)
+            self.save_run_state(status=FAILED if failure is not None else SUCCEEDED)
+            if failure is not None:
+                raise failure
+            return artifacts
+
+        except Exception as e:
+            raise CustomException(e, sys)
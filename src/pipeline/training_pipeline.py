@@ -1,4 +1,5 @@
 import os, sys
+from typing import List
 from src.exception import CustomException
 from src.logger import logging
 from src.entity import config_entity, artifact_entity
@@ -8,38 +9,89 @@ from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
 from src.components.model_evaluation import ModelEvaluation
 from src.components.model_pusher import ModelPusher
+from src.components import reference_profile, resampling
+from src.inference import cleaning, compiled_transformer, oblivious_trees
+from src.pipeline.stage_cache import StageCache
+from src.pipeline.stage_graph import Stage, StageGraph, find_incomplete_run
+from src import utils
 
 
-def start_training_pipeline():
-    try:
-        training_pipeline_config = config_entity.TrainingPipelineConfig()
+def build_training_stages(training_pipeline_config:config_entity.TrainingPipelineConfig, stage_cache:StageCache)->List[Stage]:
+    """
+    The training pipeline as a graph: validation and transformation only need
+    the ingested data and run side by side, training waits for both so a failed
+    validation still stops the run.
+    """
+
+    def run_data_ingestion(artifacts):
         data_ingestion_config = config_entity.DataIngestionConfig(training_pipeline_config=training_pipeline_config)
         data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
-        data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+        return data_ingestion.initiate_data_ingestion()
 
-        
+    def run_data_validation(artifacts):
         data_validation_config = config_entity.DataValidationConfig(training_pipeline_config=training_pipeline_config)
-        data_validation = DataValidation(data_validation_config=data_validation_config, data_ingestion_artifact=data_ingestion_artifact)
-        data_validation_artifact = data_validation.initiate_data_validation()
-        
+        data_validation = DataValidation(data_validation_config=data_validation_config, data_ingestion_artifact=artifacts['data_ingestion'])
+        return stage_cache.run(stage_name="data_validation", config=data_validation_config, upstream_artifacts=[artifacts['data_ingestion']],
+                               code=[DataValidation, reference_profile, cleaning, utils], artifact_cls=artifact_entity.DataValidationArtifact,
+                               stage_fn=data_validation.initiate_data_validation, inputs=[data_validation_config.base_file_dir])
+
+    def run_data_transformation(artifacts):
         data_transformation_config = config_entity.DataTransformationConfig(training_pipeline_config=training_pipeline_config)
-        data_transformation = DataTransformation(data_transformation_config=data_transformation_config, data_ingestion_artifact=data_ingestion_artifact)
-        data_transformation_artifact = data_transformation.initiate_data_transformation()
-        
+        data_transformation = DataTransformation(data_transformation_config=data_transformation_config, data_ingestion_artifact=artifacts['data_ingestion'])
+        return stage_cache.run(stage_name="data_transformation", config=data_transformation_config, upstream_artifacts=[artifacts['data_ingestion']],
+                               code=[DataTransformation, compiled_transformer, resampling, utils], artifact_cls=artifact_entity.DataTransformationArtifacts,
+                               stage_fn=data_transformation.initiate_data_transformation)
 
+    def run_model_trainer(artifacts):
         model_trainer_config = config_entity.ModelTrainerConfig(training_pipeline_config=training_pipeline_config)
-        model_trainer = ModelTrainer(model_trainer_config=model_trainer_config, data_transformation_artifact=data_transformation_artifact)
-        model_trainer_artifact = model_trainer.initiate_model_trainer()
+        model_trainer = ModelTrainer(model_trainer_config=model_trainer_config, data_transformation_artifact=artifacts['data_transformation'])
+        model_trainer_artifact = stage_cache.run(stage_name="model_trainer", config=model_trainer_config, upstream_artifacts=[artifacts['data_transformation']],
+                                                 code=[ModelTrainer, oblivious_trees, utils], artifact_cls=artifact_entity.ModelTrainerArtifact,
+                                                 stage_fn=model_trainer.initiate_model_trainer)
         print(model_trainer_artifact)
+        return model_trainer_artifact
 
+    def run_model_evaluation(artifacts):
         model_eval_config = config_entity.ModelEvaluationConfig(training_pipeline_config=training_pipeline_config)
-        model_eval = ModelEvaluation(model_eval_config=model_eval_config, data_transformation_artifact=data_transformation_artifact, data_ingestion_artifact=data_ingestion_artifact, model_trainer_artifact=model_trainer_artifact)
-        model_eval_artifact = model_eval.initiate_model_evaluation()
+        model_eval = ModelEvaluation(model_eval_config=model_eval_config, data_transformation_artifact=artifacts['data_transformation'], data_ingestion_artifact=artifacts['data_ingestion'], model_trainer_artifact=artifacts['model_trainer'])
+        return model_eval.initiate_model_evaluation()
 
+    def run_model_pusher(artifacts):
         model_pusher_config = config_entity.ModelPusherConfig(training_pipeline_config=training_pipeline_config)
-        model_pusher = ModelPusher(model_pusher_config=model_pusher_config, data_transformation_artifact=data_transformation_artifact, model_trainer_artifact=model_trainer_artifact)
+        model_pusher = ModelPusher(model_pusher_config=model_pusher_config, data_transformation_artifact=artifacts['data_transformation'], model_trainer_artifact=artifacts['model_trainer'])
         model_pusher_artifact = model_pusher.initiate_model_pusher()
         print(model_pusher_artifact)
-    
+        return model_pusher_artifact
+
+    return [
+        Stage(name="data_ingestion", depends_on=[], artifact_cls=artifact_entity.DataIngestionArtifact, run=run_data_ingestion),
+        Stage(name="data_validation", depends_on=["data_ingestion"], artifact_cls=artifact_entity.DataValidationArtifact, run=run_data_validation),
+        Stage(name="data_transformation", depends_on=["data_ingestion"], artifact_cls=artifact_entity.DataTransformationArtifacts, run=run_data_transformation),
+        Stage(name="model_trainer", depends_on=["data_validation", "data_transformation"], artifact_cls=artifact_entity.ModelTrainerArtifact, run=run_model_trainer),
+        Stage(name="model_evaluation", depends_on=["data_ingestion", "data_transformation", "model_trainer"], artifact_cls=artifact_entity.ModelEvaluationArtifact, run=run_model_evaluation),
+        Stage(name="model_pusher", depends_on=["data_transformation", "model_trainer", "model_evaluation"], artifact_cls=artifact_entity.ModelPusherArtifact, run=run_model_pusher),
+    ]
+
+
+def start_training_pipeline(force:bool=False, resume:str=None):
+    """
+    force: recompute every stage instead of reusing cached artifacts
+    resume: artifact dir of a failed run to continue from its failed stage,
+            "latest" for the last run that did not finish
+    """
+    try:
+        training_pipeline_config = config_entity.TrainingPipelineConfig()
+        if resume == "latest":
+            resume = find_incomplete_run(training_pipeline_config.artifact_root_dir)
+            if resume is None:
+                logging.info("No unfinished Run to resume, Starting a new Run")
+        if resume is not None:
+            training_pipeline_config = config_entity.TrainingPipelineConfig(artifact_dir=resume)
+
+        stage_cache = StageCache(stage_cache_config=config_entity.StageCacheConfig(), artifact_dir=training_pipeline_config.artifact_dir, force=force)
+        stage_graph = StageGraph(stages=build_training_stages(training_pipeline_config, stage_cache),
+                                 artifact_dir=training_pipeline_config.artifact_dir, n_workers=training_pipeline_config.n_workers)
+        return stage_graph.execute(resume=resume is not None)
+
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
@@ -1,30 +1,179 @@
 import yaml
 import dill
+import json
 import os, sys 
-import pandas as pd 
 import numpy as np 
+from typing import Dict, Iterator, List, Optional
 from src.logger import logging
 from src.exception import CustomException
-from src.config import mongo_client
 
+FEATURE_STORE_FORMAT_VERSION = 1
+FEATURE_HEADER_FILE_NAME = "header.json"
+DENSE_LAYOUT = "dense"
+SPARSE_LAYOUT = "csr"
 
-def get_collection_dataframe(database_name:str, collection_name:str)->pd.DataFrame:
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def get_collection(database_name:str, collection_name:str):
+    # Imported here so that serving, which only loads objects, stays free of pymongo
+    from src.config import mongo_client
+    return mongo_client[database_name][collection_name]
+
+
+def iter_collection_chunks(collection, chunk_size:int=50000, batch_size:int=5000, query:dict=None, include_id:bool=False, sort_key:str=None)->Iterator["pd.DataFrame"]:
+    """
+    Streams a collection as DataFrames of up to `chunk_size` rows.
+    `_id` is left out by the projection unless `include_id`, and the cursor
+    fetches `batch_size` documents per round trip, so only one chunk of
+    documents is held at a time.
+    collection: pymongo Collection or any object with a compatible `find`
+    sort_key: field the documents are returned in ascending order of
+    """
+    try:
+        import pandas as pd
+        cursor = collection.find(query or {}, None if include_id else {"_id": 0})
+        if sort_key is not None:
+            cursor = cursor.sort(sort_key, 1)
+        cursor = cursor.batch_size(batch_size)
+        columns: Dict[str, list] = dict()
+        n_rows = 0
+        for document in cursor:
+            for col in document:
+                if col not in columns:
+                    columns[col] = [None] * n_rows
+            for col, values in columns.items():
+                values.append(document.get(col))
+            n_rows += 1
+            if n_rows == chunk_size:
+                yield pd.DataFrame(columns)
+                columns = {col: [] for col in columns}
+                n_rows = 0
+        if n_rows > 0:
+            yield pd.DataFrame(columns)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def get_collection_dataframe(database_name:str, collection_name:str)->"pd.DataFrame":
     """
     This Function retrieves the dataset from the backend server
     """
     try:
+        import pandas as pd
         logging.info(f"Reading Data From DataBase: {database_name}, Collection: {collection_name}")
-        df = pd.DataFrame(list(mongo_client[database_name][collection_name].find()))
+        chunks = list(iter_collection_chunks(get_collection(database_name, collection_name)))
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 0 else pd.DataFrame()
         logging.info(f"Data Rows: {df.shape[0]} || Columns: {df.shape[1]}")
-        if "_id" in df:
-            df = df.drop("_id", axis=1)
-        
         return df
 
     except Exception as e:
         raise CustomException(e, sys)
 
 
+def read_file_chunks(file_path:str, chunk_size:int)->Iterator["pd.DataFrame"]:
+    """
+    Streams a CSV or Parquet file as DataFrames of up to `chunk_size` rows.
+    """
+    if file_path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(file_path, chunksize=chunk_size)
+
+
+def compact_dtypes(df:"pd.DataFrame")->"pd.DataFrame":
+    """
+    String columns become categoricals and integer columns the smallest
+    integer type holding their values. Float columns are left as they are.
+    """
+    try:
+        import pandas as pd
+        for col in df.columns:
+            if df[col].dtype == 'O':
+                df[col] = df[col].astype("category")
+            elif pd.api.types.is_integer_dtype(df[col].dtype):
+                df[col] = pd.to_numeric(df[col], downcast="integer")
+        return df
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def write_feature_store_part(store_dir:str, part_name:str, df:"pd.DataFrame"):
+    """
+    Writes one Parquet part file of a feature store directory.
+    """
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        part_dir = os.path.join(store_dir, part_name)
+        df.to_parquet(f"{part_dir}.tmp", index=False, engine="pyarrow")
+        os.replace(f"{part_dir}.tmp", part_dir)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def list_feature_store_parts(store_dir:str)->List[str]:
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(file_name for file_name in os.listdir(store_dir) if file_name.endswith(".parquet"))
+
+
+def get_feature_store_columns(store_dir:str)->List[str]:
+    """
+    Column names of a feature store directory, read from the Parquet schema only.
+    """
+    try:
+        import pyarrow.parquet as pq
+        part_names = list_feature_store_parts(store_dir)
+        if len(part_names) == 0:
+            raise Exception(f"Feature Store: {store_dir} has no data")
+        return [name for name in pq.read_schema(os.path.join(store_dir, part_names[0])).names if not name.startswith("__index_level_")]
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def iter_feature_store(store_dir:str, columns:Optional[List[str]]=None)->Iterator["pd.DataFrame"]:
+    """
+    Yields the Parquet parts of a feature store directory one at a time.
+    """
+    import pandas as pd
+    for part_name in list_feature_store_parts(store_dir):
+        yield pd.read_parquet(os.path.join(store_dir, part_name), columns=columns, engine="pyarrow")
+
+
+def read_feature_store(store_dir:str, columns:Optional[List[str]]=None)->"pd.DataFrame":
+    """
+    Reads the Parquet parts of a feature store directory into one DataFrame.
+    columns: only these columns are read from disk
+    Categoricals of the parts are merged into one category set, integer
+    columns are widened to the largest part type.
+    """
+    try:
+        import pandas as pd
+        frames = list(iter_feature_store(store_dir, columns=columns))
+        if len(frames) == 0:
+            raise Exception(f"Feature Store: {store_dir} has no data")
+        if len(frames) == 1:
+            return frames[0]
+
+        for col in frames[0].columns:
+            if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+                categories = pd.api.types.union_categoricals([frame[col] for frame in frames]).categories
+                for frame in frames:
+                    frame[col] = frame[col].cat.set_categories(categories)
+        return pd.concat(frames, ignore_index=True)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 def write_yaml_file(file_path:str, data:dict):
     try:
         file_dir = os.path.dirname(file_path)
@@ -67,6 +216,108 @@ def load_numpy_obj(file_dir: str)-> np.array:
     except Exception as e:
         raise CustomException(e, sys)
 
+def as_feature_matrix(features, dtype:str="float32"):
+    """
+    Transformer output as a CSR matrix when sparse, else a dense array, of `dtype`.
+    """
+    from scipy import sparse
+    if sparse.issparse(features):
+        return features.tocsr().astype(dtype, copy=False)
+    return np.asarray(features, dtype=dtype)
+
+
+def save_feature_matrix(dir_path:str, features, target:np.ndarray, feature_names:Optional[List[str]]=None, target_column:Optional[str]=None):
+    """
+    Saves a split as a directory of .npy files that load memory mapped:
+    features.npy for a dense matrix, or its CSR data, indices and indptr
+    arrays for a sparse one, and target.npy. header.json records the layout,
+    shape, dtypes, feature names and target column, and is written last.
+    """
+    try:
+        from scipy import sparse
+        logging.info(f"Saving the Feature Matrix: {features.shape} || Sparse: {sparse.issparse(features)} || dtype: {features.dtype}")
+        os.makedirs(dir_path, exist_ok=True)
+        header_path = os.path.join(dir_path, FEATURE_HEADER_FILE_NAME)
+        if os.path.exists(header_path):
+            os.remove(header_path)
+
+        if sparse.issparse(features):
+            features = features.tocsr()
+            features.sort_indices()
+            layout = SPARSE_LAYOUT
+            arrays = {'data': features.data, 'indices': features.indices, 'indptr': features.indptr}
+        else:
+            layout = DENSE_LAYOUT
+            arrays = {'features': np.ascontiguousarray(features)}
+        target = np.asarray(target)
+        arrays['target'] = target.astype(np.min_scalar_type(int(target.max()) if target.size > 0 else 0))
+
+        files = dict()
+        for name, array in arrays.items():
+            files[name] = f"{name}.npy"
+            np.save(os.path.join(dir_path, files[name]), array)
+
+        header = {
+            'format_version': FEATURE_STORE_FORMAT_VERSION,
+            'layout': layout,
+            'shape': [int(size) for size in features.shape],
+            'dtype': str(features.dtype),
+            'target_dtype': str(arrays['target'].dtype),
+            'feature_names': None if feature_names is None else [str(name) for name in feature_names],
+            'target_column': target_column,
+            'files': files
+        }
+        with open(f"{header_path}.tmp", "w") as file_obj:
+            json.dump(header, file_obj, indent=2)
+        os.replace(f"{header_path}.tmp", header_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def read_feature_header(dir_path:str)->dict:
+    try:
+        with open(os.path.join(dir_path, FEATURE_HEADER_FILE_NAME)) as file_obj:
+            header = json.load(file_obj)
+        if header['format_version'] != FEATURE_STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature matrix format version: {header['format_version']}")
+        return header
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_feature_matrix(dir_path:str, mmap_mode:Optional[str]="r"):
+    """
+    returns the features, a dense array or a CSR matrix over the saved arrays,
+    and the labels. With `mmap_mode` nothing is read until it is used and the
+    pages are shared with the page cache instead of copied.
+    """
+    try:
+        from scipy import sparse
+        header = read_feature_header(dir_path)
+        arrays = {name: np.load(os.path.join(dir_path, file_name), mmap_mode=mmap_mode) for name, file_name in header['files'].items()}
+        if header['layout'] == SPARSE_LAYOUT:
+            features = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(header['shape']), copy=False)
+        else:
+            features = arrays['features']
+        return features, arrays['target']
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def iter_feature_matrix_chunks(dir_path:str, chunk_size:int=100000, mmap_mode:Optional[str]="r")->Iterator[tuple]:
+    """
+    Yields (features, target) of consecutive row chunks, each read from the
+    memory mapped arrays on its own.
+    """
+    try:
+        features, target = load_feature_matrix(dir_path, mmap_mode=mmap_mode)
+        for start in range(0, features.shape[0], chunk_size):
+            yield features[start:start+chunk_size], target[start:start+chunk_size]
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 def load_object(file_dir)-> object:
     try: 
         if not os.path.exists(file_dir):
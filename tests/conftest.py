@@ -0,0 +1,71 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _matches(document:dict, query:dict)->bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$gt" and not value > operand:
+                return False
+            if operator == "$gte" and not value >= operand:
+                return False
+            if operator not in ("$gt", "$gte"):
+                raise NotImplementedError(operator)
+    return True
+
+
+class FakeCursor:
+    """
+    The part of a pymongo Cursor that iter_collection_chunks uses.
+    """
+
+    def __init__(self, documents:list):
+        self.documents = documents
+        self.batch_sizes = []
+
+    def sort(self, key:str, direction:int):
+        self.documents = sorted(self.documents, key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, batch_size:int):
+        self.batch_sizes.append(batch_size)
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeCollection:
+    """
+    In memory stand-in for a pymongo Collection: find with $gt/$gte filters
+    and an _id exclusion projection.
+    """
+
+    def __init__(self, documents:list=None):
+        self.documents = list(documents or [])
+        self.queries = []
+
+    def insert_many(self, documents:list):
+        self.documents.extend(documents)
+
+    def find(self, query:dict=None, projection:dict=None):
+        query = query or {}
+        self.queries.append(query)
+        documents = [dict(document) for document in self.documents if _matches(document, query)]
+        if projection is not None and projection.get("_id") == 0:
+            for document in documents:
+                document.pop("_id", None)
+        return FakeCursor(documents)
+
+
+@pytest.fixture
+def fake_collection()->FakeCollection:
+    return FakeCollection()
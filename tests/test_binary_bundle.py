@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pytest
+from src.inference.binary_bundle import LabelTable, load_binary_bundle, save_binary_bundle
+from src.inference.compiled_transformer import CompiledTransformer, TransformerBlock, NUMERIC_BLOCK, ONE_HOT_BLOCK
+from src.inference.oblivious_trees import ObliviousTreeModel
+
+
+def make_transformer()->CompiledTransformer:
+    return CompiledTransformer(blocks=[
+        TransformerBlock(kind=NUMERIC_BLOCK, columns=['age', 'hours_per_week'], fill_values=[38.0, 40.0], categories=None,
+                         center=np.array([38.0, 40.0]), scale=np.array([13.0, 12.0])),
+        TransformerBlock(kind=ONE_HOT_BLOCK, columns=['sex'], fill_values=['Male'], categories=[np.array(['Female', 'Male'], dtype=object)],
+                         center=None, scale=None)
+    ], feature_names_in=['age', 'hours_per_week', 'sex'])
+
+
+def make_tree_model(n_features:int)->ObliviousTreeModel:
+    rng = np.random.default_rng(0)
+    return ObliviousTreeModel(
+        split_features=rng.integers(0, n_features, size=(8, 3)),
+        split_borders=rng.normal(size=(8, 3)).astype(np.float32),
+        leaf_values=rng.normal(size=(8, 8)),
+        scale=1.0,
+        bias=0.0,
+        classes=np.array([0, 1]),
+        nan_values=np.full(n_features, -np.inf, dtype=np.float32)
+    )
+
+
+class TreeOnlyModel:
+    """
+    A model without save_model, the bundle then has no CatBoost model.
+    """
+
+
+def test_tree_only_bundle_round_trip(tmp_path):
+    transformer = make_transformer()
+    tree_model = make_tree_model(transformer.n_features_out)
+    save_binary_bundle(str(tmp_path), model=TreeOnlyModel(), transformer=transformer, target_encoder=LabelTable(np.array(['<=50K', '>50K'])), tree_model=tree_model)
+    features = {'age': [25.0, np.nan], 'hours_per_week': [40.0, 60.0], 'sex': ['Female', 'Other']}
+
+    model, loaded_transformer, target_encoder = load_binary_bundle(str(tmp_path))
+
+    assert isinstance(model, ObliviousTreeModel)
+    np.testing.assert_array_equal(loaded_transformer.transform(features), transformer.transform(features))
+    X = transformer.transform(features)
+    np.testing.assert_array_equal(model.decision_function(X), tree_model.decision_function(X))
+    assert target_encoder.inverse_transform([1, 0]).tolist() == ['>50K', '<=50K']
+
+
+def test_bundle_with_a_changed_file_is_rejected(tmp_path):
+    transformer = make_transformer()
+    save_binary_bundle(str(tmp_path), model=TreeOnlyModel(), transformer=transformer, target_encoder=LabelTable(np.array([0, 1])),
+                       tree_model=make_tree_model(transformer.n_features_out))
+    np.save(os.path.join(tmp_path, "tree_leaf_values.npy"), np.zeros((8, 8)))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        load_binary_bundle(str(tmp_path))
@@ -0,0 +1,33 @@
+import json
+import pytest
+from src.pipeline.bulk_load_pipeline import LoadCheckpoint, find_incomplete_loads, object_id_for_row, source_key
+
+
+def test_object_ids_of_sources_loaded_in_the_same_second_differ():
+    first, second = source_key("salary_2023.csv"), source_key("salary_2024.csv")
+
+    first_ids = [object_id_for_row(1_700_000_000, first, row) for row in range(100)]
+    second_ids = [object_id_for_row(1_700_000_000, second, row) for row in range(100)]
+
+    assert len(set(first_ids) | set(second_ids)) == 200
+    assert first_ids == sorted(first_ids)
+    assert object_id_for_row(1_700_000_000, first, 7) == first_ids[7]
+
+
+def test_object_id_rejects_rows_over_the_counter():
+    with pytest.raises(ValueError):
+        object_id_for_row(1_700_000_000, source_key("salary.csv"), 2**32)
+
+
+def test_find_incomplete_loads_of_the_collection(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    for source_path, collection_name, complete in (("a.csv", "details", False), ("b.csv", "details", True), ("c.csv", "other", False)):
+        checkpoint = LoadCheckpoint(checkpoint_dir, source_path, "hr", collection_name, chunk_size=10)
+        checkpoint.state['complete'] = complete
+        checkpoint.save()
+
+    incomplete = find_incomplete_loads(checkpoint_dir, "hr", "details")
+
+    assert len(incomplete) == 1 and incomplete[0].endswith("a.csv")
+    with open(LoadCheckpoint(checkpoint_dir, "a.csv", "hr", "details", chunk_size=10).checkpoint_path) as file_obj:
+        assert json.load(file_obj)['complete'] is False
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from src.inference.cleaning import clean_value, clean_values, clean_frame
+
+RAW_VALUES = ['Private', ' Private', 'Private ', ' ? ', '?', 'na', ' na', 'NA', None, np.nan, '', 'Self-emp-inc', ' Self-emp-inc ']
+
+
+def assert_same_values(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        if isinstance(want, float) and want != want:
+            assert isinstance(got, float) and got != got
+        else:
+            assert got == want
+
+
+def test_clean_values_matches_clean_value():
+    assert_same_values(clean_values(RAW_VALUES).tolist(), [clean_value(value) for value in RAW_VALUES])
+
+
+def test_clean_frame_matches_clean_value_per_cell():
+    df = pd.DataFrame({'workclass': RAW_VALUES, 'age': np.arange(len(RAW_VALUES))})
+    df['workclass_category'] = df['workclass'].astype('category')
+    expected = [clean_value(value) for value in RAW_VALUES]
+
+    cleaned = clean_frame(df.copy())
+
+    assert_same_values(cleaned['workclass'].tolist(), expected)
+    assert_same_values(cleaned['workclass_category'].astype(object).tolist(), expected)
+    assert isinstance(cleaned['workclass_category'].dtype, pd.CategoricalDtype)
+    assert cleaned['age'].tolist() == df['age'].tolist()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.components.data_transformation import DataTransformation, WORKCLASS_CATEGORIES, EDUCATION_CATEGORIES
+from src.inference.compiled_transformer import compile_transformer, verify_compiled_transformer
+from src.inference.feature_batch import ColumnarBatch, INPUT_FEATURES, NUMERICAL_FEATURES, CATEGORICAL_FEATURES, SAMPLE_RECORD
+
+ORDINAL_COLUMNS = ['workclass', 'education']
+NOMINAL_COLUMNS = [col for col in CATEGORICAL_FEATURES if col not in ORDINAL_COLUMNS]
+
+RECORDS = [
+    SAMPLE_RECORD,
+    (50, 'Self-emp-not-inc', 83311, 'Bachelors', 13, 'Married-civ-spouse', 'Exec-managerial', 'Husband', 'White', 'Male', 0, 0, 13, 'United-States'),
+    (38, 'Private', 215646, 'HS-grad', 9, 'Divorced', 'Handlers-cleaners', 'Not-in-family', 'White', 'Male', 0, 0, 40, 'United-States'),
+    (53, 'Private', 234721, '11th', 7, 'Married-civ-spouse', 'Handlers-cleaners', 'Husband', 'Black', 'Male', 0, 0, 40, 'United-States'),
+    (28, 'Private', 338409, 'Bachelors', 13, 'Married-civ-spouse', 'Prof-specialty', 'Wife', 'Black', 'Female', 0, 0, 40, 'Cuba'),
+    (37, 'Private', 284582, 'Masters', 14, 'Married-civ-spouse', 'Exec-managerial', 'Wife', 'White', 'Female', 0, 0, 40, 'United-States'),
+    (49, 'Private', 160187, '9th', 5, 'Married-spouse-absent', 'Other-service', 'Not-in-family', 'Black', 'Female', 0, 0, 16, 'Jamaica'),
+    (31, 'Private', 45781, 'Masters', 14, 'Never-married', 'Prof-specialty', 'Not-in-family', 'White', 'Female', 14084, 0, 50, 'United-States'),
+    (42, 'Private', 159449, 'Bachelors', 13, 'Married-civ-spouse', 'Exec-managerial', 'Husband', 'White', 'Male', 5178, 0, 40, 'United-States'),
+    (23, 'Local-gov', 122272, 'Bachelors', 13, 'Never-married', 'Adm-clerical', 'Own-child', 'White', 'Female', 0, 1902, 30, 'United-States')
+]
+
+# Served input with a missing value and an unseen category in every column kind
+PROBE_RECORDS = [
+    (None, 'Private', 77516, 'Bachelors', 13, 'Never-married', 'Adm-clerical', 'Not-in-family', 'White', 'Male', 0, 0, 40, 'United-States'),
+    (30, None, 77516, None, 13, None, 'Adm-clerical', 'Not-in-family', 'White', None, 0, 0, 40, 'United-States'),
+    (30, '?', 77516, ' na ', 13, 'Never-married', np.nan, 'Not-in-family', 'White', 'Male', 0, 0, np.nan, 'United-States'),
+    (30, 'Astronaut', 77516, 'Flight-school', 13, 'Never-married', 'Space-crew', 'Not-in-family', 'Martian', 'Male', 0, 0, 40, 'Mars'),
+    (' 45', ' Federal-gov ', 77516, ' Doctorate', 16, 'Separated ', 'Tech-support', 'Unmarried', 'Asian-Pac-Islander', 'Female', 0, 0, 45, 'India')
+]
+
+
+def to_frame(batch:ColumnarBatch)->pd.DataFrame:
+    return pd.DataFrame({col: batch[col] for col in INPUT_FEATURES})
+
+
+@pytest.fixture(params=[False, True], ids=["dense_one_hot", "sparse_one_hot"])
+def fitted_transformer(request):
+    transformer = DataTransformation.get_data_transformer_obj(num_cols=NUMERICAL_FEATURES, ordinal_cat_cols=ORDINAL_COLUMNS, nom_cat_cols=NOMINAL_COLUMNS,
+                                                              workclass_cat=WORKCLASS_CATEGORIES, education_cat=EDUCATION_CATEGORIES, sparse_one_hot=request.param)
+    transformer.fit(to_frame(ColumnarBatch.from_records(RECORDS)))
+    return transformer
+
+
+def sklearn_transform(transformer, frame:pd.DataFrame)->np.ndarray:
+    output = transformer.transform(frame)
+    return output.toarray() if hasattr(output, "toarray") else np.asarray(output)
+
+
+def test_compiled_transformer_matches_on_training_rows(fitted_transformer):
+    frame = to_frame(ColumnarBatch.from_records(RECORDS))
+
+    np.testing.assert_array_equal(compile_transformer(fitted_transformer).transform(frame), sklearn_transform(fitted_transformer, frame))
+
+
+def test_compiled_transformer_matches_on_missing_and_unseen_values(fitted_transformer):
+    batch = ColumnarBatch.from_records(PROBE_RECORDS)
+    frame = to_frame(batch)
+    assert frame['workclass'].isnull().tolist() == [False, True, True, False, False]
+
+    compiled_transformer = compile_transformer(fitted_transformer)
+    expected = sklearn_transform(fitted_transformer, frame)
+
+    np.testing.assert_array_equal(compiled_transformer.transform(frame), expected)
+    np.testing.assert_array_equal(compiled_transformer.transform(batch), expected)
+
+
+def test_column_dict_input_matches_row_by_row(fitted_transformer):
+    compiled_transformer = compile_transformer(fitted_transformer)
+    batch = ColumnarBatch.from_records(PROBE_RECORDS + RECORDS)
+
+    whole = compiled_transformer.transform(batch)
+    single = np.vstack([compiled_transformer.transform(batch.take([row])) for row in range(len(batch))])
+
+    np.testing.assert_array_equal(whole, single)
+
+
+def test_verify_compiled_transformer_passes_and_catches_drift(fitted_transformer):
+    frame = to_frame(ColumnarBatch.from_records(RECORDS))
+    compiled_transformer = compile_transformer(fitted_transformer)
+
+    assert verify_compiled_transformer(fitted_transformer, compiled_transformer, frame) == 0.0
+
+    compiled_transformer.blocks[0].fill_values[0] += 1.0
+    with pytest.raises(ValueError, match="differs"):
+        verify_compiled_transformer(fitted_transformer, compiled_transformer, frame)
@@ -0,0 +1,158 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+from src import utils
+from src.components import data_ingestion as data_ingestion_module
+from src.components.data_ingestion import DataIngestion
+from src.entity import config_entity
+from src.exception import CustomException
+
+START_TIME = 1_700_000_000
+WORKCLASS = ['Private', 'State-gov', 'Self-emp-inc']
+
+
+def make_object_id(seconds:int, counter:int)->ObjectId:
+    return ObjectId(seconds.to_bytes(4, "big") + counter.to_bytes(8, "big"))
+
+
+def make_documents(n_documents:int, seconds:int=START_TIME, first_counter:int=0)->list:
+    return [{
+        '_id': make_object_id(seconds, first_counter + index),
+        'age': 20 + (first_counter + index) % 50,
+        'workclass': f" {WORKCLASS[index % len(WORKCLASS)]}",
+        'hours-per-week': 40,
+        'salary': ' >50K' if index % 4 == 0 else ' <=50K'
+    } for index in range(n_documents)]
+
+
+@pytest.fixture
+def ingestion_config(tmp_path):
+    training_pipeline_config = config_entity.TrainingPipelineConfig(artifact_dir=str(tmp_path / "artifact"))
+    config = config_entity.DataIngestionConfig(training_pipeline_config=training_pipeline_config)
+    config.ingestion_store_dir = str(tmp_path / "feature_store")
+    config.feature_store_dir = os.path.join(config.ingestion_store_dir, "raw_data")
+    config.train_data_dir = os.path.join(config.ingestion_store_dir, "dataset", "train")
+    config.test_data_dir = os.path.join(config.ingestion_store_dir, "dataset", "test")
+    config.state_file_dir = os.path.join(config.ingestion_store_dir, config_entity.INGESTION_STATE_FILE_NAME)
+    config.bulk_load_checkpoint_dir = str(tmp_path / "bulk_load_checkpoints")
+    config.chunk_size = 4
+    config.cursor_batch_size = 2
+    return config
+
+
+@pytest.fixture
+def run_ingestion(ingestion_config, fake_collection, monkeypatch):
+    monkeypatch.setattr(data_ingestion_module, "get_collection", lambda database_name, collection_name: fake_collection)
+
+    def run():
+        return DataIngestion(data_ingestion_config=ingestion_config).initiate_data_ingestion()
+    return run
+
+
+def ingested_ages(store_dir:str)->list:
+    return sorted(utils.read_feature_store(store_dir)['age'].tolist())
+
+
+def test_iter_collection_chunks_streams_in_chunks(fake_collection):
+    fake_collection.insert_many(make_documents(7))
+    fake_collection.documents[3].pop('workclass')
+
+    chunks = list(utils.iter_collection_chunks(fake_collection, chunk_size=3, batch_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert all('_id' not in chunk.columns for chunk in chunks)
+    assert chunks[1]['workclass'].isnull().tolist() == [True, False, False]
+    assert [age for chunk in chunks for age in chunk['age']] == [20 + index for index in range(7)]
+
+
+def test_iter_collection_chunks_sorts_and_keeps_ids(fake_collection):
+    fake_collection.insert_many(list(reversed(make_documents(5))))
+
+    chunks = list(utils.iter_collection_chunks(fake_collection, chunk_size=10, include_id=True, sort_key="_id"))
+
+    assert chunks[0]['_id'].tolist() == sorted(document['_id'] for document in fake_collection.documents)
+
+
+def test_watermark_ingests_only_new_documents(run_ingestion, ingestion_config, fake_collection):
+    fake_collection.insert_many(make_documents(6))
+    run_ingestion()
+    fake_collection.insert_many(make_documents(5, seconds=START_TIME + 5, first_counter=6))
+    run_ingestion()
+    run_ingestion()
+
+    assert ingested_ages(ingestion_config.feature_store_dir) == [20 + index for index in range(11)]
+    with open(ingestion_config.state_file_dir) as file_obj:
+        state = json.load(file_obj)
+    assert state['rows'] == 11
+    assert state['watermark'] == str(make_object_id(START_TIME + 5, 10))
+
+
+def test_watermark_picks_up_lower_ids_inside_the_overlap_window(run_ingestion, ingestion_config, fake_collection):
+    fake_collection.insert_many(make_documents(6, seconds=START_TIME + 100))
+    run_ingestion()
+    # A client with a slow clock, or out of order inserts, add ids below the watermark
+    fake_collection.insert_many(make_documents(3, seconds=START_TIME + 100 - 60, first_counter=6))
+    run_ingestion()
+    run_ingestion()
+
+    ages = ingested_ages(ingestion_config.feature_store_dir)
+    assert len(ages) == 9
+    assert len(set(ages)) == 9
+
+
+def test_ingestion_waits_for_incomplete_bulk_loads(run_ingestion, ingestion_config, fake_collection):
+    fake_collection.insert_many(make_documents(3))
+    os.makedirs(ingestion_config.bulk_load_checkpoint_dir)
+    with open(os.path.join(ingestion_config.bulk_load_checkpoint_dir, "details_abc.json"), "w") as file_obj:
+        json.dump({'source': "/data/salary.csv", 'database': ingestion_config.database_name, 'collection': ingestion_config.collection_name, 'complete': False}, file_obj)
+
+    with pytest.raises(CustomException, match="not complete"):
+        run_ingestion()
+
+
+def test_crashed_run_is_rolled_back_and_not_duplicated(run_ingestion, ingestion_config, fake_collection, monkeypatch):
+    fake_collection.insert_many(make_documents(4))
+    run_ingestion()
+    fake_collection.insert_many(make_documents(6, seconds=START_TIME + 5, first_counter=4))
+
+    def crash(self, state):
+        raise RuntimeError("crashed before saving the state")
+    with monkeypatch.context() as patch:
+        patch.setattr(DataIngestion, "save_state", crash)
+        with pytest.raises(CustomException):
+            run_ingestion()
+    assert len(utils.list_feature_store_parts(ingestion_config.feature_store_dir)) > 1
+
+    run_ingestion()
+
+    assert ingested_ages(ingestion_config.feature_store_dir) == [20 + index for index in range(10)]
+    train_rows = len(utils.read_feature_store(ingestion_config.train_data_dir))
+    test_rows = len(utils.read_feature_store(ingestion_config.test_data_dir))
+    assert train_rows + test_rows == 10
+
+
+def test_hash_split_is_stable_across_chunkings():
+    ids = pd.Series([make_object_id(START_TIME + index // 100, index) for index in range(5000)])
+
+    whole = DataIngestion.is_test_record(ids, 0.2)
+    chunked = np.concatenate([DataIngestion.is_test_record(ids[start:start+333], 0.2) for start in range(0, len(ids), 333)])
+
+    assert np.array_equal(whole, chunked)
+    assert np.array_equal(whole, DataIngestion.is_test_record(ids, 0.2))
+    assert abs(whole.mean() - 0.2) < 0.03
+
+
+def test_split_of_ingested_rows_does_not_change_between_runs(run_ingestion, ingestion_config, fake_collection):
+    fake_collection.insert_many(make_documents(12))
+    run_ingestion()
+    test_ages = ingested_ages(ingestion_config.test_data_dir)
+    fake_collection.insert_many(make_documents(12, seconds=START_TIME + 5, first_counter=12))
+    run_ingestion()
+
+    expected = DataIngestion.is_test_record(pd.Series([document['_id'] for document in fake_collection.documents]), ingestion_config.test_size)
+    expected_ages = sorted(document['age'] for document, is_test in zip(fake_collection.documents, expected) if is_test)
+    assert ingested_ages(ingestion_config.test_data_dir) == expected_ages
+    assert set(test_ages) <= set(expected_ages)
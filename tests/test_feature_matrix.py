@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from src.exception import CustomException
+from src.utils import save_feature_matrix, load_feature_matrix, read_feature_header, iter_feature_matrix_chunks, as_feature_matrix, SPARSE_LAYOUT, DENSE_LAYOUT
+
+FEATURE_NAMES = [f"feature_{col}" for col in range(6)]
+
+
+@pytest.fixture
+def dense_features():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(50, 6)).astype(np.float32)
+    features[features < 0.5] = 0.0
+    return features
+
+
+@pytest.fixture
+def target():
+    return np.random.default_rng(1).integers(0, 2, size=50)
+
+
+def test_dense_round_trip_is_exact(tmp_path, dense_features, target):
+    save_feature_matrix(str(tmp_path), dense_features, target, feature_names=FEATURE_NAMES, target_column="income")
+
+    features, loaded_target = load_feature_matrix(str(tmp_path))
+
+    assert isinstance(features, np.memmap)
+    assert features.dtype == dense_features.dtype
+    np.testing.assert_array_equal(features, dense_features)
+    np.testing.assert_array_equal(loaded_target, target)
+    header = read_feature_header(str(tmp_path))
+    assert (header['layout'], header['shape'], header['feature_names'], header['target_column']) == (DENSE_LAYOUT, [50, 6], FEATURE_NAMES, "income")
+
+
+def test_sparse_round_trip_is_exact(tmp_path, dense_features, target):
+    save_feature_matrix(str(tmp_path), sparse.csc_matrix(dense_features), target)
+
+    features, loaded_target = load_feature_matrix(str(tmp_path))
+
+    assert sparse.isspmatrix_csr(features)
+    assert features.dtype == dense_features.dtype
+    np.testing.assert_array_equal(features.toarray(), dense_features)
+    np.testing.assert_array_equal(loaded_target, target)
+    assert read_feature_header(str(tmp_path))['layout'] == SPARSE_LAYOUT
+
+
+@pytest.mark.parametrize("to_sparse", [False, True], ids=["dense", "sparse"])
+def test_chunks_cover_every_row_in_order(tmp_path, dense_features, target, to_sparse):
+    save_feature_matrix(str(tmp_path), sparse.csr_matrix(dense_features) if to_sparse else dense_features, target)
+
+    chunks = list(iter_feature_matrix_chunks(str(tmp_path), chunk_size=16))
+
+    assert [chunk_target.shape[0] for _, chunk_target in chunks] == [16, 16, 16, 2]
+    rows = np.vstack([as_feature_matrix(chunk).toarray() if to_sparse else chunk for chunk, _ in chunks])
+    np.testing.assert_array_equal(rows, dense_features)
+    np.testing.assert_array_equal(np.concatenate([chunk_target for _, chunk_target in chunks]), target)
+
+
+def test_missing_header_fails_to_load(tmp_path, dense_features, target):
+    save_feature_matrix(str(tmp_path), dense_features, target)
+    (tmp_path / "header.json").unlink()
+
+    with pytest.raises(CustomException):
+        load_feature_matrix(str(tmp_path))
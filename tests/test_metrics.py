@@ -0,0 +1,74 @@
+import os
+import json
+from src.inference.metrics import MetricsRegistry, REQUESTS_TOTAL, STAGE_LATENCY, EXITED_SNAPSHOT_FILE_NAME, mark_process_dead
+
+
+def metric_lines(text:str, name:str)->list:
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def write_worker_snapshot(multiprocess_dir:str, registry:MetricsRegistry, pid:int):
+    snapshot = dict(registry.snapshot(), pid=pid)
+    with open(os.path.join(multiprocess_dir, f"metrics_{pid}_1.json"), "w") as file_obj:
+        json.dump(snapshot, file_obj)
+
+
+def test_single_process_render():
+    registry = MetricsRegistry()
+    registry.inc(REQUESTS_TOTAL, route="/", status="200")
+    registry.inc(REQUESTS_TOTAL, route="/", status="200")
+    registry.observe(STAGE_LATENCY, 0.003, stage="predict")
+    registry.register_gauge("income_classifier_model_version", "Model version currently served", lambda: [({}, 3)])
+
+    text = registry.render()
+
+    assert metric_lines(text, REQUESTS_TOTAL) == [f'{REQUESTS_TOTAL}{{route="/",status="200"}} 2.0']
+    assert f'{STAGE_LATENCY}_count{{stage="predict"}} 1' in text
+    assert "income_classifier_model_version 3.0" in text
+
+
+def test_workers_are_summed(tmp_path):
+    first, second = MetricsRegistry(), MetricsRegistry()
+    first.enable_multiprocess(str(tmp_path), flush_interval=0)
+    second.enable_multiprocess(str(tmp_path), flush_interval=0)
+    first.inc(REQUESTS_TOTAL, route="/", status="200")
+    second.inc(REQUESTS_TOTAL, route="/", status="200", value=2)
+    first.observe(STAGE_LATENCY, 0.003, stage="predict")
+    second.observe(STAGE_LATENCY, 0.2, stage="predict")
+    second.write_snapshot()
+
+    text = first.render()
+
+    assert metric_lines(text, REQUESTS_TOTAL) == [f'{REQUESTS_TOTAL}{{route="/",status="200"}} 3.0']
+    assert f'{STAGE_LATENCY}_count{{stage="predict"}} 2' in text
+    assert f'{STAGE_LATENCY}_bucket{{stage="predict",le="+Inf"}} 2' in text
+    assert f'{STAGE_LATENCY}_bucket{{stage="predict",le="0.005"}} 1' in text
+
+
+def test_series_recorded_before_the_fork_are_dropped(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc(REQUESTS_TOTAL, route="/", status="200")
+
+    registry.enable_multiprocess(str(tmp_path), flush_interval=0)
+
+    assert metric_lines(registry.render(), REQUESTS_TOTAL) == []
+
+
+def test_exited_workers_keep_their_counts_and_lose_their_gauges(tmp_path):
+    live = MetricsRegistry()
+    live.enable_multiprocess(str(tmp_path), flush_interval=0)
+    live.inc(REQUESTS_TOTAL, route="/", status="200")
+    for pid in (4242, 4343):
+        exited = MetricsRegistry()
+        exited.inc(REQUESTS_TOTAL, route="/", status="200", value=10)
+        exited.register_gauge("income_classifier_model_version", "Model version currently served", lambda: [({}, 3)])
+        write_worker_snapshot(str(tmp_path), exited, pid)
+    assert 'income_classifier_model_version{pid="4242"} 3.0' in live.render()
+
+    mark_process_dead(str(tmp_path), 4242)
+    mark_process_dead(str(tmp_path), 4343)
+    text = live.render()
+
+    assert metric_lines(text, REQUESTS_TOTAL) == [f'{REQUESTS_TOTAL}{{route="/",status="200"}} 21.0']
+    assert "income_classifier_model_version" not in text
+    assert sorted(file_name for file_name in os.listdir(tmp_path) if not file_name.startswith(f"metrics_{os.getpid()}_")) == [EXITED_SNAPSHOT_FILE_NAME]
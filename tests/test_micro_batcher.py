@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from concurrent.futures import Future
+from src.inference.feature_batch import ColumnarBatch, SAMPLE_RECORD
+from src.pipeline.micro_batcher import MicroBatcher
+
+
+def make_batch(ages:list)->ColumnarBatch:
+    return ColumnarBatch.from_records([(age,) + SAMPLE_RECORD[1:] for age in ages])
+
+
+class RecordingModel:
+    """
+    Predicts the age of every row, fails on any batch containing `bad_age`.
+    """
+
+    def __init__(self, bad_age:float=-1):
+        self.bad_age = bad_age
+        self.batch_sizes = []
+
+    def __call__(self, features:ColumnarBatch)->np.ndarray:
+        self.batch_sizes.append(len(features))
+        if self.bad_age in features['age']:
+            raise ValueError("bad age")
+        return features['age'].copy()
+
+
+def queued(ages_per_request:list)->list:
+    return [(make_batch(ages), Future()) for ages in ages_per_request]
+
+
+def test_coalesced_requests_get_their_own_rows():
+    model = RecordingModel()
+    batch = queued([[20], [30, 31], [40]])
+
+    MicroBatcher(model)._process(batch)
+
+    assert model.batch_sizes == [4]
+    assert [future.result().tolist() for _, future in batch] == [[20.0], [30.0, 31.0], [40.0]]
+
+
+def test_failed_batch_is_scored_request_by_request():
+    model = RecordingModel(bad_age=30)
+    batch = queued([[20], [30], [40]])
+
+    MicroBatcher(model)._process(batch)
+
+    assert model.batch_sizes == [3, 1, 1, 1]
+    assert batch[0][1].result().tolist() == [20.0]
+    with pytest.raises(ValueError, match="bad age"):
+        batch[1][1].result()
+    assert batch[2][1].result().tolist() == [40.0]
+
+
+def test_submitted_requests_are_answered():
+    micro_batcher = MicroBatcher(RecordingModel(), max_wait=0.01, max_batch_size=8)
+
+    futures = [micro_batcher.submit(make_batch([age])) for age in range(20, 25)]
+
+    assert [future.result(timeout=5).tolist() for future in futures] == [[20.0], [21.0], [22.0], [23.0], [24.0]]
+
+
+def test_disabled_batcher_calls_the_model_directly():
+    model = RecordingModel()
+    micro_batcher = MicroBatcher(model, max_wait=0.0)
+
+    assert micro_batcher.predict(make_batch([20, 21])).tolist() == [20.0, 21.0]
+    assert micro_batcher._worker is None
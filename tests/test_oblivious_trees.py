@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from src.inference.oblivious_trees import BatchSizeRouter, ObliviousTreeModel
+
+
+def make_tree_model(tree_count:int, depth:int, n_features:int=12, seed:int=0, chunk_size:int=1024)->ObliviousTreeModel:
+    rng = np.random.default_rng(seed)
+    split_borders = rng.normal(size=(tree_count, depth)).astype(np.float32)
+    # A shallower tree is padded with never-true splits
+    split_borders[0, depth-1] = np.inf
+    nan_values = np.full(n_features, -np.inf, dtype=np.float32)
+    nan_values[1] = np.inf
+    return ObliviousTreeModel(
+        split_features=rng.integers(0, n_features, size=(tree_count, depth)),
+        split_borders=split_borders,
+        leaf_values=rng.normal(size=(tree_count, 2**depth)),
+        scale=0.5,
+        bias=0.25,
+        classes=np.array([0, 1]),
+        nan_values=nan_values,
+        chunk_size=chunk_size
+    )
+
+
+def reference_decision_function(tree_model:ObliviousTreeModel, X:np.ndarray)->np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    X = np.where(np.isnan(X), tree_model.nan_values, X)
+    raw = np.zeros(len(X))
+    for row, x in enumerate(X):
+        for tree in range(tree_model.tree_count):
+            leaf = sum(int(x[feature] > border) << level for level, (feature, border) in enumerate(zip(tree_model.split_features[tree], tree_model.split_borders[tree])))
+            raw[row] += tree_model.leaf_values[tree, leaf]
+    return raw * tree_model.scale + tree_model.bias
+
+
+@pytest.mark.parametrize("depth", [1, 6, 10])
+@pytest.mark.parametrize("n_rows", [1, 16, 300])
+def test_decision_function_matches_the_tree_walk(depth, n_rows):
+    tree_model = make_tree_model(tree_count=40, depth=depth, chunk_size=128)
+    X = np.random.default_rng(1).normal(size=(n_rows, tree_model.n_features_in_))
+    X[0, 1] = np.nan
+    X[-1, 2] = np.nan
+
+    np.testing.assert_allclose(tree_model.decision_function(X), reference_decision_function(tree_model, X), rtol=0, atol=1e-12)
+
+
+def test_single_row_and_classes():
+    tree_model = make_tree_model(tree_count=20, depth=4)
+    X = np.random.default_rng(2).normal(size=(5, tree_model.n_features_in_))
+
+    np.testing.assert_allclose(tree_model.decision_function(X[0]), tree_model.decision_function(X)[:1])
+    assert tree_model.predict(X).tolist() == (tree_model.decision_function(X) > 0).astype(int).tolist()
+    np.testing.assert_allclose(tree_model.predict_proba(X).sum(axis=1), 1.0)
+
+
+class RecordingModel:
+
+    def __init__(self, tree_model:ObliviousTreeModel):
+        self.tree_model = tree_model
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        return self.tree_model.predict_proba(X)
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return self.tree_model.predict(X)
+
+
+def test_router_sends_large_batches_to_catboost():
+    tree_model = make_tree_model(tree_count=10, depth=3)
+    catboost_model = RecordingModel(tree_model)
+    router = BatchSizeRouter(tree_model=tree_model, model=catboost_model, max_tree_rows=16)
+    X = np.random.default_rng(3).normal(size=(100, tree_model.n_features_in_))
+
+    router.predict(X[:1])
+    router.predict_proba(X[:16])
+    router.predict(X[:17])
+    router.predict_proba(X)
+
+    assert catboost_model.calls == [17, 100]
+    assert router.pick(X[0]) is tree_model
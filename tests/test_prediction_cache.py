@@ -0,0 +1,77 @@
+import pytest
+from src.inference import prediction_cache as prediction_cache_module
+from src.inference.feature_batch import NUMERICAL_MASK, SAMPLE_RECORD
+from src.inference.prediction_cache import PredictionCache, canonical_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self)->float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(prediction_cache_module.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def test_hit_and_miss_are_counted():
+    cache = PredictionCache(max_size=10)
+    cache.put_many([b"a"], [(1, 0.9)], version=1)
+
+    assert cache.get_many([b"a", b"b"], version=1) == [(1, 0.9), None]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2)
+    cache.put_many([b"a", b"b"], [(0, 0.1), (1, 0.8)], version=1)
+    cache.get_many([b"a"], version=1)
+
+    cache.put_many([b"c"], [(1, 0.7)], version=1)
+
+    assert cache.get_many([b"a", b"b", b"c"], version=1) == [(0, 0.1), None, (1, 0.7)]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl=30)
+    cache.put_many([b"a"], [(1, 0.9)], version=1)
+
+    clock.now += 29
+    assert cache.get_many([b"a"], version=1) == [(1, 0.9)]
+
+    clock.now += 2
+    assert cache.get_many([b"a"], version=1) == [None]
+    assert cache.stats()['size'] == 0
+
+
+def test_new_model_version_clears_the_entries():
+    cache = PredictionCache(max_size=10)
+    cache.put_many([b"a"], [(1, 0.9)], version=1)
+
+    assert cache.get_many([b"a"], version=2) == [None]
+    assert cache.stats()['model_version'] == 2
+
+
+def test_canonical_key_compares_numbers_by_value():
+    record = list(SAMPLE_RECORD)
+    as_strings = [str(value) if is_numerical else value for value, is_numerical in zip(record, NUMERICAL_MASK)]
+    as_floats = [float(value) if is_numerical else value for value, is_numerical in zip(record, NUMERICAL_MASK)]
+
+    assert canonical_key(record, NUMERICAL_MASK) == canonical_key(as_strings, NUMERICAL_MASK) == canonical_key(as_floats, NUMERICAL_MASK)
+    assert canonical_key([None] + record[1:], NUMERICAL_MASK) == canonical_key([float("nan")] + record[1:], NUMERICAL_MASK)
+
+
+def test_canonical_key_keeps_categorical_values_as_given():
+    record = list(SAMPLE_RECORD)
+    padded = record[:1] + [' State-gov'] + record[2:]
+
+    assert canonical_key(record, NUMERICAL_MASK) != canonical_key(padded, NUMERICAL_MASK)
+    assert canonical_key(record, NUMERICAL_MASK) != canonical_key([40] + record[1:], NUMERICAL_MASK)
+    assert canonical_key(["old"] + record[1:], NUMERICAL_MASK) != canonical_key([None] + record[1:], NUMERICAL_MASK)
@@ -0,0 +1,58 @@
+import pytest
+from src.components.model_resolver import ModelResolver
+from src.entity.config_entity import PredictionPipelineConfig
+from src.exception import InputValidationError
+from src.inference.feature_batch import INPUT_FEATURES, SAMPLE_RECORD
+from src.pipeline.model_cache import ModelCache
+from src.pipeline.prediction_pipeline import PredictionPipeline
+
+RECORD = dict(zip(INPUT_FEATURES, SAMPLE_RECORD))
+
+
+@pytest.fixture
+def prediction_pipeline(tmp_path):
+    prediction_config = PredictionPipelineConfig()
+    prediction_config.max_batch_size = 3
+    model_cache = ModelCache(model_resolver=ModelResolver(model_registry=str(tmp_path)), reload_interval=None)
+    return PredictionPipeline(model_cache=model_cache, prediction_config=prediction_config)
+
+
+def test_records_and_columns_build_the_same_batch(prediction_pipeline):
+    records = [RECORD, dict(RECORD, age=50)]
+    columns = {col.replace('-', '_'): [record[col] for record in records] for col in INPUT_FEATURES}
+
+    from_records = prediction_pipeline.get_batch_features(records)
+    from_columns = prediction_pipeline.get_batch_features(columns)
+
+    assert len(from_records) == len(from_columns) == 2
+    assert from_records['age'].tolist() == from_columns['age'].tolist() == [39.0, 50.0]
+
+
+def test_records_without_the_expected_keys_report_missing_columns(prediction_pipeline):
+    with pytest.raises(InputValidationError) as error:
+        prediction_pipeline.get_batch_features([{'unknown': 1}, {'unknown': 2}])
+
+    assert error.value.errors == {col: "missing" for col in INPUT_FEATURES}
+
+
+def test_missing_columns_are_reported_before_the_batch_size(prediction_pipeline):
+    records = [{key: value for key, value in RECORD.items() if key != 'sex'}] * 10
+
+    with pytest.raises(InputValidationError) as error:
+        prediction_pipeline.get_batch_features(records)
+
+    assert error.value.errors == {'sex': "missing"}
+
+
+def test_batch_size_is_counted_from_the_records(prediction_pipeline):
+    with pytest.raises(InputValidationError, match="exceeds the limit of 3"):
+        prediction_pipeline.get_batch_features([RECORD] * 4)
+    with pytest.raises(InputValidationError, match="No records"):
+        prediction_pipeline.get_batch_features([])
+
+
+def test_invalid_values_are_reported_per_column(prediction_pipeline):
+    with pytest.raises(InputValidationError) as error:
+        prediction_pipeline.get_batch_features([RECORD, dict(RECORD, age="old", sex=1)])
+
+    assert set(error.value.errors) == {'age', 'sex'}
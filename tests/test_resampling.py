@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from src.components.resampling import resolve_strategy, balanced_class_weights, stratified_blocks, resample, SMOTE_K_NEIGHBORS
+from src.components.resampling import AUTO, SMOTE_TOMEK, BLOCKED_SMOTE_TOMEK, CLASS_WEIGHT, NO_RESAMPLING
+
+
+@pytest.fixture
+def imbalanced():
+    rng = np.random.default_rng(0)
+    y = np.r_[np.zeros(900, dtype=np.int64), np.ones(100, dtype=np.int64)]
+    X = rng.normal(size=(len(y), 4)) + y[:, None] * 2.0
+    return X, y
+
+
+def test_auto_switches_to_blocks_above_the_exact_limit():
+    assert resolve_strategy(AUTO, n_rows=1000, exact_max_rows=1000) == SMOTE_TOMEK
+    assert resolve_strategy(AUTO, n_rows=1001, exact_max_rows=1000) == BLOCKED_SMOTE_TOMEK
+    assert resolve_strategy(CLASS_WEIGHT, n_rows=10**7, exact_max_rows=1000) == CLASS_WEIGHT
+    with pytest.raises(ValueError, match="Unknown resampling strategy"):
+        resolve_strategy("oversample", n_rows=10, exact_max_rows=1000)
+
+
+def test_balanced_class_weights():
+    assert balanced_class_weights(np.array([0, 0, 0, 1])) == [4 / 6, 2.0]
+
+
+def test_stratified_blocks_partition_the_rows_and_keep_the_ratio(imbalanced):
+    _, y = imbalanced
+
+    blocks = stratified_blocks(y, block_size=250, random_state=1)
+
+    assert len(blocks) == 4
+    np.testing.assert_array_equal(np.sort(np.concatenate(blocks)), np.arange(len(y)))
+    assert [int(y[block].sum()) for block in blocks] == [25, 25, 25, 25]
+
+
+def test_stratified_blocks_leave_enough_minority_rows_for_smote():
+    y = np.r_[np.zeros(1000, dtype=np.int64), np.ones(20, dtype=np.int64)]
+
+    blocks = stratified_blocks(y, block_size=100, random_state=1)
+
+    assert len(blocks) == 20 // (SMOTE_K_NEIGHBORS + 1)
+    assert min(int(y[block].sum()) for block in blocks) > SMOTE_K_NEIGHBORS
+
+
+@pytest.mark.parametrize("strategy", [SMOTE_TOMEK, BLOCKED_SMOTE_TOMEK])
+def test_smote_strategies_balance_the_classes(imbalanced, strategy):
+    X, y = imbalanced
+
+    X_resampled, y_resampled, class_weights = resample(X, y, strategy=strategy, block_size=250, n_workers=2)
+
+    assert class_weights is None
+    assert X_resampled.shape[0] == len(y_resampled)
+    counts = np.bincount(y_resampled)
+    assert abs(counts[0] - counts[1]) <= 0.1 * counts.sum()
+
+
+def test_blocked_smote_tomek_keeps_sparse_input_sparse(imbalanced):
+    X, y = imbalanced
+
+    X_resampled, y_resampled, _ = resample(sparse.csr_matrix(X), y, strategy=BLOCKED_SMOTE_TOMEK, block_size=250, n_workers=2)
+
+    assert sparse.isspmatrix_csr(X_resampled)
+    assert X_resampled.shape == (len(y_resampled), X.shape[1])
+
+
+def test_class_weight_and_none_leave_the_data_unchanged(imbalanced):
+    X, y = imbalanced
+
+    X_weighted, y_weighted, class_weights = resample(X, y, strategy=CLASS_WEIGHT)
+    X_unchanged, y_unchanged, no_weights = resample(X, y, strategy=NO_RESAMPLING)
+
+    assert X_weighted is X and y_weighted is y and class_weights == balanced_class_weights(y)
+    assert X_unchanged is X and y_unchanged is y and no_weights is None
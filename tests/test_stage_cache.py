@@ -0,0 +1,95 @@
+import os
+import pytest
+from dataclasses import dataclass
+from src.entity.config_entity import StageCacheConfig
+from src.pipeline.stage_cache import StageCache
+
+
+@dataclass
+class FileArtifact:
+    file_path: str
+    n_rows: int
+
+
+class StageConfig:
+    def __init__(self, artifact_dir:str):
+        self.threshold = 0.5
+        self.n_workers = 4
+        self.output_file_path = os.path.join(artifact_dir, "output.txt")
+
+
+@pytest.fixture
+def stage_cache_config(tmp_path):
+    stage_cache_config = StageCacheConfig()
+    stage_cache_config.cache_dir = str(tmp_path / "stage_cache")
+    return stage_cache_config
+
+
+def make_stage(artifact_dir:str, calls:list, content:str="rows"):
+    def stage_fn()->FileArtifact:
+        calls.append(artifact_dir)
+        os.makedirs(artifact_dir, exist_ok=True)
+        file_path = os.path.join(artifact_dir, "output.txt")
+        with open(file_path, "w") as file_obj:
+            file_obj.write(content)
+        return FileArtifact(file_path=file_path, n_rows=len(content))
+    return stage_fn
+
+
+def run_stage(stage_cache_config, artifact_dir:str, calls:list, config=None, inputs=None, content:str="rows")->FileArtifact:
+    stage_cache = StageCache(stage_cache_config, artifact_dir=artifact_dir)
+    return stage_cache.run("transform", config or StageConfig(artifact_dir), [], [make_stage], FileArtifact, make_stage(artifact_dir, calls, content), inputs=inputs)
+
+
+def test_unchanged_stage_is_served_from_the_cache(stage_cache_config, tmp_path):
+    calls = []
+    first = run_stage(stage_cache_config, str(tmp_path / "run_1"), calls)
+    second = run_stage(stage_cache_config, str(tmp_path / "run_2"), calls)
+
+    assert calls == [str(tmp_path / "run_1")]
+    assert second.n_rows == first.n_rows
+    assert second.file_path.startswith(stage_cache_config.cache_dir)
+    assert open(second.file_path).read() == "rows"
+
+
+def test_changed_config_or_input_misses(stage_cache_config, tmp_path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("a,b\n")
+    calls = []
+    run_stage(stage_cache_config, str(tmp_path / "run_1"), calls, inputs=[str(input_path)])
+
+    config = StageConfig(str(tmp_path / "run_2"))
+    config.threshold = 0.6
+    run_stage(stage_cache_config, str(tmp_path / "run_2"), calls, config=config, inputs=[str(input_path)])
+    input_path.write_text("a,b\n1,2\n")
+    run_stage(stage_cache_config, str(tmp_path / "run_3"), calls, inputs=[str(input_path)])
+
+    assert len(calls) == 3
+
+
+def test_execution_only_settings_do_not_change_the_fingerprint(stage_cache_config, tmp_path):
+    stage_cache = StageCache(stage_cache_config, artifact_dir=str(tmp_path / "run_1"))
+    config = StageConfig(str(tmp_path / "run_1"))
+    fingerprint = stage_cache.fingerprint("transform", config, [], [make_stage], [])
+
+    config.n_workers = 1
+    assert stage_cache.fingerprint("transform", config, [], [make_stage], []) == fingerprint
+    config.threshold = 0.9
+    assert stage_cache.fingerprint("transform", config, [], [make_stage], []) != fingerprint
+
+
+def test_least_recently_used_entries_are_evicted(stage_cache_config, tmp_path):
+    stage_cache_config.max_size_bytes = 1500
+    calls = []
+    for run, content in enumerate(["a" * 1000, "b" * 1000]):
+        config = StageConfig(str(tmp_path / f"run_{run}"))
+        config.threshold = run
+        run_stage(stage_cache_config, str(tmp_path / f"run_{run}"), calls, config=config, content=content)
+
+    entries = os.listdir(os.path.join(stage_cache_config.cache_dir, "transform"))
+    assert len(entries) == 1
+    config = StageConfig(str(tmp_path / "run_2"))
+    config.threshold = 1
+    cached = run_stage(stage_cache_config, str(tmp_path / "run_2"), calls, config=config)
+    assert open(cached.file_path).read() == "b" * 1000
+    assert len(calls) == 2
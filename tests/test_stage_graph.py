@@ -0,0 +1,87 @@
+import os
+import json
+import pytest
+from dataclasses import dataclass
+from src.exception import CustomException
+from src.pipeline.stage_graph import Stage, StageGraph, find_incomplete_run, RUN_STATE_FILE_NAME, SUCCEEDED, FAILED, SKIPPED
+
+
+@dataclass
+class FileArtifact:
+    file_path: str
+
+
+class RecordingStages:
+    """
+    Linear graph a -> b -> c -> d, every stage writes one file and records its runs.
+    """
+
+    def __init__(self, artifact_dir:str):
+        os.makedirs(artifact_dir)
+        self.artifact_dir = artifact_dir
+        self.calls = []
+        self.failing = set()
+
+    def stage(self, name:str, depends_on:list)->Stage:
+        def run(artifacts:dict)->FileArtifact:
+            self.calls.append(name)
+            if name in self.failing:
+                raise RuntimeError(f"{name} broke")
+            file_path = os.path.join(self.artifact_dir, f"{name}.txt")
+            with open(file_path, "w") as file_obj:
+                file_obj.write("".join(open(artifacts[dependency].file_path).read() for dependency in depends_on) + name)
+            return FileArtifact(file_path=file_path)
+        return Stage(name=name, depends_on=depends_on, artifact_cls=FileArtifact, run=run)
+
+    def graph(self)->StageGraph:
+        stages = [self.stage("a", []), self.stage("b", ["a"]), self.stage("c", ["b"]), self.stage("d", ["c"])]
+        return StageGraph(stages, artifact_dir=self.artifact_dir, n_workers=2)
+
+
+@pytest.fixture
+def stages(tmp_path):
+    return RecordingStages(str(tmp_path / "artifact" / "run_1"))
+
+
+def read_run_state(artifact_dir:str)->dict:
+    with open(os.path.join(artifact_dir, RUN_STATE_FILE_NAME)) as file_obj:
+        return json.load(file_obj)
+
+
+def test_resume_reruns_the_failed_stage_and_the_stages_after_it(stages):
+    stages.failing.add("c")
+    with pytest.raises(CustomException, match="c broke"):
+        stages.graph().execute()
+
+    run_state = read_run_state(stages.artifact_dir)
+    assert [run_state['stages'][name]['status'] for name in "abcd"] == [SUCCEEDED, SUCCEEDED, FAILED, SKIPPED]
+    assert find_incomplete_run(os.path.dirname(stages.artifact_dir)) == stages.artifact_dir
+
+    stages.failing.clear()
+    stages.calls.clear()
+    artifacts = stages.graph().execute(resume=True)
+
+    assert stages.calls == ["c", "d"]
+    assert open(artifacts["d"].file_path).read() == "abcd"
+    assert read_run_state(stages.artifact_dir)['status'] == SUCCEEDED
+    assert find_incomplete_run(os.path.dirname(stages.artifact_dir)) is None
+
+
+def test_resume_reruns_a_stage_whose_files_are_gone(stages):
+    stages.failing.add("d")
+    with pytest.raises(CustomException):
+        stages.graph().execute()
+
+    os.remove(os.path.join(stages.artifact_dir, "b.txt"))
+    stages.failing.clear()
+    stages.calls.clear()
+    stages.graph().execute(resume=True)
+
+    assert stages.calls == ["b", "c", "d"]
+
+
+def test_cycles_and_unknown_dependencies_are_rejected(stages):
+    with pytest.raises(ValueError, match="cycle"):
+        StageGraph([stages.stage("a", ["b"]), stages.stage("b", ["a"])], artifact_dir=stages.artifact_dir)
+    with pytest.raises(ValueError, match="unknown"):
+        StageGraph([stages.stage("a", ["z"])], artifact_dir=stages.artifact_dir)